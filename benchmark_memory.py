@@ -0,0 +1,57 @@
+"""
+Memory benchmark: plain dict records vs slotted CountryRecord.
+
+Usage:
+    python benchmark_memory.py [copies]
+
+The countries of dados.json are replicated `copies` times (each copy
+parsed separately, as json.load would, so no strings are shared between
+copies). Allocated memory is measured with tracemalloc for both
+representations.
+"""
+import json
+import sys
+import tracemalloc
+
+from country_types import CountryRecord
+from components.constants import DATA_FILE
+
+
+def _measure(build):
+    """Return (result, bytes allocated by build())."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _load_countries(copies: int) -> list:
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        text = f.read()
+    countries = []
+    for _ in range(copies):
+        countries.extend(json.loads(text).get("countries", []))
+    return countries
+
+
+def main(copies: int = 100):
+    raw = json.dumps(_load_countries(copies))
+
+    dict_countries, dict_bytes = _measure(lambda: json.loads(raw))
+    slot_countries, slot_bytes = _measure(
+        lambda: [CountryRecord(c) for c in json.loads(raw)]
+    )
+
+    assert dict_countries == slot_countries
+
+    saved = 1 - slot_bytes / dict_bytes if dict_bytes else 0
+    print(f"{'Records':<28}{'dict':>12}{'slotted':>12}{'saved':>8}")
+    print(f"{f'countries ({len(dict_countries)})':<28}{dict_bytes / 1e6:>10.1f}MB"
+          f"{slot_bytes / 1e6:>10.1f}MB{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    main(*args)
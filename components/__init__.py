@@ -2,6 +2,8 @@
 Components package for Country Manager application.
 """
 from .data_handler import (
+    CountryRepository,
+    get_repository,
     load_countries,
     save_countries,
     get_country,
@@ -9,6 +11,36 @@ from .data_handler import (
     update_country,
     delete_country,
     list_countries,
+    list_countries_sorted,
+    get_cache_stats,
+    find_by_field,
+    find_by_city,
+    find_matching,
+    find_similar,
+    find_by_query,
+    explain_query,
+    lookup_phone_number,
+    lookup_phone_file,
+    validate_postal_code,
+    find_postal_countries,
+    validate_postal_file,
+    get_language_index,
+    get_columnar_table,
+    get_border_graph,
+    get_aggregates,
+    get_report,
+    verify_aggregates,
+    take_snapshot,
+    list_snapshots,
+    diff_snapshots,
+    get_snapshot_series,
+    restore_snapshot,
+    prune_snapshots,
+    migrate_json_to_sqlite,
+    batch,
+    add_city,
+    rename_city,
+    delete_city,
 )
 from .filter_component import (
     filter_by_field,
@@ -30,6 +62,8 @@ from .menu_component import (
 
 __all__ = [
     # Data handler
+    "CountryRepository",
+    "get_repository",
     "load_countries",
     "save_countries",
     "get_country",
@@ -37,6 +71,36 @@ __all__ = [
     "update_country",
     "delete_country",
     "list_countries",
+    "list_countries_sorted",
+    "get_cache_stats",
+    "find_by_field",
+    "find_by_city",
+    "find_matching",
+    "find_similar",
+    "find_by_query",
+    "explain_query",
+    "lookup_phone_number",
+    "lookup_phone_file",
+    "validate_postal_code",
+    "find_postal_countries",
+    "validate_postal_file",
+    "get_language_index",
+    "get_columnar_table",
+    "get_border_graph",
+    "get_aggregates",
+    "get_report",
+    "verify_aggregates",
+    "take_snapshot",
+    "list_snapshots",
+    "diff_snapshots",
+    "get_snapshot_series",
+    "restore_snapshot",
+    "prune_snapshots",
+    "migrate_json_to_sqlite",
+    "batch",
+    "add_city",
+    "rename_city",
+    "delete_city",
     # Filter
     "filter_by_field",
     "search_countries",
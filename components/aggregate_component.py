@@ -0,0 +1,174 @@
+"""
+Aggregate Component - Dashboard counts maintained incrementally on every write.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .index_component import common_prefix
+from .language_component import parse_languages
+
+# Counted dimensions and the record field each one comes from
+AGGREGATE_FIELDS = {
+    "currency": "currency_code",
+    "tld": "tld",
+    "language": "languages",
+    "continent": "continent",
+    "city": "cities",
+}
+
+
+def _scalar_keys(country: dict) -> Iterator[Tuple[str, str]]:
+    """(kind, value) pairs a record contributes, cities excluded."""
+    for kind, field in AGGREGATE_FIELDS.items():
+        if kind == "city":
+            continue
+        value = country.get(field)
+        if not value:
+            continue
+        if kind == "language":
+            for tag, _, _ in parse_languages(value):
+                yield kind, tag
+        else:
+            yield kind, str(value)
+
+
+def aggregate_delta(old: Optional[dict], new: Optional[dict]) -> Dict[Tuple[str, str], int]:
+    """
+    Signed count changes of replacing one record by another.
+
+    Args:
+        old: Previous record (None for an insert)
+        new: New record (None for a delete)
+
+    Returns:
+        Mapping of (kind, value) -> delta; totals use kind "total" with
+        the keys "countries" and "cities"
+    """
+    delta: Counter = Counter()
+    # Cities both records share at the front cancel out
+    shared = common_prefix(old.get("cities") or [], new.get("cities") or []) if old and new else 0
+    for record, sign in ((old, -1), (new, 1)):
+        if record is None:
+            continue
+        cities = record.get("cities") or []
+        for pair in _scalar_keys(record):
+            delta[pair] += sign
+        for city in cities[shared:]:
+            delta[("city", city)] += sign
+        delta[("total", "countries")] += sign
+        delta[("total", "cities")] += sign * len(cities)
+    return {pair: n for pair, n in delta.items() if n}
+
+
+class AggregateStore:
+    """
+    Value counts of the whole dataset (currencies, TLDs, language tags,
+    continents and city names) plus the country and city totals.
+
+    add/remove/replace adjust the counts by what a single record
+    contributes, so a write costs O(changed record) instead of a pass
+    over the dataset. For a city change only the city list from the
+    first changed position onwards is re-counted.
+    """
+
+    def __init__(self, countries: Iterable[dict] = ()):
+        self.counts: Dict[str, Counter] = {kind: Counter() for kind in AGGREGATE_FIELDS}
+        self.countries = 0
+        self.cities = 0
+        for country in countries:
+            self.add(country)
+
+    def _count(self, pairs: Iterable[Tuple[str, str]], delta: int):
+        counts = self.counts
+        for kind, key in pairs:
+            counter = counts[kind]
+            counter[key] += delta
+            if counter[key] <= 0:
+                del counter[key]
+
+    def _count_cities(self, cities: List[str], delta: int, start: int = 0):
+        self._count((("city", city) for city in cities[start:]), delta)
+        self.cities += delta * max(len(cities) - start, 0)
+
+    def add(self, country: dict):
+        """Count a new record."""
+        self.countries += 1
+        self._count(_scalar_keys(country), 1)
+        self._count_cities(country.get("cities") or [], 1)
+
+    def remove(self, country: dict):
+        """Uncount a deleted record."""
+        self.countries -= 1
+        self._count(_scalar_keys(country), -1)
+        self._count_cities(country.get("cities") or [], -1)
+
+    def replace(self, old: dict, new: dict):
+        """Move the counts of a record to its updated version."""
+        if any(old.get(field) != new.get(field) for kind, field in AGGREGATE_FIELDS.items() if kind != "city"):
+            self._count(_scalar_keys(old), -1)
+            self._count(_scalar_keys(new), 1)
+        old_cities = old.get("cities") or []
+        new_cities = new.get("cities") or []
+        start = common_prefix(old_cities, new_cities)
+        self._count_cities(old_cities, -1, start)
+        self._count_cities(new_cities, 1, start)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, int]]) -> "AggregateStore":
+        """Build a store from (kind, value, count) rows as kept by the SQLite backend."""
+        store = cls()
+        for kind, key, count in rows:
+            if kind == "total":
+                if key in ("countries", "cities"):
+                    setattr(store, key, count)
+            elif kind in store.counts:
+                store.counts[kind][key] = count
+        return store
+
+    def top(self, kind: str, limit: int = 5) -> List[Tuple[str, int]]:
+        """Most common values of a dimension (ties in value order)."""
+        return sorted(self.counts[kind].items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def to_dict(self) -> dict:
+        """Serializable form, stored next to the data."""
+        return {
+            "countries": self.countries,
+            "cities": self.cities,
+            "counts": {kind: dict(counter) for kind, counter in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional["AggregateStore"]:
+        """Rebuild a store from to_dict() output (None if the data is unusable)."""
+        try:
+            store = cls()
+            store.countries = int(data["countries"])
+            store.cities = int(data["cities"])
+            for kind, values in data["counts"].items():
+                if kind in store.counts:
+                    store.counts[kind] = Counter({key: int(n) for key, n in values.items()})
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+        return store
+
+    def drift(self, expected: "AggregateStore") -> List[str]:
+        """
+        Compare against a store recomputed from scratch.
+
+        Args:
+            expected: Freshly built AggregateStore
+
+        Returns:
+            One line per differing total or count (empty if consistent)
+        """
+        lines = []
+        for name in ("countries", "cities"):
+            stored, actual = getattr(self, name), getattr(expected, name)
+            if stored != actual:
+                lines.append(f"total {name}: stored {stored}, actual {actual}")
+        for kind in AGGREGATE_FIELDS:
+            stored, actual = self.counts[kind], expected.counts[kind]
+            for key in sorted(set(stored) | set(actual)):
+                if stored[key] != actual[key]:
+                    lines.append(f"{kind} '{key}': stored {stored[key]}, actual {actual[key]}")
+        return lines
@@ -1,45 +1,437 @@
 """
 Analytics Component - Statistics and data analysis.
+
+Statistics are described as metrics (TopValues, DistinctCount,
+CrossTab, NumericSummary, Ratio, ...) and computed together by run_metrics: on a
+ColumnarTable through its encoded columns, on a list of records in a
+single pass. Metrics the incrementally maintained AggregateStore can
+answer are read from it directly. The result is a plain dict of
+JSON-serializable values that the dashboard, the PDF report and the
+JSON export all render.
 """
-from typing import List, Dict, Tuple
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from collections import Counter
 
-def get_general_stats(countries: List[dict]) -> Dict:
+from .aggregate_component import AGGREGATE_FIELDS, AggregateStore
+from .columnar_component import ColumnarTable, percentile, split_values, summarize, to_number
+from .journal_component import write_json_atomic
+
+Dataset = Union[List[dict], ColumnarTable]
+
+# Record field -> AggregateStore dimension
+_AGGREGATE_KINDS = {field: kind for kind, field in AGGREGATE_FIELDS.items()}
+
+# Fields whose string value holds several comma-separated elements
+_LIST_FIELDS = ("languages",)
+
+
+def _field_values(country: dict, field: str) -> List[str]:
+    """Elements of a field, encoded the same way as ColumnarTable columns."""
+    value = country.get(field)
+    if field in _LIST_FIELDS or isinstance(value, (list, tuple)):
+        return split_values(field, value)
+    return [str(value)] if value is not None and value != "" else []
+
+
+def _number(values: Dict[str, List[str]], field: str) -> Optional[float]:
+    elements = values[field]
+    return to_number(elements[0]) if elements else None
+
+
+def _group(values: Dict[str, List[str]], by: Optional[str]) -> Optional[str]:
+    """Group key of a record: its value of ``by`` ("" when ungrouped, None when missing)."""
+    if by is None:
+        return ""
+    elements = values[by]
+    return elements[0] if elements else None
+
+
+def _rounded(value):
+    return round(value, 2) if isinstance(value, float) else value
+
+
+def _ranked(counts: Dict[str, int], limit: Optional[int]) -> List[List]:
+    """[value, count] pairs by descending count, ties in value order."""
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [[value, n] for value, n in (ranked[:limit] if limit is not None else ranked)]
+
+
+class Metric(ABC):
+    """
+    One statistic of a run_metrics pass.
+
+    Metric objects hold no state: start() creates the per-run state,
+    update() feeds it one record's field values and finish() turns it
+    into the result. from_table()/from_aggregates() return None when
+    the metric cannot be answered from that source.
+    """
+
+    fields: Tuple[str, ...] = ()
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def start(self):
+        return Counter()
+
+    @abstractmethod
+    def update(self, state, values: Dict[str, List[str]]):
+        """Feed one record's field values into the state."""
+
+    @abstractmethod
+    def finish(self, state):
+        """Turn the state into the result."""
+
+    def from_table(self, table: ColumnarTable):
+        return None
+
+    def from_aggregates(self, aggregates: AggregateStore):
+        return None
+
+
+class RowCount(Metric):
+    """Number of records."""
+
+    def __init__(self, name: str = "total"):
+        super().__init__(name)
+
+    def start(self):
+        return [0]
+
+    def update(self, state, values):
+        state[0] += 1
+
+    def finish(self, state):
+        return state[0]
+
+    def from_table(self, table):
+        return table.size
+
+    def from_aggregates(self, aggregates):
+        return aggregates.countries
+
+
+class TopValues(Metric):
+    """Most common values of a field as [value, count] pairs (all values if limit is None)."""
+
+    def __init__(self, field: str, limit: Optional[int] = 5, name: Optional[str] = None):
+        super().__init__(name or f"top_{field}")
+        self.fields = (field,)
+        self.limit = limit
+
+    def update(self, state, values):
+        state.update(values[self.fields[0]])
+
+    def finish(self, state):
+        return _ranked(state, self.limit)
+
+    def from_table(self, table):
+        try:
+            return _ranked(table.group_count(self.fields[0]), self.limit)
+        except KeyError:
+            return None
+
+    def from_aggregates(self, aggregates):
+        kind = _AGGREGATE_KINDS.get(self.fields[0])
+        return _ranked(aggregates.counts[kind], self.limit) if kind else None
+
+
+class DistinctCount(Metric):
+    """Number of distinct values of a field."""
+
+    def __init__(self, field: str, name: Optional[str] = None):
+        super().__init__(name or f"distinct_{field}")
+        self.fields = (field,)
+
+    def start(self):
+        return set()
+
+    def update(self, state, values):
+        state.update(values[self.fields[0]])
+
+    def finish(self, state):
+        return len(state)
+
+    def from_table(self, table):
+        try:
+            return len(table.group_count(self.fields[0]))
+        except KeyError:
+            return None
+
+    def from_aggregates(self, aggregates):
+        kind = _AGGREGATE_KINDS.get(self.fields[0])
+        return len(aggregates.counts[kind]) if kind else None
+
+
+class CrossTab(Metric):
+    """
+    Counts of value pairs of two fields, e.g. currency x language.
+
+    The result maps each row value to its most common column values
+    (at most ``limit`` of them) as [value, count] pairs.
+    """
+
+    def __init__(self, rows: str, columns: str, limit: Optional[int] = None, name: Optional[str] = None):
+        super().__init__(name or f"{rows}_by_{columns}")
+        self.fields = (rows, columns)
+        self.limit = limit
+
+    def start(self):
+        return {}
+
+    def update(self, state, values):
+        rows, columns = values[self.fields[0]], values[self.fields[1]]
+        for row in rows:
+            counter = state.get(row)
+            if counter is None:
+                counter = state[row] = Counter()
+            counter.update(columns)
+
+    def finish(self, state):
+        return {row: _ranked(counts, self.limit) for row, counts in sorted(state.items()) if counts}
+
+    def from_table(self, table):
+        try:
+            return self.finish(table.crosstab(*self.fields))
+        except (KeyError, ValueError):
+            return None
+
+
+class LengthDistribution(Metric):
+    """Distribution of the number of elements per record (e.g. cities per country)."""
+
+    def __init__(self, field: str = "cities", name: Optional[str] = None):
+        super().__init__(name or f"{field}_per_record")
+        self.fields = (field,)
+
+    def update(self, state, values):
+        state[len(values[self.fields[0]])] += 1
+
+    def finish(self, state):
+        rows = sum(state.values())
+        total = sum(length * n for length, n in state.items())
+        return {
+            "min": min(state) if state else 0,
+            "max": max(state) if state else 0,
+            "mean": round(total / rows, 2) if rows else 0.0,
+            "total": total,
+            "histogram": {length: state[length] for length in sorted(state)},
+        }
+
+    def from_table(self, table):
+        try:
+            return self.finish(Counter(table.lengths(self.fields[0])))
+        except KeyError:
+            return None
+
+
+class NumericSummary(Metric):
+    """
+    Count, sum, mean, min, max and percentiles of a numeric field, for
+    the whole dataset or per value of a grouping field (e.g. continent).
+
+    Grouped results map each group value to its summary; percentiles
+    appear as "p25", "p50", ... keys.
+    """
+
+    def __init__(self, field: str, by: Optional[str] = None,
+                 percentiles: Sequence[float] = (25, 50, 75), name: Optional[str] = None):
+        super().__init__(name or (f"{field}_by_{by}" if by else field))
+        self.fields = (field, by) if by else (field,)
+        self.by = by
+        self.percentiles = tuple(percentiles)
+
+    def start(self):
+        return {}
+
+    def update(self, state, values):
+        number, group = _number(values, self.fields[0]), _group(values, self.by)
+        if number is not None and group is not None:
+            state.setdefault(group, []).append(number)
+
+    def _result(self, summary: dict, percentiles: dict) -> dict:
+        result = {key: _rounded(value) for key, value in summary.items()}
+        result.update({f"p{q:g}": _rounded(value) for q, value in percentiles.items()})
+        return result
+
+    def finish(self, state):
+        results = {}
+        for group, numbers in sorted(state.items()):
+            ordered = sorted(numbers)
+            results[group] = self._result(summarize(numbers), {q: percentile(ordered, q) for q in self.percentiles})
+        if self.by is None:
+            return results.get("") or self._result(summarize([]), {q: None for q in self.percentiles})
+        return results
+
+    def from_table(self, table):
+        field, by = self.fields[0], self.by
+        try:
+            summary = table.summary(field, by)
+            percentiles = table.percentiles(field, self.percentiles, by)
+        except (KeyError, ValueError):
+            return None
+        if by is None:
+            return self._result(summary, percentiles)
+        return {group: self._result(summary[group], percentiles[group]) for group in summary}
+
+
+class Ratio(Metric):
+    """
+    Ratio of two field sums, e.g. population density as total
+    population over total area, overall or per group.
+    """
+
+    weighted = False
+
+    def __init__(self, numerator: str, denominator: str, by: Optional[str] = None, name: Optional[str] = None):
+        super().__init__(name or f"{numerator}_per_{denominator}" + (f"_by_{by}" if by else ""))
+        self.fields = (numerator, denominator) + ((by,) if by else ())
+        self.by = by
+
+    def start(self):
+        return {}
+
+    def update(self, state, values):
+        value, weight = _number(values, self.fields[0]), _number(values, self.fields[1])
+        group = _group(values, self.by)
+        if value is None or weight is None or group is None:
+            return
+        sums = state.setdefault(group, [0.0, 0.0])
+        sums[0] += value * weight if self.weighted else value
+        sums[1] += weight
+
+    def finish(self, state):
+        results = {group: _rounded(top / bottom) if bottom else None for group, (top, bottom) in sorted(state.items())}
+        return results.get("") if self.by is None else results
+
+    def from_table(self, table):
+        compute = table.weighted_mean if self.weighted else table.ratio
+        try:
+            result = compute(self.fields[0], self.fields[1], self.by)
+        except (KeyError, ValueError):
+            return None
+        if self.by is None:
+            return _rounded(result)
+        return {group: _rounded(value) for group, value in result.items()}
+
+
+class WeightedMean(Ratio):
+    """Mean of a numeric field weighted by another (e.g. area weighted by population)."""
+
+    weighted = True
+
+    def __init__(self, field: str, weights: str, by: Optional[str] = None, name: Optional[str] = None):
+        super().__init__(field, weights, by, name or f"{field}_weighted_by_{weights}" + (f"_by_{by}" if by else ""))
+
+
+# Statistics shown on the dashboard, in the PDF report and in exports
+REPORT_METRICS = (
+    RowCount("countries"),
+    TopValues("currency_code", 5, name="top_currencies"),
+    TopValues("tld", 5, name="top_tlds"),
+    TopValues("languages", 5, name="top_languages"),
+    DistinctCount("currency_code", name="distinct_currencies"),
+    DistinctCount("languages", name="distinct_languages"),
+    CrossTab("currency_code", "languages", limit=3, name="languages_by_currency"),
+    LengthDistribution("cities", name="cities_per_country"),
+    NumericSummary("population", name="population"),
+    NumericSummary("area", name="area"),
+    Ratio("population", "area", name="density"),
+    WeightedMean("area", "population", name="population_weighted_area"),
+    NumericSummary("population", by="continent", percentiles=(50,), name="population_by_continent"),
+    Ratio("population", "area", by="continent", name="density_by_continent"),
+    NumericSummary("population", by="currency_code", percentiles=(), name="population_by_currency"),
+)
+
+
+def run_metrics(
+    countries: Dataset,
+    metrics: Sequence[Metric] = REPORT_METRICS,
+    aggregates: Optional[AggregateStore] = None,
+) -> Dict[str, object]:
+    """
+    Compute several metrics together.
+
+    Metrics are answered from the aggregates when given, then from the
+    columns of a ColumnarTable; whatever is left is computed in one pass
+    over the records, each field being split/parsed once per record.
+
+    Args:
+        countries: Records or a ColumnarTable of them
+        metrics: Metrics to compute
+        aggregates: Optional incrementally maintained counts
+
+    Returns:
+        Dict of metric name -> result, in metric order
+    """
+    results: Dict[str, object] = {}
+    pending = []
+    for metric in metrics:
+        result = metric.from_aggregates(aggregates) if aggregates is not None else None
+        if result is None and isinstance(countries, ColumnarTable):
+            result = metric.from_table(countries)
+        if result is None:
+            pending.append(metric)
+        results[metric.name] = result
+
+    if pending:
+        records = countries.records if isinstance(countries, ColumnarTable) else countries
+        fields = {field for metric in pending for field in metric.fields}
+        states = [metric.start() for metric in pending]
+        for country in records:
+            values = {field: _field_values(country, field) for field in fields}
+            for metric, state in zip(pending, states):
+                metric.update(state, values)
+        for metric, state in zip(pending, states):
+            results[metric.name] = metric.finish(state)
+    return results
+
+
+def export_report(report: Dict[str, object], path: str) -> tuple[bool, str]:
+    """
+    Write a run_metrics result to a JSON file.
+
+    Args:
+        report: Result of run_metrics
+        path: Output file
+
+    Returns:
+        Tuple of (success, output path or error message)
+    """
+    try:
+        write_json_atomic(path, report)
+    except (OSError, TypeError, ValueError) as e:
+        return False, f"Error exporting statistics: {e}"
+    return True, path
+
+
+def get_general_stats(countries: Dataset) -> Dict:
     """
     Calculate general statistics for countries.
     """
-    total = len(countries)
+    total = run_metrics(countries, [RowCount()])["total"]
     if total == 0:
         return {"total": 0}
-        
+
     return {
         "total": total,
     }
 
-def get_currency_stats(countries: List[dict]) -> List[Tuple[str, int]]:
+def get_currency_stats(countries: Dataset) -> List[Tuple[str, int]]:
     """
     Get top currencies.
     """
-    currencies = [c.get('currency_code') for c in countries if c.get('currency_code')]
-    return Counter(currencies).most_common(5)
+    return [tuple(pair) for pair in run_metrics(countries, [TopValues("currency_code", 5)])["top_currency_code"]]
 
-def get_tld_stats(countries: List[dict]) -> List[Tuple[str, int]]:
+def get_tld_stats(countries: Dataset) -> List[Tuple[str, int]]:
     """
     Get generic TLD info (just a count of unique ones).
     """
-    tlds = [c.get('tld') for c in countries if c.get('tld')]
-    return Counter(tlds).most_common(5)
+    return [tuple(pair) for pair in run_metrics(countries, [TopValues("tld", 5)])["top_tld"]]
 
-def get_language_stats(countries: List[dict]) -> List[Tuple[str, int]]:
+def get_language_stats(countries: Dataset) -> List[Tuple[str, int]]:
     """
-    Get top languages (parsing comma separated string).
+    Get top languages (parsed language tags).
     """
-    all_langs = []
-    for c in countries:
-        langs = c.get('languages', '')
-        if langs:
-            # simple split by comma
-            for l in langs.split(','):
-                all_langs.append(l.strip())
-                
-    return Counter(all_langs).most_common(5)
+    return [tuple(pair) for pair in run_metrics(countries, [TopValues("languages", 5)])["top_languages"]]
@@ -0,0 +1,83 @@
+"""
+Cache Component - Bounded LRU cache for query results.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from .constants import RESULT_CACHE_SIZE
+
+
+class ResultCache:
+    """
+    LRU cache of query results keyed on (operation, normalized args, version).
+
+    The dataset version is part of the key, so a write never serves stale
+    results. When a new version is first seen, entries of older versions
+    are dropped at once instead of waiting to be evicted.
+    """
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, op: str, args: Hashable, version: int, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for a call, computing it on a miss.
+
+        Args:
+            op: Operation name (e.g. "search")
+            args: Normalized, hashable arguments
+            version: Current dataset version
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            The cached or freshly computed result
+        """
+        key = (op, args, version)
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                    self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            if version == self._version and self.maxsize > 0:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        """Drop every cached result (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Report hit/miss/eviction counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,547 @@
+"""
+Columnar Component - Dictionary-encoded column store for vectorized filters and counts.
+
+Each categorical column keeps one small integer code per row plus the
+list of distinct values; list-valued columns (languages, cities) keep a
+flat code array with per-row offsets. Filters produce row masks that
+combine with &, | and ~, and group-by counts work on the code arrays.
+Numeric columns (area, population) hold floats; sums, means,
+percentiles and ratios are grouped by the codes of a categorical column.
+
+NumPy is used when installed. Without it the same operations run on
+bytearray masks and array('i') codes, whose combining and counting are
+still done by C-level builtins (int.from_bytes, bytes.translate,
+itertools.compress, Counter) rather than per-row Python code.
+"""
+from array import array
+from collections import Counter
+from itertools import compress
+from math import floor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .language_component import parse_languages
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Columns encoded by default
+CATEGORICAL_COLUMNS = ("currency_code", "currency_name", "tld", "continent")
+MULTI_VALUE_COLUMNS = ("languages", "cities")
+NUMERIC_COLUMNS = ("area", "population", "iso_numeric")
+
+# Code 0 of every dictionary stands for a missing/empty value
+_MISSING = 0
+
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+def split_values(column: str, value) -> List[str]:
+    """Elements of a list-valued field (languages are parsed into tags)."""
+    if column == "languages":
+        return [tag for tag, _, _ in parse_languages(value if isinstance(value, str) else "")]
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if v]
+    return [part.strip() for part in str(value or "").split(",") if part.strip()]
+
+
+def to_number(value) -> Optional[float]:
+    """Float value of a numeric field (None when missing or unparsable)."""
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def percentile(ordered: Sequence[float], q: float) -> Optional[float]:
+    """
+    Percentile of sorted numbers, interpolating linearly between ranks
+    (NumPy's default method).
+
+    Args:
+        ordered: Numbers in ascending order
+        q: Percentile in [0, 100]
+
+    Returns:
+        The percentile, or None for an empty sequence
+    """
+    if not len(ordered):
+        return None
+    position = (len(ordered) - 1) * q / 100
+    low = floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (position - low))
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Count, sum, mean, min and max of some numbers."""
+    total = 0.0
+    for value in values:
+        total += value
+    count = len(values)
+    return {
+        "count": count,
+        "sum": total,
+        "mean": total / count if count else None,
+        "min": min(values) if count else None,
+        "max": max(values) if count else None,
+    }
+
+
+class Mask:
+    """Boolean row selection over a ColumnarTable."""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits):
+        # numpy bool array, or bytearray of 0/1 bytes
+        self.bits = bits
+
+    def __and__(self, other: "Mask") -> "Mask":
+        if NUMPY_AVAILABLE:
+            return Mask(self.bits & other.bits)
+        return Mask(self._combine(other, int.__and__))
+
+    def __or__(self, other: "Mask") -> "Mask":
+        if NUMPY_AVAILABLE:
+            return Mask(self.bits | other.bits)
+        return Mask(self._combine(other, int.__or__))
+
+    def __invert__(self) -> "Mask":
+        if NUMPY_AVAILABLE:
+            return Mask(~self.bits)
+        return Mask(bytearray(self.bits.translate(_INVERT)))
+
+    def _combine(self, other: "Mask", op) -> bytearray:
+        size = len(self.bits)
+        value = op(int.from_bytes(self.bits, "little"), int.from_bytes(other.bits, "little"))
+        return bytearray(value.to_bytes(size, "little"))
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    def count(self) -> int:
+        """Number of selected rows."""
+        if NUMPY_AVAILABLE:
+            return int(self.bits.sum())
+        return self.bits.count(1)
+
+    def indices(self) -> List[int]:
+        """Positions of the selected rows."""
+        if NUMPY_AVAILABLE:
+            return np.flatnonzero(self.bits).tolist()
+        return list(compress(range(len(self.bits)), self.bits))
+
+
+class ColumnarTable:
+    """
+    Column-oriented copy of the dataset, built once per data version
+    (see repository.derived).
+
+    Args:
+        records: Country records
+        categorical: Single-valued string columns to dictionary-encode
+        multi: List-valued columns (lists, or comma-separated strings)
+        numeric: Number columns (missing or unparsable values are NaN/None)
+    """
+
+    def __init__(
+        self,
+        records: Iterable[dict],
+        categorical: Sequence[str] = CATEGORICAL_COLUMNS,
+        multi: Sequence[str] = MULTI_VALUE_COLUMNS,
+        numeric: Sequence[str] = NUMERIC_COLUMNS,
+    ):
+        self.records: List[dict] = list(records)
+        self.size = len(self.records)
+        self.categories: Dict[str, List[Optional[str]]] = {}
+        self._lookup: Dict[str, Dict[str, int]] = {}
+        self._codes: Dict[str, object] = {}
+        self._offsets: Dict[str, object] = {}
+        self._rows: Dict[str, object] = {}
+        self._numbers: Dict[str, object] = {}
+
+        for column in categorical:
+            lookup = self._dictionary(column)
+            codes = array("i", (self._code(lookup, column, r.get(column)) for r in self.records))
+            self._codes[column] = self._int_array(codes)
+
+        for column in multi:
+            lookup = self._dictionary(column)
+            codes, offsets, rows = array("i"), array("i", [0]), array("i")
+            for row, record in enumerate(self.records):
+                values = split_values(column, record.get(column))
+                codes.extend(self._code(lookup, column, v) for v in values)
+                rows.extend([row] * len(values))
+                offsets.append(len(codes))
+            self._codes[column] = self._int_array(codes)
+            self._offsets[column] = self._int_array(offsets)
+            self._rows[column] = self._int_array(rows)
+
+        for column in numeric:
+            values = [to_number(r.get(column)) for r in self.records]
+            if NUMPY_AVAILABLE:
+                values = np.array([np.nan if v is None else v for v in values], dtype=float)
+            self._numbers[column] = values
+
+    @property
+    def backend(self) -> str:
+        return "numpy" if NUMPY_AVAILABLE else "python"
+
+    def _dictionary(self, column: str) -> Dict[str, int]:
+        self.categories[column] = [None]
+        self._lookup[column] = {}
+        return self._lookup[column]
+
+    def _code(self, lookup: Dict[str, int], column: str, value) -> int:
+        if value is None or value == "":
+            return _MISSING
+        value = str(value)
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return code
+
+    @staticmethod
+    def _int_array(values: array):
+        return np.frombuffer(values, dtype=np.int32).copy() if NUMPY_AVAILABLE else values
+
+    def _column(self, column: str, table: dict):
+        if column not in table:
+            raise KeyError(f"Column '{column}' is not encoded")
+        return table[column]
+
+    # -- masks -------------------------------------------------------------
+
+    def all(self) -> Mask:
+        """Mask selecting every row."""
+        if NUMPY_AVAILABLE:
+            return Mask(np.ones(self.size, dtype=bool))
+        return Mask(bytearray(b"\x01" * self.size))
+
+    def isin(self, column: str, values: Iterable[str]) -> Mask:
+        """
+        Rows whose value (or, for list columns, any element) is one of the values.
+
+        Args:
+            column: Encoded column name
+            values: Exact values to match
+
+        Returns:
+            Row mask
+        """
+        codes = self._column(column, self._codes)
+        lookup = self._lookup[column]
+        wanted = {lookup[v] for v in values if v in lookup}
+        if column in self._offsets:
+            return self._rows_with(column, wanted)
+        if NUMPY_AVAILABLE:
+            return Mask(np.isin(codes, list(wanted)))
+        return Mask(bytearray(map(wanted.__contains__, codes)))
+
+    def equals(self, column: str, value: str) -> Mask:
+        """Rows whose value (or any list element) equals the value."""
+        return self.isin(column, [value])
+
+    def _rows_with(self, column: str, wanted: set) -> Mask:
+        codes, rows = self._codes[column], self._rows[column]
+        if NUMPY_AVAILABLE:
+            bits = np.zeros(self.size, dtype=bool)
+            bits[rows[np.isin(codes, list(wanted))]] = True
+            return Mask(bits)
+        bits = bytearray(self.size)
+        for row in compress(rows, map(wanted.__contains__, codes)):
+            bits[row] = 1
+        return Mask(bits)
+
+    def between(self, column: str, low: Optional[float] = None, high: Optional[float] = None) -> Mask:
+        """Rows whose number lies in [low, high] (missing values never match)."""
+        values = self._column(column, self._numbers)
+        if NUMPY_AVAILABLE:
+            bits = ~np.isnan(values)
+            if low is not None:
+                bits &= values >= low
+            if high is not None:
+                bits &= values <= high
+            return Mask(bits)
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        return Mask(bytearray(v is not None and low <= v <= high for v in values))
+
+    def rows(self, mask: Optional[Mask] = None) -> List[dict]:
+        """Records selected by a mask (all records without one)."""
+        if mask is None:
+            return list(self.records)
+        if NUMPY_AVAILABLE:
+            return [self.records[i] for i in mask.indices()]
+        return list(compress(self.records, mask.bits))
+
+    # -- aggregates --------------------------------------------------------
+
+    def group_count(self, column: str, mask: Optional[Mask] = None) -> Counter:
+        """
+        Count rows per value of a column (list elements are counted once each).
+
+        Args:
+            column: Encoded column name
+            mask: Optional row selection
+
+        Returns:
+            Counter of value -> count (missing values are not counted)
+        """
+        codes = self._column(column, self._codes)
+        if mask is not None:
+            if column in self._rows:
+                selected = mask.bits[self._rows[column]] if NUMPY_AVAILABLE else map(
+                    mask.bits.__getitem__, self._rows[column])
+            else:
+                selected = mask.bits
+            codes = codes[selected] if NUMPY_AVAILABLE else compress(codes, selected)
+        categories = self.categories[column]
+        if NUMPY_AVAILABLE:
+            counts = np.bincount(codes, minlength=len(categories))
+            return Counter({categories[code]: int(n) for code, n in enumerate(counts) if n and code != _MISSING})
+        counts = Counter(codes)
+        counts.pop(_MISSING, None)
+        # Code order, like bincount, so ties rank the same on both backends
+        return Counter({categories[code]: counts[code] for code in sorted(counts)})
+
+    def is_list(self, column: str) -> bool:
+        """True for list-valued columns (languages, cities)."""
+        return column in self._offsets
+
+    def crosstab(self, rows: str, columns: str, mask: Optional[Mask] = None) -> Dict[str, Counter]:
+        """
+        Count value pairs of two columns (at most one of them list-valued).
+
+        Args:
+            rows: Column giving the outer keys
+            columns: Column giving the inner keys
+            mask: Optional row selection
+
+        Returns:
+            Dict of row value -> Counter of column value -> count
+        """
+        a, b = self._column(rows, self._codes), self._column(columns, self._codes)
+        if self.is_list(rows) and self.is_list(columns):
+            raise ValueError("Cannot cross two list-valued columns")
+        owner = self._rows.get(columns, self._rows.get(rows))
+        if owner is not None:
+            # Broadcast the single-valued column onto the list elements
+            take = (lambda codes: codes[owner]) if NUMPY_AVAILABLE else (
+                lambda codes: array("i", map(codes.__getitem__, owner)))
+            if self.is_list(columns):
+                a = take(a)
+            else:
+                b = take(b)
+        if mask is not None:
+            selected = mask.bits if owner is None else (
+                mask.bits[owner] if NUMPY_AVAILABLE else bytearray(map(mask.bits.__getitem__, owner)))
+        if NUMPY_AVAILABLE:
+            width = len(self.categories[columns])
+            keys = a.astype(np.int64) * width + b
+            if mask is not None:
+                keys = keys[selected]
+            values, counts = np.unique(keys, return_counts=True)
+            pairs = ((divmod(int(key), width), int(n)) for key, n in zip(values, counts))
+        else:
+            counts = Counter(zip(a, b) if mask is None else compress(zip(a, b), selected))
+            pairs = ((pair, counts[pair]) for pair in sorted(counts))
+        row_names, column_names = self.categories[rows], self.categories[columns]
+        table: Dict[str, Counter] = {}
+        for (row, column), n in pairs:
+            if row != _MISSING and column != _MISSING:
+                table.setdefault(row_names[row], Counter())[column_names[column]] = n
+        return table
+
+    def lengths(self, column: str) -> List[int]:
+        """Number of elements per row of a list column (e.g. cities per country)."""
+        offsets = self._column(column, self._offsets)
+        if NUMPY_AVAILABLE:
+            return np.diff(offsets).tolist()
+        return list(map(int.__sub__, offsets[1:], offsets[:-1]))
+
+    def values(self, column: str) -> list:
+        """Numbers of a numeric column (None for missing values)."""
+        values = self._column(column, self._numbers)
+        if NUMPY_AVAILABLE:
+            return [None if np.isnan(v) else float(v) for v in values]
+        return list(values)
+
+    # -- numeric aggregates ------------------------------------------------
+
+    def _numeric_rows(self, columns: Sequence[str], by: Optional[str], mask: Optional[Mask]) -> Tuple[object, list]:
+        """
+        Group codes and values of the selected rows where every column has a
+        number (and the group column a value).
+
+        Without a group column every row gets code 0.
+        """
+        values = [self._column(column, self._numbers) for column in columns]
+        codes = None
+        if by is not None:
+            codes = self._column(by, self._codes)
+            if self.is_list(by):
+                raise ValueError("Cannot group numbers by a list-valued column")
+        if NUMPY_AVAILABLE:
+            keep = np.ones(self.size, dtype=bool) if mask is None else mask.bits.copy()
+            for column in values:
+                keep &= ~np.isnan(column)
+            if codes is not None:
+                keep &= codes != _MISSING
+                groups = codes[keep]
+            else:
+                groups = np.zeros(int(keep.sum()), dtype=np.int32)
+            return groups, [column[keep] for column in values]
+        rows = range(self.size) if mask is None else compress(range(self.size), mask.bits)
+        keep = [
+            row for row in rows
+            if all(column[row] is not None for column in values) and (codes is None or codes[row] != _MISSING)
+        ]
+        groups = [codes[row] for row in keep] if codes is not None else [0] * len(keep)
+        return groups, [[column[row] for row in keep] for column in values]
+
+    def _by_group(self, by: Optional[str], results: Dict[int, object]):
+        """Key per-code results by group value (a single result without a group column)."""
+        if by is None:
+            return results.get(0)
+        names = self.categories[by]
+        return {names[code]: results[code] for code in sorted(results, key=lambda code: names[code])}
+
+    def _group_slices(self, groups, values) -> Dict[int, list]:
+        """Sorted values per group code."""
+        if NUMPY_AVAILABLE:
+            order = np.lexsort((values, groups))
+            groups, values = groups[order], values[order]
+            starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else []
+            ends = list(starts[1:]) + [len(groups)]
+            return {int(groups[a]): values[a:b] for a, b in zip(starts, ends)}
+        slices: Dict[int, list] = {}
+        for code, value in zip(groups, values):
+            slices.setdefault(code, []).append(value)
+        for ordered in slices.values():
+            ordered.sort()
+        return slices
+
+    def summary(self, column: str, by: Optional[str] = None, mask: Optional[Mask] = None):
+        """
+        Count, sum, mean, min and max of a numeric column.
+
+        Args:
+            column: Numeric column name
+            by: Optional single-valued column to group by (e.g. continent)
+            mask: Optional row selection
+
+        Returns:
+            Summary dict (see summarize), or a dict of group value -> summary
+            when grouped; rows with a missing number or group are skipped
+        """
+        groups, (values,) = self._numeric_rows([column], by, mask)
+        if not NUMPY_AVAILABLE:
+            per_group: Dict[int, list] = {}
+            for code, value in zip(groups, values):
+                per_group.setdefault(code, []).append(value)
+            results = {code: summarize(group) for code, group in per_group.items()}
+            if by is None and not results:
+                results[0] = summarize([])
+            return self._by_group(by, results)
+        width = len(self.categories[by]) if by is not None else 1
+        counts = np.bincount(groups, minlength=width)
+        sums = np.bincount(groups, weights=values, minlength=width)
+        lows = np.full(width, np.inf)
+        highs = np.full(width, -np.inf)
+        np.minimum.at(lows, groups, values)
+        np.maximum.at(highs, groups, values)
+        results = {}
+        for code in range(width):
+            count = int(counts[code])
+            if count or by is None:
+                results[code] = {
+                    "count": count,
+                    "sum": float(sums[code]),
+                    "mean": float(sums[code]) / count if count else None,
+                    "min": float(lows[code]) if count else None,
+                    "max": float(highs[code]) if count else None,
+                }
+        return self._by_group(by, results)
+
+    def percentiles(self, column: str, qs: Sequence[float] = (25, 50, 75),
+                    by: Optional[str] = None, mask: Optional[Mask] = None):
+        """
+        Percentiles of a numeric column (linear interpolation).
+
+        Args:
+            column: Numeric column name
+            qs: Percentiles to compute, in [0, 100]
+            by: Optional single-valued column to group by
+            mask: Optional row selection
+
+        Returns:
+            Dict of q -> value (None when there are no numbers), or a dict
+            of group value -> such a dict when grouped
+        """
+        groups, (values,) = self._numeric_rows([column], by, mask)
+        slices = self._group_slices(groups, values)
+        if by is None and not slices:
+            slices[0] = []
+        return self._by_group(by, {
+            code: {q: percentile(ordered, q) for q in qs} for code, ordered in slices.items()
+        })
+
+    def ratio(self, numerator: str, denominator: str, by: Optional[str] = None, mask: Optional[Mask] = None):
+        """
+        Ratio of two column sums, e.g. population density (population / area).
+
+        Only rows where both columns have a number are summed.
+
+        Args:
+            numerator: Numeric column summed above the line
+            denominator: Numeric column summed below the line
+            by: Optional single-valued column to group by
+            mask: Optional row selection
+
+        Returns:
+            The ratio (None when the denominator sums to 0), or a dict of
+            group value -> ratio when grouped
+        """
+        return self._weighted(numerator, denominator, by, mask, weighted=False)
+
+    def weighted_mean(self, column: str, weights: str, by: Optional[str] = None, mask: Optional[Mask] = None):
+        """
+        Mean of a column weighted by another, e.g. area weighted by population.
+
+        Args:
+            column: Numeric column to average
+            weights: Numeric column giving each row's weight
+            by: Optional single-valued column to group by
+            mask: Optional row selection
+
+        Returns:
+            The weighted mean (None when the weights sum to 0), or a dict of
+            group value -> weighted mean when grouped
+        """
+        return self._weighted(column, weights, by, mask, weighted=True)
+
+    def _weighted(self, column: str, weights: str, by: Optional[str], mask: Optional[Mask], weighted: bool):
+        groups, (values, scale) = self._numeric_rows([column, weights], by, mask)
+        if NUMPY_AVAILABLE:
+            width = len(self.categories[by]) if by is not None else 1
+            tops = np.bincount(groups, weights=values * scale if weighted else values, minlength=width)
+            bottoms = np.bincount(groups, weights=scale, minlength=width)
+            present = np.bincount(groups, minlength=width)
+            sums = {code: (float(tops[code]), float(bottoms[code])) for code in range(width)
+                    if present[code] or by is None}
+        else:
+            sums = {0: (0.0, 0.0)} if by is None else {}
+            for code, value, weight in zip(groups, values, scale):
+                top, bottom = sums.get(code, (0.0, 0.0))
+                sums[code] = (top + (value * weight if weighted else value), bottom + weight)
+        return self._by_group(by, {
+            code: top / bottom if bottom else None for code, (top, bottom) in sums.items()
+        })
@@ -8,6 +8,59 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_FILE = os.path.join(BASE_DIR, "dados.json")
 SOURCE_FILE = os.path.join(BASE_DIR, "countryInfo.txt")
 USERS_FILE = os.path.join(BASE_DIR, "users.json")
+# Fingerprints of the last incremental import (see importer_component)
+IMPORT_STATE_FILE = os.path.join(BASE_DIR, "import_state.json")
+
+# Write-ahead journal: when enabled, each mutation appends one line to
+# JOURNAL_FILE instead of rewriting DATA_FILE. The journal is folded back
+# into DATA_FILE once it passes either threshold.
+JOURNAL_ENABLED = False
+JOURNAL_FILE = os.path.join(BASE_DIR, "dados.journal.jsonl")
+JOURNAL_COMPACT_MAX_BYTES = 1024 * 1024
+JOURNAL_COMPACT_MAX_OPS = 500
+JOURNAL_BACKGROUND_COMPACTION = True
+
+# Storage backend: "json" (DATA_FILE, optionally journaled) or "sqlite"
+# (SQLITE_FILE). The SQLite database is created from DATA_FILE on first use.
+STORAGE_BACKEND = "json"
+SQLITE_FILE = os.path.join(BASE_DIR, "dados.db")
+
+# Dataset history (see snapshot_component). Snapshots are taken from the
+# History menu; with SNAPSHOT_ON_SAVE also after every save_countries call
+# and import. Records the repository kept since the previous snapshot are
+# not hashed again.
+# Retention keeps the newest SNAPSHOT_KEEP_LAST snapshots plus the last
+# one of each of the newest SNAPSHOT_KEEP_DAILY days and
+# SNAPSHOT_KEEP_MONTHLY months; SNAPSHOT_PRUNE deletes the records and
+# manifests only dropped snapshots referred to.
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "snapshots")
+SNAPSHOT_ON_SAVE = False
+SNAPSHOT_KEEP_LAST = 10
+SNAPSHOT_KEEP_DAILY = 7
+SNAPSHOT_KEEP_MONTHLY = 12
+SNAPSHOT_PRUNE = True
+
+# Fuzzy name search (country and city names)
+FUZZY_MAX_DISTANCE = 2
+FUZZY_RESULT_LIMIT = 10
+FUZZY_TIME_BUDGET_MS = 50
+
+# Postal code validation (None workers = one per CPU)
+POSTAL_WORKERS = None
+POSTAL_CHUNK_SIZE = 10000
+
+# Query result cache (entries per repository)
+RESULT_CACHE_SIZE = 128
+
+# Border graph: breadth-first trees kept per data version (one per source country)
+BORDER_BFS_CACHE_SIZE = 64
+# Landlocked countries and territories (no sea coast; Caspian shores count as landlocked)
+LANDLOCKED_COUNTRIES = frozenset({
+    "AD", "AF", "AM", "AT", "AZ", "BF", "BI", "BO", "BT", "BW", "BY", "CF", "CH",
+    "CZ", "ET", "HU", "KG", "KZ", "LA", "LI", "LS", "LU", "MD", "MK", "ML", "MN",
+    "MW", "NE", "NP", "PY", "RS", "RW", "SK", "SM", "SS", "SZ", "TD", "TJ", "TM",
+    "UG", "UZ", "VA", "XK", "ZM", "ZW",
+})
 
 # Date/Time format
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -27,12 +80,19 @@ APP_INTRO = """A console application for managing country data with:
 # CountryInfo.txt parsing configurations
 # Mapping column indices (from countryInfo.txt) to Country TypedDict keys
 # Based on the file header:
-# ISO(0) ISO3(1) ... Country(4) ... tld(9) CurrencyCode(10) CurrencyName(11) 
+# ISO(0) ISO3(1) ISO-Numeric(2) fips(3) Country(4) Capital(5) Area(6)
+# Population(7) Continent(8) tld(9) CurrencyCode(10) CurrencyName(11) 
 # Phone(12) Postal Code Format(13) Postal Code Regex(14) Languages(15) geonameid(16)
+# neighbours(17) EquivalentFipsCode(18)
 CSV_MAPPING = {
     0: "iso",
     1: "iso3",
+    2: "iso_numeric",
     4: "country",
+    5: "capital",
+    6: "area",
+    7: "population",
+    8: "continent",
     9: "tld",
     10: "currency_code",
     11: "currency_name",
@@ -40,5 +100,29 @@ CSV_MAPPING = {
     13: "postal_code_format",
     14: "postal_code_regex",
     15: "languages",
-    16: "geonameid"
+    16: "geonameid",
+    17: "neighbours",
+}
+# Source columns converted on import (the others stay stripped strings).
+# Empty numeric cells become None; "list" splits comma-separated codes.
+CSV_FIELD_TYPES = {
+    "iso_numeric": "int",
+    "area": "float",
+    "population": "int",
+    "neighbours": "list",
+}
+# Lines may end before the trailing optional columns (neighbours, ...)
+CSV_REQUIRED_COLUMNS = 17
+
+# GeoNames cities dumps (cities500.txt, cities15000.txt, ...)
+# Columns: geonameid(0) name(1) asciiname(2) alternatenames(3) latitude(4)
+# longitude(5) feature class(6) feature code(7) country code(8) cc2(9)
+# admin1-4(10-13) population(14) elevation(15) dem(16) timezone(17) modified(18)
+CITIES_SOURCE_FILE = os.path.join(BASE_DIR, "cities15000.txt")
+GEONAMES_CITY_COLUMNS = {
+    1: "name",
+    8: "country_code",
+    14: "population",
 }
+# Number of cities committed per write during a cities import
+CITY_IMPORT_CHUNK_SIZE = 5000
@@ -1,154 +1,1110 @@
 """
 Data Handler Component - Manages CRUD operations for country data.
 """
+import hashlib
 import json
 import os
-from typing import List, Optional
+import threading
+from typing import List, Optional, Tuple
 
-from .constants import DATA_FILE
+from country_types import CountryRecord, copy_record
+from .constants import (
+    DATA_FILE,
+    JOURNAL_ENABLED,
+    JOURNAL_FILE,
+    JOURNAL_COMPACT_MAX_BYTES,
+    JOURNAL_COMPACT_MAX_OPS,
+    JOURNAL_BACKGROUND_COMPACTION,
+    RESULT_CACHE_SIZE,
+    SNAPSHOT_ON_SAVE,
+    STORAGE_BACKEND,
+    SQLITE_FILE,
+)
+from .aggregate_component import AggregateStore
+from .analytics_component import REPORT_METRICS, run_metrics
+from .cache_component import ResultCache
+from .columnar_component import ColumnarTable
+from .filter_component import search_countries
+from .fuzzy_component import FuzzyIndex
+from .graph_component import BorderGraph
+from .query_component import parse_query
+from .index_component import CountryIndex, apply_splice, list_splice, name_key
+from .journal_component import ChangeJournal, write_json_temp
+from .language_component import LanguageIndex
+from .phone_component import PhoneTrie, lookup_numbers_file
+from .postal_component import PostalValidator, validate_postal_csv
+from .search_index import FieldIndex, SearchIndex, normalize_text
+from .snapshot_component import SnapshotStore
+from .sqlite_component import SQLiteCountryRepository
+from .transaction_component import BatchOperationsMixin, Transaction
 
 # Get the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+def _content_fingerprint(countries: List[dict]) -> str:
+    """Hash of the serialized records, stored next to the aggregates computed from them."""
+    data = json.dumps(countries, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class CountryRepository(BatchOperationsMixin):
+    """
+    In-process store for the country dataset.
+
+    The parsed data is kept in memory and only re-read from disk when the
+    file's (mtime, size, inode) signature changes, i.e. when something
+    other than this repository modified it. Records are held in a
+    CountryIndex so lookups and duplicate checks are O(1).
+
+    In journal mode mutations are appended to a JSON-lines journal and
+    replayed on load; the journal is compacted into the data file once it
+    grows past the configured size or operation count.
+    """
+
+    def __init__(
+        self,
+        data_file: str = DATA_FILE,
+        journal_file: Optional[str] = None,
+        use_journal: bool = JOURNAL_ENABLED,
+        compact_max_bytes: int = JOURNAL_COMPACT_MAX_BYTES,
+        compact_max_ops: int = JOURNAL_COMPACT_MAX_OPS,
+        background_compaction: bool = JOURNAL_BACKGROUND_COMPACTION,
+        cache_size: int = RESULT_CACHE_SIZE,
+    ):
+        self.data_file = data_file
+        self.use_journal = use_journal
+        self.journal = ChangeJournal(journal_file or JOURNAL_FILE) if use_journal else None
+        self.compact_max_bytes = compact_max_bytes
+        self.compact_max_ops = compact_max_ops
+        self.background_compaction = background_compaction
+        self._index = CountryIndex()
+        self._aggregates = AggregateStore()
+        self._signature = None
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        # Bumped whenever the data file is rewritten or re-read; a
+        # background compaction only installs its snapshot if unchanged.
+        self._generation = 0
+        # Bumped on every reload or mutation; derived structures
+        # (search indexes etc.) are rebuilt lazily per version.
+        self.version = 0
+        self._derived: dict = {}
+        self._results = ResultCache(cache_size)
+
+    def _file_signature(self) -> Optional[tuple]:
+        """Return the (mtime, size, inode) signature of the data (and journal) file."""
+        try:
+            st = os.stat(self.data_file)
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            signature = None
+        if self.journal is None:
+            return signature
+        return (signature, self.journal.signature())
+
+    def _read_file(self) -> Tuple[List[dict], Optional[AggregateStore]]:
+        """Parse the data file (and its stored aggregates), replaying any journal entries."""
+        try:
+            with open(self.data_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError:
+            print("Error: Invalid JSON in data file")
+            data = {}
+        countries = data.get("countries", [])
+        aggregates = None
+        if "aggregates" in data and data.get("aggregates_fingerprint") == _content_fingerprint(countries):
+            # Otherwise the file was edited by something that did not
+            # maintain the aggregates; they are rebuilt from the records
+            aggregates = AggregateStore.from_dict(data["aggregates"])
+        if self.journal is None:
+            return countries, aggregates
+
+        index = CountryIndex(countries)
+        for entry in self.journal.read(after_seq=data.get("journal_seq", 0)):
+            _apply_entry(index, entry, aggregates)
+        return index.records(), aggregates
+
+    def _ensure_loaded(self):
+        """Reload the dataset if the file changed since the last read."""
+        with self._lock:
+            signature = self._file_signature()
+            if self._loaded and signature == self._signature:
+                return
+            countries, aggregates = self._read_file()
+            self._generation += 1
+            self._index = CountryIndex(CountryRecord.from_dict(c) for c in countries)
+            self._aggregates = aggregates if aggregates is not None else AggregateStore(self._index.records())
+            self._signature = signature
+            self._loaded = True
+            self._changed()
+
+    def invalidate(self):
+        """Drop the cached dataset so the next access re-reads the file."""
+        self._loaded = False
+
+    def _changed(self):
+        """Record that the dataset changed: new version, drop derived data."""
+        self.version += 1
+        self._derived.clear()
+
+    def derived(self, name: str, builder):
+        """
+        Return a structure derived from the records, built once per version.
+
+        Args:
+            name: Cache key for the structure
+            builder: Callable taking the list of records
+
+        Returns:
+            The cached (or freshly built) structure
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if name not in self._derived:
+                self._derived[name] = builder(self._index.records())
+            return self._derived[name]
+
+    def cached(self, op: str, args, compute):
+        """
+        Return a query result from the LRU cache, computing it on a miss.
+
+        Args:
+            op: Operation name
+            args: Normalized, hashable arguments
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            The result for the current version (shared; do not mutate)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._results.get_or_compute(op, args, self.version, compute)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters of the result cache."""
+        return self._results.stats()
+
+    @property
+    def index(self) -> CountryIndex:
+        """The up-to-date index (read-only use; records are shared)."""
+        self._ensure_loaded()
+        return self._index
+
+    @property
+    def writes_incrementally(self) -> bool:
+        """True when a commit costs O(changes) (journal mode), not a full file rewrite."""
+        return self.journal is not None
+
+    @property
+    def aggregates(self) -> AggregateStore:
+        """Incrementally maintained value counts (read-only use)."""
+        self._ensure_loaded()
+        return self._aggregates
+
+    def verify_aggregates(self) -> List[str]:
+        """
+        Recompute the aggregates from scratch and compare with the stored ones.
+
+        Returns:
+            One line per drifted count (empty if consistent)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._aggregates.drift(AggregateStore(self._index.records()))
+
+    def _write_snapshot(self, records: List[dict], journal_seq: int = 0, aggregates: Optional[dict] = None) -> str:
+        """Serialize a full snapshot of the dataset to a new temporary file and return its path."""
+        data = {"countries": [dict(c) for c in records]}
+        if aggregates is not None:
+            data["aggregates"] = aggregates
+            data["aggregates_fingerprint"] = _content_fingerprint(data["countries"])
+        if self.journal is not None:
+            data["journal_seq"] = journal_seq
+        return write_json_temp(self.data_file, data)
+
+    def _flush(self) -> bool:
+        """Write the in-memory dataset to disk and refresh the signature (lock held)."""
+        # Any compaction serialized before this point is now stale
+        self._generation += 1
+        try:
+            seq = self.journal.last_seq if self.journal is not None else 0
+            os.replace(self._write_snapshot(self._index.records(), seq, self._aggregates.to_dict()), self.data_file)
+            if self.journal is not None:
+                self.journal.trim(seq)
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            # Memory no longer matches disk; re-read on next access.
+            self._loaded = False
+            return False
+        self._signature = self._file_signature()
+        return True
+
+    def _commit(self, entries: List[dict]) -> bool:
+        """Persist a set of changes already applied to the in-memory index."""
+        if self.journal is None:
+            return self._flush()
+        if not self.journal.append(entries):
+            self._loaded = False
+            return False
+        self._signature = self._file_signature()
+        if (self.journal.entry_count >= self.compact_max_ops
+                or self.journal.size() >= self.compact_max_bytes):
+            if self.background_compaction:
+                self._start_compaction()
+            else:
+                self.compact()
+        return True
+
+    def _start_compaction(self):
+        """Compact the journal on a background thread (one at a time)."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def wait_for_compaction(self):
+        """Block until a running background compaction finishes."""
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def compact(self) -> bool:
+        """
+        Fold the journal into the data file.
+
+        The snapshot is serialized outside the lock so writers are only
+        blocked for the final rename and journal trim. If the data file
+        was rewritten or reloaded meanwhile (save_all, another flush),
+        the serialized snapshot is stale and is discarded instead.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if self.journal is None:
+            return True
+        with self._lock:
+            self._ensure_loaded()
+            # Records are replaced, never mutated in place, so a shallow
+            # copy of the list is a consistent point-in-time view.
+            records = self._index.records()
+            aggregates = self._aggregates.to_dict()
+            seq = self.journal.last_seq
+            generation = self._generation
+        try:
+            tmp_path = self._write_snapshot(records, seq, aggregates)
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+            return False
+        try:
+            with self._lock:
+                if generation != self._generation:
+                    # A flush already wrote newer data and trimmed the journal
+                    return True
+                os.replace(tmp_path, self.data_file)
+                self.journal.trim(seq)
+                self._signature = self._file_signature()
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+            return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+    def load_all(self) -> List[dict]:
+        """Return copies of all country records."""
+        self._ensure_loaded()
+        return [copy_record(c) for c in self._index.records()]
+
+    def records(self) -> List[CountryRecord]:
+        """Return the repository's own immutable records (shared, not copies)."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._index.records()
+
+    def save_all(self, countries: List[dict]) -> bool:
+        """Replace the whole dataset."""
+        with self._lock:
+            self._index = CountryIndex(CountryRecord(c) for c in countries)
+            self._aggregates = AggregateStore(self._index.records())
+            self._loaded = True
+            self._changed()
+            return self._flush()
+
+    def get(self, iso: str) -> Optional[dict]:
+        """Return a copy of a single country, or None if not found."""
+        country = self.index.get_by_iso(iso)
+        return copy_record(country) if country is not None else None
+
+    def add(self, country_data: dict) -> tuple[bool, str]:
+        """Add a new country."""
+        with self._lock:
+            index = self.index
+
+            # Check for duplicate ISO
+            iso = country_data.get("iso", "").upper()
+            if iso in index:
+                return False, f"Country with ISO code '{iso}' already exists"
+
+            country_data["iso"] = iso
+            record = copy_record(country_data)
+            index.add(CountryRecord(record))
+            self._aggregates.add(record)
+            self._changed()
+
+            if self._commit([{"op": "add", "iso": iso, "fields": record}]):
+                return True, f"Country '{country_data.get('country')}' added successfully"
+            return False, "Failed to save data"
+
+    def update(self, iso: str, updated_data: dict) -> tuple[bool, str]:
+        """Update fields of an existing country (a None value clears the field)."""
+        with self._lock:
+            index = self.index
+            current = index.get_by_iso(iso)
+            if current is None:
+                return False, f"Country with ISO code '{iso}' not found"
+
+            record = copy_record(current)
+            record.update(updated_data)
+            record = copy_record(record)
+            entry = _update_entry(current, record)
+            if entry is None:
+                return True, f"Country '{iso}' updated successfully"
+            index.replace(current, CountryRecord(record))
+            self._aggregates.replace(current, record)
+            self._changed()
+
+            if self._commit([entry]):
+                return True, f"Country '{iso}' updated successfully"
+            return False, "Failed to save data"
+
+    def delete(self, iso: str) -> tuple[bool, str]:
+        """Delete a country by ISO code."""
+        with self._lock:
+            index = self.index
+            deleted = index.get_by_iso(iso)
+            if deleted is None:
+                return False, f"Country with ISO code '{iso}' not found"
+
+            index.remove(deleted)
+            self._aggregates.remove(deleted)
+            self._changed()
+            if self._commit([{"op": "delete", "iso": deleted.get("iso", "")}]):
+                return True, f"Country '{deleted.get('country')}' deleted successfully"
+            return False, "Failed to save data"
+
+    def apply_changes(self, changes: list) -> bool:
+        """
+        Apply net (iso, before, after) changes from a Transaction with one write.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        with self._lock:
+            index = self.index
+            entries = []
+            for key, _, after in changes:
+                current = index.get_by_iso(key)
+                if after is None:
+                    if current is not None:
+                        index.remove(current)
+                        self._aggregates.remove(current)
+                        entries.append({"op": "delete", "iso": current.get("iso", "")})
+                elif current is None:
+                    record = copy_record(after)
+                    index.add(CountryRecord(record))
+                    self._aggregates.add(record)
+                    entries.append({"op": "add", "iso": key, "fields": record})
+                else:
+                    record = copy_record(after)
+                    entry = _update_entry(current, record)
+                    if entry is not None:
+                        index.replace(current, CountryRecord(record))
+                        self._aggregates.replace(current, record)
+                        entries.append(entry)
+            if not entries:
+                return True
+            self._changed()
+            return self._commit(entries)
+
+    def filter_by_field(self, field: str, value: str) -> List[dict]:
+        """
+        Return copies of countries whose field contains the value (trigram indexed).
+
+        Languages are matched as parsed tags instead: "en" is the base
+        language, "en-US" an exact tag and "-US" a region. Cities are
+        answered from the city reverse index (see filter_by_city).
+        """
+        if field == "cities":
+            return self.filter_by_city(value, "substring")
+        if field == "languages":
+            compute = lambda: tuple(self.derived("languages", LanguageIndex).find(value))
+        else:
+            compute = lambda: tuple(self.derived("fields", FieldIndex).filter(field, value))
+        found = self.cached("filter_by_field", (field, normalize_text(value)), compute)
+        return [copy_record(c) for c in found]
+
+    def filter_index_stats(self) -> List[dict]:
+        """Build time and size of the per-field filter indexes built so far."""
+        return self.derived("fields", FieldIndex).stats()
+
+    def filter_by_city(self, city_name: str, match: str = "substring") -> List[dict]:
+        """
+        Return copies of countries having a matching city.
+
+        Answered from the city reverse index ("exact", "prefix" or
+        "substring" match).
+        """
+        found = self.cached(
+            "filter_by_city", (name_key(city_name), match),
+            lambda: tuple(self._index.countries_with_city(city_name, match)),
+        )
+        return [copy_record(c) for c in found]
+
+    def search(self, query: str, regex: bool = False, prefix: bool = False) -> List[dict]:
+        """
+        Return copies of countries matching the query in any field or city.
+
+        Plain and prefix queries use the per-version SearchIndex; regular
+        expressions fall back to a full scan.
+        """
+        def compute():
+            if regex:
+                return tuple(search_countries(self._index.records(), query, regex=True))
+            search_index = self.derived("search", SearchIndex)
+            return tuple(search_index.search_prefix(query) if prefix else search_index.search(query))
+
+        key = (query if regex else normalize_text(query), regex, prefix)
+        return [copy_record(c) for c in self.cached("search", key, compute)]
+
+    def sorted_by(self, field: str, descending: bool = False) -> List[dict]:
+        """Return copies of all countries sorted by a field (precomputed folded keys)."""
+        found = self.cached(
+            "sorted_by", (field, descending),
+            lambda: tuple(self._index.sorted_by(field, descending)),
+        )
+        return [copy_record(c) for c in found]
+
+    def query(self, text: str) -> List[dict]:
+        """Return copies of countries matching a query expression (see query_component)."""
+        return [copy_record(c) for c in parse_query(text).execute(self.derived("fields", FieldIndex))]
+
+    def explain(self, text: str) -> List[str]:
+        """Return the execution plan of a query expression."""
+        return parse_query(text).explain(self.derived("fields", FieldIndex))
+
+    def fuzzy_search(self, query: str, **options) -> Tuple[List[dict], bool]:
+        """
+        Typo- and accent-tolerant search over country and city names.
+
+        Uses a BK-tree built once per version; options are passed to
+        FuzzyIndex.search (max_distance, limit, time_budget_ms).
+        """
+        return self.derived("fuzzy", FuzzyIndex).search(query, **options)
+
+
+def _update_entry(current: dict, record: dict) -> Optional[dict]:
+    """
+    Journal entry of an update, or None if nothing changed.
+
+    Changed list fields (cities, neighbours) are written as a splice
+    (see list_splice), so adding, renaming or deleting one city costs
+    O(change) instead of the whole list.
+    """
+    fields, splices = {}, {}
+    for key, value in record.items():
+        old = current.get(key)
+        if old == value:
+            continue
+        if isinstance(value, list) and isinstance(old, (list, tuple)):
+            splices[key] = list_splice(old, value)
+        else:
+            fields[key] = value
+    if not fields and not splices:
+        return None
+    entry = {"op": "update", "iso": current.get("iso", ""), "fields": fields}
+    if splices:
+        entry["splices"] = splices
+    return entry
+
+
+def _apply_entry(index: CountryIndex, entry: dict, aggregates: Optional[AggregateStore] = None):
+    """
+    Replay a single journal entry onto an index and its aggregates.
+
+    Entries are replayed once each, in seq order, on top of the snapshot
+    they follow (splices depend on the list they were taken from).
+    """
+    op = entry.get("op")
+    current = index.get_by_iso(entry.get("iso", ""))
+    if op == "add":
+        record = CountryRecord(entry.get("fields", {}))
+        index.add(record)
+        if aggregates is not None:
+            if current is not None:
+                aggregates.replace(current, record)
+            else:
+                aggregates.add(record)
+    elif op == "update" and current is not None:
+        record = copy_record(current)
+        record.update(entry.get("fields", {}))
+        for key, splice in entry.get("splices", {}).items():
+            record[key] = apply_splice(record.get(key) or [], splice)
+        index.replace(current, CountryRecord(record))
+        if aggregates is not None:
+            aggregates.replace(current, record)
+    elif op == "delete" and current is not None:
+        index.remove(current)
+        if aggregates is not None:
+            aggregates.remove(current)
+
+
+def migrate_json_to_sqlite(json_file: str = DATA_FILE, db_file: str = SQLITE_FILE,
+                           overwrite: bool = False) -> tuple[bool, str]:
+    """
+    Copy the JSON dataset (including any journal) into an SQLite database.
+
+    Args:
+        json_file: Source JSON data file
+        db_file: Target SQLite database file
+        overwrite: Replace existing rows in the database
+
+    Returns:
+        Tuple of (success, message)
+    """
+    source = CountryRepository(json_file, background_compaction=False)
+    target = SQLiteCountryRepository(db_file)
+    try:
+        if not overwrite and not target.is_empty():
+            return False, f"Database '{db_file}' already contains data"
+        countries = source.load_all()
+        if not target.save_all(countries):
+            return False, "Failed to write SQLite database"
+        return True, f"Migrated {len(countries)} countries to {db_file}"
+    finally:
+        target.close()
+
+
+def _create_repository():
+    """Create the repository for the configured storage backend."""
+    if STORAGE_BACKEND == "sqlite":
+        if not os.path.exists(SQLITE_FILE) and os.path.exists(DATA_FILE):
+            success, message = migrate_json_to_sqlite()
+            if not success:
+                print(f"Error: {message}")
+        return SQLiteCountryRepository(SQLITE_FILE)
+    return CountryRepository()
+
+
+_repository = _create_repository()
+_snapshots = SnapshotStore()
+
+
+def get_repository():
+    """Return the shared repository used by the module-level functions."""
+    return _repository
+
+
 def load_countries() -> List[dict]:
     """
     Load all countries from the JSON file.
-    
+
     Returns:
         List of country dictionaries
     """
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("countries", [])
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        print("Error: Invalid JSON in data file")
-        return []
+    return _repository.load_all()
 
 
 def save_countries(countries: List[dict]) -> bool:
     """
-    Save countries to the JSON file.
+    Save countries to the JSON file (atomically, as a full snapshot).
     
+    With SNAPSHOT_ON_SAVE the saved data is also added to the history.
+
     Args:
         countries: List of country dictionaries
-        
+
     Returns:
         True if successful, False otherwise
     """
-    try:
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump({"countries": countries}, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Error saving data: {e}")
+    if not _repository.save_all(countries):
         return False
+    if SNAPSHOT_ON_SAVE:
+        take_snapshot("save")
+    return True
 
 
 def get_country(iso: str) -> Optional[dict]:
     """
     Get a single country by ISO code.
-    
+
     Args:
         iso: ISO 2-letter code
-        
+
     Returns:
         Country dictionary or None if not found
     """
-    countries = load_countries()
-    iso_upper = iso.upper()
-    for country in countries:
-        if country.get("iso", "").upper() == iso_upper:
-            return country
-    return None
+    return _repository.get(iso)
 
 
 def add_country(country_data: dict) -> tuple[bool, str]:
     """
     Add a new country to the data file.
-    
+
     Args:
         country_data: Country dictionary
-        
+
     Returns:
         Tuple of (success, message)
     """
-    countries = load_countries()
-    
-    # Check for duplicate ISO
-    iso = country_data.get("iso", "").upper()
-    for country in countries:
-        if country.get("iso", "").upper() == iso:
-            return False, f"Country with ISO code '{iso}' already exists"
-    
-    country_data["iso"] = iso
-    countries.append(country_data)
-    
-    if save_countries(countries):
-        return True, f"Country '{country_data.get('country')}' added successfully"
-    return False, "Failed to save data"
+    return _repository.add(country_data)
 
 
 def update_country(iso: str, updated_data: dict) -> tuple[bool, str]:
     """
     Update an existing country.
-    
+
     Args:
         iso: ISO code of country to update
-        updated_data: New data for the country
-        
+        updated_data: New data for the country (None clears a field)
+
     Returns:
         Tuple of (success, message)
     """
-    countries = load_countries()
-    iso_upper = iso.upper()
-    
-    for i, country in enumerate(countries):
-        if country.get("iso", "").upper() == iso_upper:
-            # Update fields
-            for key, value in updated_data.items():
-                if value is not None:
-                    countries[i][key] = value
-            
-            if save_countries(countries):
-                return True, f"Country '{iso}' updated successfully"
-            return False, "Failed to save data"
-    
-    return False, f"Country with ISO code '{iso}' not found"
+    return _repository.update(iso, updated_data)
 
 
 def delete_country(iso: str) -> tuple[bool, str]:
     """
     Delete a country by ISO code.
-    
+
     Args:
         iso: ISO code of country to delete
-        
+
     Returns:
         Tuple of (success, message)
     """
-    countries = load_countries()
-    iso_upper = iso.upper()
-    
-    for i, country in enumerate(countries):
-        if country.get("iso", "").upper() == iso_upper:
-            deleted = countries.pop(i)
-            
-            if save_countries(countries):
-                return True, f"Country '{deleted.get('country')}' deleted successfully"
-            return False, "Failed to save data"
-    
-    return False, f"Country with ISO code '{iso}' not found"
+    return _repository.delete(iso)
 
 
 def list_countries() -> List[dict]:
     """
     List all countries.
-    
+
     Returns:
         List of all country dictionaries
     """
-    return load_countries()
+    return _repository.load_all()
+
+
+def batch() -> Transaction:
+    """
+    Start a batch of changes committed with a single write.
+
+    Usage:
+        with batch() as tx:
+            tx.add(country)
+            tx.add_city("FR", "Lyon")
+
+    Returns:
+        Transaction context manager
+    """
+    return _repository.batch()
+
+
+def add_city(iso: str, city_name: str) -> tuple[bool, str]:
+    """
+    Add a city to a country.
+
+    Args:
+        iso: ISO code of the country
+        city_name: Name of the new city
+
+    Returns:
+        Tuple of (success, message)
+    """
+    return _repository.add_city(iso, city_name)
+
+
+def rename_city(iso: str, index: int, new_name: str) -> tuple[bool, str]:
+    """
+    Rename a city of a country.
+
+    Args:
+        iso: ISO code of the country
+        index: Position of the city in the country's list
+        new_name: New city name
+
+    Returns:
+        Tuple of (success, message)
+    """
+    return _repository.rename_city(iso, index, new_name)
+
+
+def delete_city(iso: str, index: int) -> tuple[bool, str]:
+    """
+    Remove a city from a country.
+
+    Args:
+        iso: ISO code of the country
+        index: Position of the city in the country's list
+
+    Returns:
+        Tuple of (success, message)
+    """
+    return _repository.delete_city(iso, index)
+
+
+def find_by_field(field: str, value: str) -> List[dict]:
+    """
+    Filter countries by a field value using the active backend.
+
+    Args:
+        field: Field name to filter by
+        value: Value to match (case-insensitive substring)
+
+    Returns:
+        List of matching countries
+    """
+    return _repository.filter_by_field(field, value)
+
+
+def get_filter_index_stats() -> List[dict]:
+    """
+    Report the per-field filter indexes of the active backend.
+
+    Returns:
+        List of dictionaries with field, distinct_values, grams, postings
+        and build_ms (empty when the backend filters in SQL)
+    """
+    stats = getattr(_repository, "filter_index_stats", None)
+    return stats() if stats else []
+
+
+def find_by_city(city_name: str, match: str = "substring") -> List[dict]:
+    """
+    Filter countries by city name using the active backend.
+
+    Args:
+        city_name: City name to search for (case-insensitive)
+        match: "exact", "prefix" or "substring"
+
+    Returns:
+        List of countries containing a matching city
+    """
+    return _repository.filter_by_city(city_name, match=match)
+
+
+def find_matching(query: str, regex: bool = False, prefix: bool = False) -> List[dict]:
+    """
+    Search countries across all fields using the active backend.
+
+    Args:
+        query: Search query (case-insensitive)
+        regex: Treat the query as a regular expression
+        prefix: Match only at the start of words
+
+    Returns:
+        List of matching countries
+    """
+    return _repository.search(query, regex=regex, prefix=prefix)
+
+
+def find_similar(query: str, **options) -> tuple[List[dict], bool]:
+    """
+    Find country and city names close to the query (typos, missing accents).
+
+    Args:
+        query: Name to look for
+        **options: max_distance, limit, time_budget_ms
+
+    Returns:
+        Tuple of (matches, complete); each match has iso, kind, name, distance
+    """
+    return _repository.fuzzy_search(query, **options)
+
+
+def find_by_query(text: str) -> List[dict]:
+    """
+    Filter countries with a query expression.
+
+    Args:
+        text: Query, e.g. 'currency_code=EUR and languages~fr sort country limit 5'
+
+    Returns:
+        List of matching countries
+
+    Raises:
+        QuerySyntaxError: If the query is invalid
+    """
+    return _repository.query(text)
+
+
+def explain_query(text: str) -> List[str]:
+    """
+    Describe how a query expression would be executed.
+
+    Args:
+        text: Query expression
+
+    Returns:
+        Plan steps, one per line
+
+    Raises:
+        QuerySyntaxError: If the query is invalid
+    """
+    return _repository.explain(text)
+
+
+def list_countries_sorted(field: str, descending: bool = False) -> List[dict]:
+    """
+    List all countries sorted by a field (cached per data version).
+
+    Args:
+        field: Field to sort by (case-insensitive)
+        descending: Reverse the order
+
+    Returns:
+        Sorted list of country dictionaries
+    """
+    return _repository.sorted_by(field, descending)
+
+
+def get_cache_stats() -> dict:
+    """
+    Get the counters of the query result cache.
+
+    Returns:
+        Dictionary with hits, misses, evictions, invalidations, size,
+        maxsize and hit_rate
+    """
+    return _repository.cache_stats()
+
+
+def lookup_phone_number(number: str) -> tuple[str, List[str]]:
+    """
+    Find the country (or countries) owning a phone number.
+
+    Args:
+        number: International number, e.g. "+1 268 555 0100"
+
+    Returns:
+        Tuple of (matched dialing prefix, ISO codes) by longest-prefix match
+    """
+    return _repository.derived("phone", PhoneTrie).lookup(number)
+
+
+def lookup_phone_file(path: str, output_path: Optional[str] = None) -> dict:
+    """
+    Resolve a file of phone numbers (one per line) to countries.
+
+    Args:
+        path: Input file
+        output_path: Optional TSV output (number, prefix, ISO codes)
+
+    Returns:
+        Dictionary of counters and throughput
+    """
+    return lookup_numbers_file(_repository.derived("phone", PhoneTrie), path, output_path)
+
+
+def validate_postal_code(iso: str, code: str) -> tuple[bool, str]:
+    """
+    Validate a postal code against a country's postal_code_regex.
+
+    Args:
+        iso: ISO code of the country
+        code: Postal code
+
+    Returns:
+        Tuple of (is_valid, message)
+    """
+    return _repository.derived("postal", PostalValidator).validate(iso, code)
+
+
+def find_postal_countries(code: str) -> List[str]:
+    """
+    Find the countries whose postal code format accepts a code.
+
+    Args:
+        code: Postal code
+
+    Returns:
+        List of ISO codes
+    """
+    return _repository.derived("postal", PostalValidator).candidates(code)
+
+
+def validate_postal_file(path: str, output_path: Optional[str] = None, workers: Optional[int] = None) -> dict:
+    """
+    Validate a CSV of (iso, postal_code) rows using worker processes.
+
+    Args:
+        path: Input CSV file
+        output_path: Optional CSV receiving the rejected rows
+        workers: Worker processes (None = one per CPU)
+
+    Returns:
+        Dictionary of counters and throughput
+    """
+    return validate_postal_csv(_repository.derived("postal", PostalValidator), path, output_path, workers)
+
+
+def get_language_index() -> LanguageIndex:
+    """
+    Get the parsed language index of the current data version.
+
+    Returns:
+        LanguageIndex (shared; do not mutate)
+    """
+    return _repository.derived("languages", LanguageIndex)
+
+
+def get_columnar_table() -> ColumnarTable:
+    """
+    Get the column-oriented form of the current data version.
+
+    Returns:
+        ColumnarTable (shared; do not mutate)
+    """
+    return _repository.derived("columns", ColumnarTable)
+
+
+def get_border_graph() -> BorderGraph:
+    """
+    Get the land-border graph of the current data version.
+
+    Returns:
+        BorderGraph (shared; path queries are cached inside it)
+    """
+    return _repository.derived("borders", BorderGraph)
+
+
+def get_aggregates() -> AggregateStore:
+    """
+    Get the incrementally maintained value counts.
+
+    Returns:
+        AggregateStore (shared; do not mutate)
+    """
+    return _repository.aggregates
+
+
+def get_report() -> dict:
+    """
+    Get the statistics report (REPORT_METRICS) of the current data version.
+
+    Computed once per version from the aggregates and the columnar
+    table, then shared by the dashboard, the PDF and the JSON export.
+
+    Returns:
+        Dict of metric name -> result (shared; do not mutate)
+    """
+    return _repository.cached(
+        "report", None,
+        lambda: run_metrics(get_columnar_table(), REPORT_METRICS, _repository.aggregates),
+    )
+
+
+def verify_aggregates() -> List[str]:
+    """
+    Recompute the aggregates from scratch and report any drift.
+
+    Returns:
+        One line per drifted count (empty if consistent)
+    """
+    return _repository.verify_aggregates()
+
+
+def take_snapshot(label: str = "") -> Tuple[bool, str]:
+    """
+    Add the current data to the history.
+
+    Only records that changed since earlier snapshots are written.
+
+    Args:
+        label: Optional description of the snapshot
+
+    Returns:
+        Tuple of (success, message)
+    """
+    try:
+        # The repository's own records, so the store can skip hashing
+        # the ones it saw in the previous snapshot
+        created, info = _snapshots.take(_repository.records(), label)
+    except (OSError, ValueError) as e:
+        return False, f"Error taking snapshot: {e}"
+    if not created:
+        return True, f"Data unchanged since snapshot {info['seq']}"
+    return True, (f"Snapshot {info['seq']} taken ({info['added']} added, "
+                  f"{info['changed']} changed, {info['removed']} removed)")
+
+
+def list_snapshots() -> List[dict]:
+    """
+    Get the snapshot history, oldest first.
+
+    Returns:
+        History entries (seq, created, label, count and change counts)
+    """
+    return _snapshots.history()
+
+
+def diff_snapshots(old_seq: int, new_seq: int) -> dict:
+    """
+    Compare two snapshots by record hash.
+
+    Returns:
+        Dict of "added", "removed" and "changed" ISO code lists
+
+    Raises:
+        KeyError: If a snapshot does not exist
+    """
+    return _snapshots.diff(old_seq, new_seq)
+
+
+def get_snapshot_series(metrics=REPORT_METRICS, seqs: Optional[List[int]] = None) -> List[tuple]:
+    """
+    Compute metrics for every snapshot (or the given ones), oldest first.
+
+    Returns:
+        List of (history entry, run_metrics result)
+    """
+    return _snapshots.metric_series(metrics, seqs)
+
+
+def restore_snapshot(seq: int) -> Tuple[bool, str]:
+    """
+    Replace the current data with a snapshot.
+
+    The data being replaced is snapshotted first, so a restore can be undone.
+
+    Args:
+        seq: Snapshot number
+
+    Returns:
+        Tuple of (success, message)
+    """
+    try:
+        countries = _snapshots.load(seq)
+    except (KeyError, OSError, ValueError) as e:
+        return False, f"Cannot restore snapshot {seq}: {e}"
+    take_snapshot("before restore")
+    if not _repository.save_all(countries):
+        return False, "Error saving restored data"
+    take_snapshot(f"restore of {seq}")
+    return True, f"Restored snapshot {seq} ({len(countries)} countries)"
+
+
+def prune_snapshots() -> dict:
+    """
+    Apply the retention policy and delete unreferenced snapshot data.
+
+    Returns:
+        Dict with the dropped snapshot numbers and deleted file counts
+    """
+    dropped = _snapshots.apply_retention()
+    return {"dropped": dropped, **_snapshots.prune()}
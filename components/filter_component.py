@@ -1,8 +1,11 @@
 """
 Filter Component - Provides filtering and search functionality for countries.
 """
+import re
 from typing import List
 
+from .search_index import normalize_text
+
 
 def filter_by_field(countries: List[dict], field: str, value: str) -> List[dict]:
     """
@@ -11,35 +14,44 @@ def filter_by_field(countries: List[dict], field: str, value: str) -> List[dict]
     Args:
         countries: List of country dictionaries
         field: Field name to filter by
-        value: Value to match (case-insensitive)
+        value: Value to match (case- and accent-insensitive)
         
     Returns:
         Filtered list of countries
     """
-    value_lower = value.lower()
+    needle = normalize_text(value)
     return [
         country for country in countries
-        if value_lower in str(country.get(field, "")).lower()
+        if needle in normalize_text(country.get(field, ""))
     ]
 
 
-def search_countries(countries: List[dict], query: str) -> List[dict]:
+def search_countries(countries: List[dict], query: str, regex: bool = False) -> List[dict]:
     """
-    Search countries across all fields.
+    Search countries across all fields with a full scan.
+    
+    Plain searches on repository data are answered by SearchIndex; this
+    scan remains for ad-hoc lists and regular-expression queries.
     
     Args:
         countries: List of country dictionaries
-        query: Search query (case-insensitive)
+        query: Search query (case- and accent-insensitive)
+        regex: Treat the query as a regular expression
         
     Returns:
         List of matching countries
     """
-    query_lower = query.lower()
+    if regex:
+        pattern = re.compile(query, re.IGNORECASE)
+        matches = pattern.search
+    else:
+        needle = normalize_text(query)
+        matches = lambda text: needle in normalize_text(text)
     results = []
     
     for country in countries:
         for field, value in country.items():
-            if query_lower in str(value).lower():
+            if value is not None and matches(str(value)):
                 results.append(country)
                 break
     
@@ -63,6 +75,9 @@ def get_filterable_fields() -> List[tuple[str, str]]:
         ("phone", "Phone Code"),
         ("languages", "Languages"),
         ("cities", "Cities"),
+        ("capital", "Capital"),
+        ("continent", "Continent"),
+        ("neighbours", "Neighbours"),
     ]
 
 
@@ -72,18 +87,18 @@ def filter_by_city(countries: List[dict], city_name: str) -> List[dict]:
     
     Args:
         countries: List of country dictionaries
-        city_name: City name to search for (case-insensitive)
+        city_name: City name to search for (case- and accent-insensitive)
         
     Returns:
         Filtered list of countries containing the city
     """
-    city_lower = city_name.lower()
+    needle = normalize_text(city_name)
     results = []
     
     for country in countries:
         cities = country.get("cities", [])
         for city in cities:
-            if city_lower in city.lower():
+            if needle in normalize_text(city):
                 results.append(country)
                 break
     
@@ -0,0 +1,166 @@
+"""
+Fuzzy Component - Typo-tolerant country and city name search.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .constants import FUZZY_MAX_DISTANCE, FUZZY_RESULT_LIMIT, FUZZY_TIME_BUDGET_MS
+from .index_component import fold_text
+
+
+def levenshtein(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Edit distance between two strings.
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Stop early once the distance is known to exceed this
+
+    Returns:
+        The distance, or max_distance + 1 if it was exceeded
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over strings under edit distance.
+
+    A range query only descends into children whose edge distance lies
+    within [d - k, d + k] of the node distance d, so most of the tree is
+    never compared against the query.
+    """
+
+    def __init__(self):
+        # node = [term, {edge_distance: child_node}]
+        self.root: Optional[list] = None
+        self.size = 0
+
+    def add(self, term: str):
+        """Insert a term (duplicates are ignored)."""
+        if self.root is None:
+            self.root = [term, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = levenshtein(term, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [term, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query: str, max_distance: int,
+               deadline: Optional[float] = None) -> Tuple[List[Tuple[int, str]], bool]:
+        """
+        Find terms within max_distance of the query.
+
+        Args:
+            query: Folded query string
+            max_distance: Maximum edit distance
+            deadline: time.perf_counter() value after which to stop
+
+        Returns:
+            Tuple of ([(distance, term)], complete) where complete is False
+            if the deadline cut the search short
+        """
+        if self.root is None:
+            return [], True
+        found = []
+        stack = [self.root]
+        while stack:
+            if deadline is not None and time.perf_counter() > deadline:
+                return found, False
+            term, children = stack.pop()
+            distance = levenshtein(query, term)
+            if distance <= max_distance:
+                found.append((distance, term))
+            low, high = distance - max_distance, distance + max_distance
+            for edge, child in children.items():
+                if low <= edge <= high:
+                    stack.append(child)
+        return found, True
+
+
+class FuzzyIndex:
+    """
+    BK-tree over the folded (accent- and case-insensitive) country and
+    city names of a dataset. Built once per data version.
+    """
+
+    def __init__(self, countries: Iterable[dict]):
+        self.tree = BKTree()
+        # folded term -> [(iso, kind, original name)]
+        self.entries: Dict[str, List[Tuple[str, str, str]]] = {}
+        for country in countries:
+            iso = country.get("iso", "")
+            self._add(iso, "country", country.get("country", ""))
+            for city in country.get("cities", []) or []:
+                self._add(iso, "city", city)
+
+    def _add(self, iso: str, kind: str, name: str):
+        term = fold_text(name).strip()
+        if not term:
+            return
+        if term not in self.entries:
+            self.entries[term] = []
+            self.tree.add(term)
+        self.entries[term].append((iso, kind, name))
+
+    def search(
+        self,
+        query: str,
+        max_distance: int = FUZZY_MAX_DISTANCE,
+        limit: int = FUZZY_RESULT_LIMIT,
+        time_budget_ms: float = FUZZY_TIME_BUDGET_MS,
+    ) -> Tuple[List[dict], bool]:
+        """
+        Return names within an edit distance of the query, best first.
+
+        Args:
+            query: Name to look for (typos and missing accents allowed)
+            max_distance: Maximum edit distance
+            limit: Maximum number of results
+            time_budget_ms: Stop searching after this many milliseconds
+
+        Returns:
+            Tuple of (matches, complete). Each match is a dict with iso,
+            kind ("country" or "city"), name and distance.
+        """
+        folded = fold_text(query).strip()
+        if not folded:
+            return [], True
+        deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+        found, complete = self.tree.search(folded, max_distance, deadline)
+        found.sort(key=lambda item: (item[0], abs(len(item[1]) - len(folded)), item[1]))
+
+        matches = []
+        for distance, term in found:
+            for iso, kind, name in self.entries[term]:
+                matches.append({"iso": iso, "kind": kind, "name": name, "distance": distance})
+                if len(matches) >= limit:
+                    return matches, complete
+        return matches, complete
@@ -0,0 +1,233 @@
+"""
+Graph Component - Land borders between countries (the neighbours field).
+
+Countries become integer nodes in dataset order; the borders are kept in
+compressed sparse row form: the neighbours of node i are
+targets[offsets[i]:offsets[i + 1]]. Connected components and landlocked
+sets are computed when the graph is built, and breadth-first trees are
+cached per source country, so repeated path and neighbourhood queries
+are lookups.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache_component import ResultCache
+from .constants import BORDER_BFS_CACHE_SIZE, LANDLOCKED_COUNTRIES
+from .index_component import iso_key
+
+
+class BorderGraph:
+    """
+    Undirected graph of land borders, built once per data version
+    (see repository.derived).
+
+    A border listed by only one of the two countries is still an edge.
+    Neighbour codes that are not in the dataset are ignored and listed
+    in ``unknown``.
+
+    Args:
+        records: Country records (iso and neighbours fields)
+        landlocked: ISO codes of countries without a sea coast
+    """
+
+    def __init__(self, records: Iterable[dict], landlocked: Iterable[str] = LANDLOCKED_COUNTRIES):
+        self.codes: List[str] = []
+        self._nodes: Dict[str, int] = {}
+        listed: List[List[str]] = []
+        for record in records:
+            iso = iso_key(record.get("iso", ""))
+            if not iso or iso in self._nodes:
+                continue
+            self._nodes[iso] = len(self.codes)
+            self.codes.append(iso)
+            listed.append([iso_key(code) for code in record.get("neighbours") or []])
+
+        adjacency: List[set] = [set() for _ in self.codes]
+        unknown = set()
+        for node, neighbours in enumerate(listed):
+            for code in neighbours:
+                other = self._nodes.get(code)
+                if other is None:
+                    unknown.add(code)
+                elif other != node:
+                    adjacency[node].add(other)
+                    adjacency[other].add(node)
+        self.unknown: List[str] = sorted(unknown)
+
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        for node, others in enumerate(adjacency):
+            self.targets.extend(sorted(others, key=self.codes.__getitem__))
+            self.offsets.append(len(self.targets))
+
+        self._labels, self._components = self._label_components()
+        landlocked = {iso_key(code) for code in landlocked}
+        self._landlocked = [code for code in self.codes if code in landlocked]
+        self._doubly_landlocked = [
+            code for code in self._landlocked
+            if self.degree(code) and all(self.codes[n] in landlocked for n in self._adjacent(self._nodes[code]))
+        ]
+        self._trees = ResultCache(BORDER_BFS_CACHE_SIZE)
+
+    @property
+    def size(self) -> int:
+        return len(self.codes)
+
+    @property
+    def edges(self) -> int:
+        return len(self.targets) // 2
+
+    def _adjacent(self, node: int) -> array:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def _node(self, iso: str) -> int:
+        node = self._nodes.get(iso_key(iso))
+        if node is None:
+            raise KeyError(f"Country '{iso}' not found")
+        return node
+
+    def __contains__(self, iso: str) -> bool:
+        return iso_key(iso) in self._nodes
+
+    def neighbours(self, iso: str) -> List[str]:
+        """ISO codes sharing a land border with a country (unknown codes raise KeyError)."""
+        return [self.codes[n] for n in self._adjacent(self._node(iso))]
+
+    def degree(self, iso: str) -> int:
+        """Number of land borders of a country."""
+        node = self._node(iso)
+        return self.offsets[node + 1] - self.offsets[node]
+
+    # -- traversal ---------------------------------------------------------
+
+    def _label_components(self) -> Tuple[array, List[List[str]]]:
+        labels = array("i", [-1] * self.size)
+        components = []
+        for start in range(self.size):
+            if labels[start] != -1:
+                continue
+            label = len(components)
+            labels[start] = label
+            members, frontier = [start], [start]
+            while frontier:
+                following = []
+                for node in frontier:
+                    for other in self._adjacent(node):
+                        if labels[other] == -1:
+                            labels[other] = label
+                            following.append(other)
+                members.extend(following)
+                frontier = following
+            components.append(sorted(self.codes[n] for n in members))
+        return labels, components
+
+    def _tree(self, source: int) -> Tuple[array, array]:
+        """(distance, parent) arrays of a breadth-first search (cached per source)."""
+        return self._trees.get_or_compute("bfs", source, 0, lambda: self._bfs(source))
+
+    def _bfs(self, source: int) -> Tuple[array, array]:
+        distance = array("i", [-1] * self.size)
+        parent = array("i", [-1] * self.size)
+        distance[source] = 0
+        frontier, depth = [source], 0
+        while frontier:
+            depth += 1
+            following = []
+            for node in frontier:
+                for other in self._adjacent(node):
+                    if distance[other] == -1:
+                        distance[other] = depth
+                        parent[other] = node
+                        following.append(other)
+            frontier = following
+        return distance, parent
+
+    def shortest_path(self, origin: str, destination: str) -> Optional[List[str]]:
+        """
+        Fewest-border-crossings route between two countries.
+
+        Args:
+            origin: ISO code of the start country
+            destination: ISO code of the end country
+
+        Returns:
+            ISO codes from origin to destination (both included), or None
+            when no land route exists
+
+        Raises:
+            KeyError: If either country is not in the graph
+        """
+        start, end = self._node(origin), self._node(destination)
+        if self._labels[start] != self._labels[end]:
+            return None
+        # Walk the tree rooted at the destination, so the path comes out in order
+        _, parent = self._tree(end)
+        path = [start]
+        while path[-1] != end:
+            path.append(parent[path[-1]])
+        return [self.codes[n] for n in path]
+
+    def distance(self, origin: str, destination: str) -> Optional[int]:
+        """Number of border crossings between two countries (None if unreachable)."""
+        start, end = self._node(origin), self._node(destination)
+        if self._labels[start] != self._labels[end]:
+            return None
+        return self._tree(start)[0][end]
+
+    def neighbourhood(self, iso: str, hops: int = 1) -> Dict[int, List[str]]:
+        """
+        Countries reachable within a number of border crossings.
+
+        Args:
+            iso: ISO code of the centre country
+            hops: Maximum number of crossings
+
+        Returns:
+            Dict of crossings (1..hops) -> sorted ISO codes at exactly that distance
+        """
+        distance, _ = self._tree(self._node(iso))
+        rings: Dict[int, List[str]] = {hop: [] for hop in range(1, hops + 1)}
+        for node, hop in enumerate(distance):
+            if 0 < hop <= hops:
+                rings[hop].append(self.codes[node])
+        for ring in rings.values():
+            ring.sort()
+        return rings
+
+    # -- precomputed sets --------------------------------------------------
+
+    def components(self, min_size: int = 1) -> List[List[str]]:
+        """Connected land masses as sorted ISO lists, largest first."""
+        found = [c for c in self._components if len(c) >= min_size]
+        return sorted(found, key=lambda c: (-len(c), c[0]))
+
+    def component_of(self, iso: str) -> List[str]:
+        """All countries reachable over land from a country (itself included)."""
+        return self._components[self._labels[self._node(iso)]]
+
+    def connected(self, origin: str, destination: str) -> bool:
+        """True if a land route exists between two countries."""
+        return self._labels[self._node(origin)] == self._labels[self._node(destination)]
+
+    def isolated(self) -> List[str]:
+        """Countries without land borders (islands and the like)."""
+        return [code for node, code in enumerate(self.codes) if self.offsets[node] == self.offsets[node + 1]]
+
+    def landlocked(self) -> List[str]:
+        """Countries without a sea coast, in dataset order."""
+        return list(self._landlocked)
+
+    def doubly_landlocked(self) -> List[str]:
+        """Landlocked countries whose neighbours are all landlocked too."""
+        return list(self._doubly_landlocked)
+
+    def stats(self) -> Dict[str, int]:
+        """Node, edge, component and cache counters."""
+        return {
+            "countries": self.size,
+            "borders": self.edges,
+            "components": len(self._components),
+            "isolated": len(self.isolated()),
+            "unknown_neighbours": len(self.unknown),
+            "cached_trees": self._trees.stats()["size"],
+        }
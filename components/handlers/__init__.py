@@ -9,11 +9,14 @@ from .country_handlers import (
 )
 from .filter_handlers import (
     handle_filter_countries,
+    handle_query_countries,
     handle_search_countries,
 )
 from .pdf_handlers import handle_export_pdf
-from .import_handlers import handle_import_data
-from .analytics_handlers import handle_show_statistics
+from .import_handlers import handle_import_data, handle_import_cities
+from .analytics_handlers import handle_show_statistics, handle_verify_statistics
+from .graph_handlers import handle_border_routes
+from .history_handlers import handle_history
 from .auth_handlers import (
     handle_login,
     handle_setup,
@@ -31,10 +34,15 @@ __all__ = [
     "handle_edit_country",
     "handle_delete_country",
     "handle_filter_countries",
+    "handle_query_countries",
     "handle_search_countries",
     "handle_export_pdf",
     "handle_import_data",
+    "handle_import_cities",
     "handle_show_statistics",
+    "handle_verify_statistics",
+    "handle_border_routes",
+    "handle_history",
     "handle_login",
     "handle_setup",
     "handle_list_cities",
@@ -1,35 +1,111 @@
 """
 Analytics Handlers - UI logic for statistics.
 """
-from ..data_handler import list_countries
-from ..analytics_component import (
-    get_general_stats,
-    get_currency_stats,
-    get_language_stats
-)
-from ..menu_component import display_header
+import os
+
+from country_types import CONTINENTS
+
+from ..colors import dim
+from ..constants import BASE_DIR
+from ..analytics_component import export_report
+from ..data_handler import get_cache_stats, get_report, verify_aggregates
+from ..menu_component import display_header, display_message
+
+
+def _print_top(title: str, pairs: list):
+    print(f"{title}:")
+    for value, count in pairs:
+        print(f"  {value}: {count}")
+    print("-" * 30)
+
+
+def _print_numeric(report: dict):
+    """Population/area section of the dashboard (skipped when the data has no numbers)."""
+    population, area = report["population"], report["area"]
+    if not population["count"]:
+        print(dim("No population/area data (load it with Import from Source > Incremental refresh)."))
+        print("-" * 30)
+        return
+    print(f"Population: {population['sum']:,.0f} in {population['count']} countries "
+          f"(median {population['p50']:,.0f}, mean {population['mean']:,.0f})")
+    if area["count"]:
+        print(f"Area: {area['sum']:,.0f} km² (median {area['p50']:,.0f} km²)")
+    if report["density"] is not None:
+        print(f"Density: {report['density']:,.2f} people/km²")
+    if report["population_weighted_area"] is not None:
+        print(f"Population-weighted country area: {report['population_weighted_area']:,.0f} km²")
+    print("-" * 30)
+
+    print("By continent:")
+    density = report["density_by_continent"]
+    for code, stats in report["population_by_continent"].items():
+        name = CONTINENTS.get(code, code)
+        people = density.get(code)
+        print(f"  {name:<15} {stats['count']:>4} countries  {stats['sum']:>15,.0f} people  "
+              f"median {stats['p50']:>13,.0f}  "
+              f"{'-' if people is None else f'{people:,.1f}'} /km²")
+    print("-" * 30)
+
+    by_currency = sorted(report["population_by_currency"].items(), key=lambda item: (-item[1]["sum"], item[0]))
+    _print_top("Top 5 Currencies by Population", [
+        (currency, f"{stats['sum']:,.0f}") for currency, stats in by_currency[:5]
+    ])
+
 
 def handle_show_statistics():
     """Show statistics dashboard."""
     print("\n--- Statistics Dashboard ---")
     
-    countries = list_countries()
-    stats = get_general_stats(countries)
+    # Computed once per data version and shared with the PDF/JSON exports
+    report = get_report()
     
-    if stats["total"] == 0:
+    if report["countries"] == 0:
         print("No data available.")
         return
 
-    print(f"Total Countries: {stats['total']}")
+    cities = report["cities_per_country"]
+    print(f"Total Countries: {report['countries']}")
+    print(f"Total Cities: {cities['total']} "
+          f"(per country: min {cities['min']}, mean {cities['mean']}, max {cities['max']})")
+    print(f"Distinct currencies: {report['distinct_currencies']}  "
+          f"Distinct languages: {report['distinct_languages']}")
     print("-" * 30)
     
-    print("Top 5 Currencies:")
-    currencies = get_currency_stats(countries)
-    for curr, count in currencies:
-        print(f"  {curr}: {count}")
+    _print_top("Top 5 Currencies", report["top_currencies"])
+    _print_top("Top 5 Top-Level Domains", report["top_tlds"])
+    _print_top("Top 5 Languages", report["top_languages"])
+
+    print("Main languages of the top currencies:")
+    by_currency = report["languages_by_currency"]
+    for currency, _ in report["top_currencies"]:
+        langs = ", ".join(f"{lang} ({count})" for lang, count in by_currency.get(currency, []))
+        print(f"  {currency}: {langs}")
     print("-" * 30)
-        
-    print("Top 5 Languages:")
-    langs = get_language_stats(countries)
-    for lang, count in langs:
-        print(f"  {lang}: {count}")
+    _print_numeric(report)
+
+    cache = get_cache_stats()
+    print(dim(
+        f"\n[cache] {cache['hits']} hits, {cache['misses']} misses, "
+        f"{cache['evictions']} evictions, {cache['size']}/{cache['maxsize']} entries"
+    ))
+
+    path = input("\nExport statistics to JSON (filename, Enter to skip): ").strip()
+    if path:
+        if not path.endswith(".json"):
+            path += ".json"
+        success, result = export_report(report, os.path.join(BASE_DIR, path))
+        display_message(f"Statistics exported: {result}" if success else result, is_error=not success)
+
+
+def handle_verify_statistics():
+    """Recompute the statistics from scratch and report drift from the stored counts."""
+    print("\n--- Verify Statistics ---")
+    drift = verify_aggregates()
+    if not drift:
+        display_message("Stored statistics match the data", is_error=False)
+        return
+    display_message(f"{len(drift)} stored count(s) differ from the data", is_error=True)
+    for line in drift[:20]:
+        print(f"  {line}")
+    if len(drift) > 20:
+        print(dim(f"  ... and {len(drift) - 20} more"))
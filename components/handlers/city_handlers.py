@@ -6,9 +6,11 @@ from ..menu_component import (
     confirm_action,
 )
 from ..data_handler import (
-    list_countries,
+    get_repository,
     get_country,
-    update_country,
+    add_city,
+    rename_city,
+    delete_city,
 )
 
 
@@ -60,17 +62,13 @@ def handle_add_city():
         display_message("City name is required", is_error=True)
         return
     
-    cities = country.get("cities", [])
-    
     # Check for duplicate
-    if city_name.lower() in [c.lower() for c in cities]:
+    if get_repository().index.has_city(iso, city_name):
         display_message(f"City '{city_name}' already exists in this country", is_error=True)
         return
     
     if confirm_action(f"Add city '{city_name}' to {country.get('country')}?"):
-        cities.append(city_name)
-        country["cities"] = cities
-        success, message = update_country(iso, country)
+        success, message = add_city(iso, city_name)
         display_message(message, is_error=not success)
 
 
@@ -114,14 +112,12 @@ def handle_edit_city():
         return
     
     # Check for duplicate
-    if new_name.lower() in [c.lower() for c in cities if c != old_name]:
+    if get_repository().index.has_city(iso, new_name, exclude_position=index):
         display_message(f"City '{new_name}' already exists in this country", is_error=True)
         return
     
     if confirm_action(f"Rename '{old_name}' to '{new_name}'?"):
-        cities[index] = new_name
-        country["cities"] = cities
-        success, message = update_country(iso, country)
+        success, message = rename_city(iso, index, new_name)
         display_message(message, is_error=not success)
 
 
@@ -160,7 +156,5 @@ def handle_delete_city():
     city_name = cities[index]
     
     if confirm_action(f"Delete city '{city_name}' from {country.get('country')}?"):
-        cities.pop(index)
-        country["cities"] = cities
-        success, message = update_country(iso, country)
+        success, message = delete_city(iso, index)
         display_message(message, is_error=not success)
@@ -9,7 +9,8 @@ from ..menu_component import (
     display_country_detail,
 )
 from ..data_handler import (
-    list_countries,
+    get_repository,
+    list_countries_sorted,
     add_country,
     get_country,
     update_country,
@@ -20,44 +21,42 @@ from country_types import validate_country, validate_country_unique
 
 def handle_list_countries():
     """Handle listing all countries."""
-    countries = list_countries()
-    
-    if not countries:
-        display_message("No countries found.", is_error=True)
-        return
-
     # Sort options
     print("\nSort by:")
     print("1. ISO Code (Default)")
     print("2. Country Name")
     sort_choice = input("Select sort option (Enter for default): ").strip()
     
-    if sort_choice == "2":
-        countries.sort(key=lambda x: x.get('country', '').lower())
-    else:
-        countries.sort(key=lambda x: x.get('iso', ''))
+    countries = list_countries_sorted('country' if sort_choice == "2" else 'iso')
+    if not countries:
+        display_message("No countries found.", is_error=True)
+        return
 
     display_countries(countries, detailed=False)
     
-    if countries:
-        show_detail = input("\nShow detailed view? (y/n): ").strip().lower()
-        if show_detail in ('y', 'yes'):
-            display_countries(countries, detailed=True)
+    show_detail = input("\nShow detailed view? (y/n): ").strip().lower()
+    if show_detail in ('y', 'yes'):
+        display_countries(countries, detailed=True)
 
 
 def handle_add_country():
     """Handle adding a new country."""
     print("\n--- Add New Country ---")
     
-    # Load countries for real-time validation
-    countries = list_countries()
-    country_data = get_country_input(countries=countries)
+    # Use the repository index for real-time validation
+    index = get_repository().index
+    country_data = get_country_input(countries=index)
     
     is_valid, error = validate_country(country_data)
     if not is_valid:
         display_message(error, is_error=True)
         return
     
+    is_valid, error = validate_country_unique(country_data, get_repository().index)
+    if not is_valid:
+        display_message(error, is_error=True)
+        return
+    
     if confirm_action(f"Add country '{country_data.get('country')}'?"):
         success, message = add_country(country_data)
         display_message(message, is_error=not success)
@@ -81,15 +80,20 @@ def handle_edit_country():
     display_country_detail(country)
     
     print("\nEnter new values (press Enter to keep current):")
-    # Load countries for real-time validation, exclude current country
-    countries = list_countries()
-    updated_data = get_country_input(existing=country, countries=countries, exclude_iso=iso)
+    # Use the repository index for real-time validation, exclude current country
+    index = get_repository().index
+    updated_data = get_country_input(existing=country, countries=index, exclude_iso=iso)
     
     is_valid, error = validate_country(updated_data)
     if not is_valid:
         display_message(error, is_error=True)
         return
     
+    is_valid, error = validate_country_unique(updated_data, get_repository().index, exclude_iso=iso)
+    if not is_valid:
+        display_message(error, is_error=True)
+        return
+    
     if confirm_action(f"Update country '{iso}'?"):
         success, message = update_country(iso, updated_data)
         display_message(message, is_error=not success)
@@ -1,16 +1,30 @@
 """
 Filter Handlers - UI logic for filtering and searching countries.
 """
+import os
+import re
+
+from ..colors import dim
 from ..menu_component import (
     display_countries,
     display_message,
 )
-from ..data_handler import list_countries
-from ..filter_component import (
-    filter_by_field,
-    search_countries,
-    get_filterable_fields,
+from ..data_handler import (
+    get_country,
+    explain_query,
+    find_by_field,
+    find_by_query,
+    find_matching,
+    find_similar,
+    get_filter_index_stats,
+    lookup_phone_file,
+    lookup_phone_number,
+    find_postal_countries,
+    validate_postal_code,
+    validate_postal_file,
 )
+from ..filter_component import get_filterable_fields
+from ..query_component import QuerySyntaxError
 
 
 def handle_filter_countries():
@@ -21,17 +35,38 @@ def handle_filter_countries():
     fields = get_filterable_fields()
     for i, (key, name) in enumerate(fields, 1):
         print(f"  {i}. {name} ({key})")
+    print("  Q. Query expression (combine fields, sort, limit)")
+    print("  P. Phone number lookup")
+    print("  Z. Postal code validation")
+    
+    selection = input("\nSelect field number: ").strip()
+    if selection.upper() == "Q":
+        handle_query_countries()
+        return
+    if selection.upper() == "P":
+        handle_phone_lookup()
+        return
+    if selection.upper() == "Z":
+        handle_postal_validation()
+        return
     
     try:
-        choice = int(input("\nSelect field number: ").strip())
+        choice = int(selection)
         if 1 <= choice <= len(fields):
             field_key, field_name = fields[choice - 1]
+            if field_key == "languages":
+                print("Tip: 'en' matches every English variant, 'en-US' that exact tag, '-US' any US variant.")
             value = input(f"Enter value to filter by {field_name}: ").strip()
             
             if value:
-                countries = list_countries()
-                filtered = filter_by_field(countries, field_key, value)
+                filtered = find_by_field(field_key, value)
                 display_countries(filtered, detailed=True)
+                for stats in get_filter_index_stats():
+                    if stats["field"] == field_key:
+                        print(dim(
+                            f"\n[index] {stats['distinct_values']} values, {stats['grams']} grams, "
+                            f"{stats['postings']} postings, built in {stats['build_ms']} ms"
+                        ))
             else:
                 display_message("Filter value is required", is_error=True)
         else:
@@ -40,15 +75,164 @@ def handle_filter_countries():
         display_message("Please enter a valid number", is_error=True)
 
 
+def handle_query_countries():
+    """Handle filtering countries with a query expression."""
+    print("\n--- Query Countries ---")
+    print("Operators: = exact, ~ contains, ^= starts with, : list member;")
+    print("numeric fields (iso_numeric, area, population) take = < <= > >=.")
+    print("combine with and/or/not and parentheses, then optional 'sort <field> [desc]' and 'limit N'.")
+    print('Example: currency_code=EUR and languages~fr and not cities:"Paris" sort country limit 10')
+    print("Prefix with 'explain' to show the execution plan.")
+    query = input("Enter query: ").strip()
+    
+    if not query:
+        display_message("Query is required", is_error=True)
+        return
+    
+    show_plan = query.lower().startswith("explain ")
+    if show_plan:
+        query = query[len("explain "):].strip()
+    
+    try:
+        if show_plan:
+            print("\nPlan:")
+            for step in explain_query(query):
+                print(f"  {step}")
+        results = find_by_query(query)
+    except QuerySyntaxError as e:
+        display_message(f"Invalid query: {e}", is_error=True)
+        return
+    display_countries(results, detailed=True)
+
+
+def handle_phone_lookup():
+    """Handle resolving phone numbers to countries by dialing code."""
+    print("\n--- Phone Number Lookup ---")
+    value = input("Enter a phone number, or the path of a file with one number per line: ").strip()
+    
+    if not value:
+        display_message("Phone number is required", is_error=True)
+        return
+    
+    if os.path.isfile(value):
+        output_path = input("Write results to (TSV, Enter to skip): ").strip() or None
+        try:
+            stats = lookup_phone_file(value, output_path)
+        except OSError as e:
+            display_message(f"Could not process file: {e}", is_error=True)
+            return
+        print(f"\nNumbers: {stats['numbers']}  Matched: {stats['matched']}  "
+              f"Unmatched: {stats['unmatched']}  Ambiguous: {stats['ambiguous']}")
+        print(dim(f"[{stats['seconds']} s, {stats['per_second']} numbers/s]"))
+        if output_path:
+            display_message(f"Results written to {output_path}")
+        return
+    
+    prefix, owners = lookup_phone_number(value)
+    if not owners:
+        display_message("No country found for this number", is_error=True)
+        return
+    print(f"\nDialing code +{prefix}:")
+    display_countries([c for c in (get_country(iso) for iso in owners) if c], detailed=True)
+
+
+def handle_postal_validation():
+    """Handle validating postal codes (single code, unknown country, or CSV file)."""
+    print("\n--- Postal Code Validation ---")
+    print("1. Validate a code for a country")
+    print("2. Find countries matching a code")
+    print("3. Validate a CSV file (iso,postal_code)")
+    choice = input("Select option: ").strip()
+    
+    if choice == "1":
+        iso = input("Enter country ISO code: ").strip()
+        code = input("Enter postal code: ").strip()
+        if not iso or not code:
+            display_message("ISO code and postal code are required", is_error=True)
+            return
+        is_valid, message = validate_postal_code(iso, code)
+        display_message(message, is_error=not is_valid)
+    elif choice == "2":
+        code = input("Enter postal code: ").strip()
+        if not code:
+            display_message("Postal code is required", is_error=True)
+            return
+        isos = find_postal_countries(code)
+        if not isos:
+            display_message("No country accepts this postal code", is_error=True)
+            return
+        print(f"\nPossible countries ({len(isos)}): {', '.join(isos)}")
+    elif choice == "3":
+        path = input("Enter CSV file path: ").strip()
+        if not os.path.isfile(path):
+            display_message(f"File not found: {path}", is_error=True)
+            return
+        output_path = input("Write rejected rows to (CSV, Enter to skip): ").strip() or None
+        try:
+            stats = validate_postal_file(path, output_path)
+        except OSError as e:
+            display_message(f"Could not process file: {e}", is_error=True)
+            return
+        print(f"\nRows: {stats['rows']}  Valid: {stats['valid']}  Invalid: {stats['invalid']}  "
+              f"Unknown country: {stats['unknown_country']}  No rule: {stats['no_rule']}")
+        print(dim(f"[{stats['workers']} worker(s), {stats['seconds']} s, {stats['per_second']} rows/s]"))
+        if output_path:
+            display_message(f"Rejected rows written to {output_path}")
+    else:
+        display_message("Invalid option", is_error=True)
+
+
 def handle_search_countries():
     """Handle searching countries."""
     print("\n--- Search Countries ---")
+    print("Tip: end with * to match word starts (e.g. 'port*'),")
+    print("     wrap in slashes for a regular expression (e.g. '/^a.*a$/'),")
+    print("     or start with ~ for a typo-tolerant name search (e.g. '~germny').")
     query = input("Enter search term: ").strip()
     
     if not query:
         display_message("Search term is required", is_error=True)
         return
     
-    countries = list_countries()
-    results = search_countries(countries, query)
+    if len(query) > 1 and query.startswith("~"):
+        if not _display_similar(query[1:].strip()):
+            display_message("No similar country or city names found", is_error=True)
+        return
+
+    try:
+        if len(query) > 2 and query.startswith("/") and query.endswith("/"):
+            results = find_matching(query[1:-1], regex=True)
+        elif len(query) > 1 and query.endswith("*"):
+            results = find_matching(query[:-1], prefix=True)
+        else:
+            results = find_matching(query)
+    except re.error as e:
+        display_message(f"Invalid regular expression: {e}", is_error=True)
+        return
     display_countries(results, detailed=True)
+    if not results:
+        _display_similar(query, heading="Did you mean")
+
+
+def _display_similar(query: str, heading: str = "Similar names") -> bool:
+    """
+    Print country and city names close to the query.
+
+    Args:
+        query: Name to look for
+        heading: Line printed above the suggestions
+
+    Returns:
+        True if any suggestion was printed
+    """
+    matches, complete = find_similar(query)
+    if not matches:
+        return False
+    print(f"\n{heading}:")
+    for match in matches:
+        where = "" if match["kind"] == "country" else f" (city in {match['iso']})"
+        distance = dim(f"distance {match['distance']}")
+        print(f"  {match['name']}{where}  {distance}")
+    if not complete:
+        print(dim("  (search stopped at the time limit; results may be incomplete)"))
+    return True
@@ -0,0 +1,62 @@
+"""
+Graph Handlers - UI logic for land-border queries.
+"""
+from ..colors import dim
+from ..data_handler import get_border_graph
+from ..menu_component import display_message
+
+
+def _ask_iso(graph, prompt: str):
+    iso = input(prompt).strip().upper()
+    if iso not in graph:
+        display_message(f"Country '{iso}' not found.", is_error=True)
+        return None
+    return iso
+
+
+def handle_border_routes():
+    """Handle shortest routes, neighbourhoods, land masses and landlocked countries."""
+    print("\n--- Land Borders ---")
+    graph = get_border_graph()
+    if not graph.edges:
+        display_message("No border data available (load neighbours with Import from Source > Incremental refresh).", is_error=True)
+        return
+
+    print("  1. Shortest route between two countries")
+    print("  2. Countries within N border crossings")
+    print("  3. Connected land masses")
+    print("  4. Landlocked countries")
+    choice = input("\nSelect option: ").strip()
+
+    if choice == "1":
+        origin = _ask_iso(graph, "From (ISO code): ")
+        destination = origin and _ask_iso(graph, "To (ISO code): ")
+        if not destination:
+            return
+        path = graph.shortest_path(origin, destination)
+        if path is None:
+            display_message(f"No land route between {origin} and {destination}.", is_error=True)
+            return
+        print(f"\n{len(path) - 1} border crossing(s): {' -> '.join(path)}")
+    elif choice == "2":
+        iso = _ask_iso(graph, "Country (ISO code): ")
+        if not iso:
+            return
+        try:
+            hops = int(input("Maximum crossings [2]: ").strip() or 2)
+        except ValueError:
+            display_message("Invalid number.", is_error=True)
+            return
+        for hop, codes in graph.neighbourhood(iso, hops).items():
+            print(f"  {hop}: {', '.join(codes) if codes else dim('-')}")
+    elif choice == "3":
+        for component in graph.components(min_size=2):
+            print(f"  {len(component):>4} countries: {', '.join(component[:12])}"
+                  f"{dim(' ...') if len(component) > 12 else ''}")
+        print(dim(f"  {len(graph.isolated())} countries have no land borders"))
+    elif choice == "4":
+        landlocked = graph.landlocked()
+        print(f"Landlocked ({len(landlocked)}): {', '.join(landlocked)}")
+        print(f"Doubly landlocked: {', '.join(graph.doubly_landlocked()) or dim('none')}")
+    else:
+        display_message("Invalid option.", is_error=True)
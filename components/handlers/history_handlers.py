@@ -0,0 +1,92 @@
+"""
+History Handlers - UI logic for dataset snapshots.
+"""
+from ..analytics_component import TopValues
+from ..colors import dim
+from ..data_handler import (
+    diff_snapshots,
+    get_snapshot_series,
+    list_snapshots,
+    prune_snapshots,
+    restore_snapshot,
+    take_snapshot,
+)
+from ..menu_component import confirm_action, display_message
+
+
+def _ask_seq(prompt: str):
+    try:
+        return int(input(prompt).strip())
+    except ValueError:
+        display_message("Invalid snapshot number.", is_error=True)
+        return None
+
+
+def _print_history(snapshots: list):
+    print(f"{'#':>4}  {'Created':<20}{'Countries':>10}{'+':>5}{'~':>5}{'-':>5}  Label")
+    for info in snapshots:
+        print(f"{info['seq']:>4}  {info['created']:<20}{info['count']:>10}"
+              f"{info['added']:>5}{info['changed']:>5}{info['removed']:>5}  {info['label']}")
+
+
+def _print_currency_trend(limit: int = 5):
+    """Country counts of the currently most common currencies in every snapshot."""
+    series = get_snapshot_series([TopValues("currency_code", None, name="currencies")])
+    if not series:
+        return
+    latest = dict(series[-1][1]["currencies"])
+    top = sorted(latest, key=lambda code: (-latest[code], code))[:limit]
+    print(f"\n{'#':>4}  " + "".join(f"{code:>7}" for code in top))
+    for info, report in series:
+        counts = dict(report["currencies"])
+        print(f"{info['seq']:>4}  " + "".join(f"{counts.get(code, 0):>7}" for code in top))
+
+
+def handle_history():
+    """Handle the snapshot history menu."""
+    print("\n--- Data History ---")
+    snapshots = list_snapshots()
+    if snapshots:
+        _print_history(snapshots)
+    else:
+        print(dim("No snapshots yet."))
+
+    print("\n  T. Take snapshot")
+    print("  D. Compare two snapshots")
+    print("  S. Currency distribution over time")
+    print("  R. Restore a snapshot")
+    print("  P. Apply retention and prune")
+    choice = input("\nSelect option: ").strip().upper()
+
+    if choice == "T":
+        success, message = take_snapshot(input("Label (optional): ").strip())
+        display_message(message, is_error=not success)
+    elif choice == "D":
+        old_seq = _ask_seq("Older snapshot #: ")
+        if old_seq is None:
+            return
+        new_seq = _ask_seq("Newer snapshot #: ")
+        if new_seq is None:
+            return
+        try:
+            changes = diff_snapshots(old_seq, new_seq)
+        except KeyError as e:
+            display_message(str(e).strip("'\""), is_error=True)
+            return
+        for kind in ("added", "changed", "removed"):
+            codes = changes[kind]
+            print(f"  {kind.capitalize()} ({len(codes)}): {', '.join(codes) if codes else dim('-')}")
+    elif choice == "S":
+        _print_currency_trend()
+    elif choice == "R":
+        seq = _ask_seq("Snapshot # to restore: ")
+        if seq is None or not confirm_action(f"Replace the current data with snapshot {seq}?"):
+            return
+        success, message = restore_snapshot(seq)
+        display_message(message, is_error=not success)
+    elif choice == "P":
+        result = prune_snapshots()
+        display_message(f"Dropped {len(result['dropped'])} snapshot(s); deleted "
+                        f"{result['manifests']} manifest(s) and {result['objects']} record object(s)")
+    elif choice:
+        display_message("Invalid option.", is_error=True)
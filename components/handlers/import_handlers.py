@@ -5,57 +5,151 @@ from ..menu_component import (
     display_message,
     confirm_action,
 )
-from ..data_handler import add_country, load_countries, save_countries
-from ..importer_component import parse_source_file
+from ..constants import CITIES_SOURCE_FILE, SNAPSHOT_ON_SAVE
+from ..data_handler import batch, get_repository, take_snapshot
+from ..transaction_component import TransactionError
+from ..importer_component import (
+    iter_source_records,
+    import_geonames_cities,
+    incremental_import,
+)
 
 def handle_import_data():
     """Handle importing data from source file."""
     print("\n--- Import from Source File ---")
-    print("This will import countries from 'countryInfo.txt'.")
+    print("1. Add new countries only (Default)")
+    print("2. Incremental refresh (add new, update changed rows)")
+    mode = input("Select import mode (Enter for default): ").strip()
+    
+    if mode == "2":
+        handle_incremental_import()
+        return
+    
+    print("\nThis will import countries from 'countryInfo.txt'.")
     print("Existing countries with the same ISO code will be skipped.")
     
     if not confirm_action("Proceed with import?"):
         return
 
     print("\nReading source file...")
-    new_countries, errors = parse_source_file()
     
-    if errors:
-        print(f"\nEncoutered {len(errors)} issues during parsing:")
-        for err in errors[:5]:
+    # Stream the source straight into one transaction: records are
+    # validated as they are read and committed with a single write.
+    found_count = 0
+    added_count = 0
+    skipped_count = 0
+    error_count = 0
+    first_errors = []
+    
+    try:
+        with batch() as tx:
+            for _, country, error in iter_source_records():
+                if error:
+                    error_count += 1
+                    if len(first_errors) < 5:
+                        first_errors.append(error)
+                    continue
+                found_count += 1
+                if country['iso'] in tx:
+                    skipped_count += 1
+                    continue
+                try:
+                    tx.add(country)
+                    added_count += 1
+                except TransactionError as e:
+                    print(f"  - Skipping {country['iso']}: {e}")
+                    skipped_count += 1
+    except TransactionError as e:
+        display_message(f"Failed to save imported data: {e}", is_error=True)
+        return
+    
+    if error_count:
+        print(f"\nEncoutered {error_count} issues during parsing:")
+        for err in first_errors:
             print(f"  - {err}")
-        if len(errors) > 5:
-            print(f"  ...and {len(errors)-5} more.")
+        if error_count > 5:
+            print(f"  ...and {error_count-5} more.")
             
-    if not new_countries:
+    if not found_count:
         display_message("No valid countries found to import.", is_error=True)
         return
         
-    print(f"\nFound {len(new_countries)} valid countries in source.")
+    print(f"\nFound {found_count} valid countries in source.")
     
-    # Process import
-    current_countries = load_countries()
-    existing_isos = {c['iso'].upper() for c in current_countries}
-    
-    added_count = 0
-    skipped_count = 0
-    
-    to_add = []
-    
-    for country in new_countries:
-        if country['iso'].upper() in existing_isos:
-            skipped_count += 1
-        else:
-            to_add.append(country)
-            existing_isos.add(country['iso'].upper())
-            added_count += 1
-    
-    if to_add:
-        # Batch update is more efficient than calling add_country repeatedly due to repeated file IO
-        current_countries.extend(to_add)
-        if save_countries(current_countries):
-             display_message(f"Import complete. Added: {added_count}, Skipped: {skipped_count}")
-        else:
-             display_message("Failed to save imported data.", is_error=True)
+    if added_count:
+        if SNAPSHOT_ON_SAVE:
+            take_snapshot("import")
+        display_message(f"Import complete. Added: {added_count}, Skipped: {skipped_count}")
     else:
         display_message(f"No new countries to add. Skipped: {skipped_count}")
+
+
+def handle_incremental_import():
+    """Handle an incremental refresh from the source file."""
+    print("\nRows that changed since the last refresh overwrite the matching")
+    print("country's fields (cities are kept). Unchanged rows are skipped.")
+    remove_missing = confirm_action("Delete countries that are no longer in the source?")
+    
+    if not confirm_action("Proceed with refresh?"):
+        return
+    
+    try:
+        stats = incremental_import(get_repository(), remove_missing=remove_missing)
+    except TransactionError as e:
+        display_message(f"Failed to save imported data: {e}", is_error=True)
+        return
+    
+    if stats["source_unchanged"]:
+        display_message(f"Source unchanged since last refresh ({stats['unchanged']} rows).")
+        return
+    
+    print(f"\nAdded: {stats['added']}")
+    print(f"Updated: {stats['updated']}")
+    print(f"Unchanged: {stats['unchanged']}")
+    print(f"Removed from source: {stats['removed']}" + ("" if remove_missing else " (kept)"))
+    if stats["errors"]:
+        print(f"Rows with errors: {stats['errors']}")
+    if SNAPSHOT_ON_SAVE:
+        take_snapshot("incremental import")
+    display_message("Incremental refresh complete.")
+
+
+def handle_import_cities():
+    """Handle importing cities from a GeoNames cities dump."""
+    print("\n--- Import Cities from GeoNames ---")
+    print("Cities are matched to existing countries by ISO code.")
+    print("Cities already present in a country will be skipped.")
+    
+    path = input(f"Cities file (default: {CITIES_SOURCE_FILE}): ").strip() or CITIES_SOURCE_FILE
+    
+    try:
+        min_population = int(input("Minimum population (Enter for none): ").strip() or 0)
+        top_n_input = input("Max cities per country (Enter for all): ").strip()
+        top_n = int(top_n_input) if top_n_input else None
+    except ValueError:
+        display_message("Please enter a valid number", is_error=True)
+        return
+    
+    if not confirm_action("Proceed with import?"):
+        return
+    
+    print("\nImporting cities...")
+    try:
+        stats = import_geonames_cities(
+            get_repository(), path, min_population=min_population, top_n=top_n
+        )
+    except TransactionError as e:
+        display_message(f"Failed to save imported cities: {e}", is_error=True)
+        return
+    
+    if not stats["rows"]:
+        display_message(f"No cities could be read from '{path}'", is_error=True)
+        return
+    
+    print(f"\nRows read: {stats['rows']}")
+    print(f"  Below population threshold: {stats['below_threshold']}")
+    print(f"  Unknown country: {stats['unknown_country']}")
+    print(f"  Already present: {stats['duplicates']}")
+    if stats["errors"]:
+        print(f"  Unreadable rows: {stats['errors']}")
+    display_message(f"Import complete. Added {stats['added']} city(ies)")
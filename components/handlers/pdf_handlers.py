@@ -2,7 +2,7 @@
 PDF Handlers - UI logic for PDF export.
 """
 from ..menu_component import display_message
-from ..data_handler import list_countries
+from ..data_handler import get_report, list_countries
 from ..pdf_component import generate_pdf
 
 
@@ -23,7 +23,7 @@ def handle_export_pdf():
         filename += ".pdf"
     
     print(f"\nExporting {len(countries)} countries to PDF...")
-    success, result = generate_pdf(countries, filename)
+    success, result = generate_pdf(countries, filename, report=get_report())
     
     if success:
         display_message(f"PDF exported successfully: {result}")
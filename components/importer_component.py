@@ -1,55 +1,421 @@
 """
 Importer Component - Parse and import country data from source file.
 """
+import hashlib
+import heapq
+import json
 import os
-from typing import List, Tuple
-from .constants import SOURCE_FILE, CSV_MAPPING
+from contextlib import nullcontext
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+from .constants import (
+    SOURCE_FILE,
+    CSV_MAPPING,
+    CSV_FIELD_TYPES,
+    CSV_REQUIRED_COLUMNS,
+    CITIES_SOURCE_FILE,
+    GEONAMES_CITY_COLUMNS,
+    CITY_IMPORT_CHUNK_SIZE,
+    IMPORT_STATE_FILE,
+)
+from .journal_component import write_json_atomic
+from .transaction_component import TransactionError
 from country_types import Country, create_empty_country
 
-def parse_source_file() -> Tuple[List[dict], List[str]]:
+# Column mapping precompiled once: a single itemgetter pulls every mapped
+# column out of a split line in one C-level call.
+_MAPPED_FIELDS = tuple(CSV_MAPPING.values())
+_GET_MAPPED_COLUMNS = itemgetter(*CSV_MAPPING.keys())
+_MIN_COLUMNS = max(CSV_MAPPING) + 1
+_TYPED_FIELDS = tuple((field, kind) for field, kind in CSV_FIELD_TYPES.items() if field in _MAPPED_FIELDS)
+
+_CITY_COLUMN = {field: idx for idx, field in GEONAMES_CITY_COLUMNS.items()}
+_GET_CITY_COLUMNS = itemgetter(
+    _CITY_COLUMN["country_code"], _CITY_COLUMN["name"], _CITY_COLUMN["population"]
+)
+_MIN_CITY_COLUMNS = max(GEONAMES_CITY_COLUMNS) + 1
+
+
+def _iter_source_lines(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (line_number, line) for the data lines of a source file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            # Skip comments and empty lines
+            if not line.strip() or line.startswith('#') or line.startswith('ISO'):
+                continue
+            yield line_no, line
+
+
+def _convert_field(kind: str, raw: str):
+    """Convert a stripped source cell to its typed value (raises ValueError)."""
+    if kind == "list":
+        return [part.strip() for part in raw.split(",") if part.strip()]
+    if not raw:
+        return None
+    if kind == "int":
+        return int(raw)
+    if kind == "float":
+        return float(raw)
+    return raw
+
+
+def _parse_source_line(line_no: int, line: str) -> Tuple[Optional[dict], Optional[str]]:
+    """Parse one data line into a country record, or return an error."""
+    parts = line.split('\t')
+
+    # Basic validation of column count
+    if len(parts) < CSV_REQUIRED_COLUMNS:
+        return None, f"Line {line_no}: Insufficient columns"
+    if len(parts) < _MIN_COLUMNS:
+        parts.extend([""] * (_MIN_COLUMNS - len(parts)))
+
+    try:
+        country: Country = create_empty_country()
+        # Map fields from CSV columns to Country dict
+        country.update(zip(_MAPPED_FIELDS, map(str.strip, _GET_MAPPED_COLUMNS(parts))))
+    except Exception as e:
+        return None, f"Line {line_no}: Error parsing - {e}"
+    for field, kind in _TYPED_FIELDS:
+        raw = country[field]
+        try:
+            country[field] = _convert_field(kind, raw)
+        except ValueError:
+            return None, f"Line {line_no}: Invalid {field} '{raw}'"
+    return country, None
+
+
+def iter_source_records(path: str = SOURCE_FILE) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Stream records from a countryInfo.txt-style (GeoNames) TSV file.
+
+    The file is read line by line, so memory use is constant regardless
+    of file size.
+
+    Args:
+        path: Path of the source file
+
+    Yields:
+        Tuples of (line_number, country, error); exactly one of country
+        and error is set
+    """
+    if not os.path.exists(path):
+        yield 0, None, f"Source file not found: {path}"
+        return
+
+    try:
+        for line_no, line in _iter_source_lines(path):
+            country, error = _parse_source_line(line_no, line)
+            yield line_no, country, error
+    except Exception as e:
+        yield 0, None, f"File read error: {e}"
+
+
+def parse_source_file(path: str = SOURCE_FILE) -> Tuple[List[dict], List[str]]:
     """
     Parse the countryInfo.txt file.
-    
+
+    Args:
+        path: Path of the source file
+
     Returns:
         Tuple of (valid_countries, errors)
     """
     valid_countries = []
     errors = []
-    
-    if not os.path.exists(SOURCE_FILE):
-        return [], [f"Source file not found: {SOURCE_FILE}"]
-        
+
+    for _, country, error in iter_source_records(path):
+        if error:
+            errors.append(error)
+        else:
+            valid_countries.append(country)
+
+    return valid_countries, errors
+
+
+def iter_geonames_cities(path: str = CITIES_SOURCE_FILE) -> Iterator[Tuple[int, Optional[tuple], Optional[str]]]:
+    """
+    Stream cities from a GeoNames cities dump (e.g. cities15000.txt).
+
+    Args:
+        path: Path of the cities file
+
+    Yields:
+        Tuples of (line_number, (country_code, name, population), error);
+        exactly one of the city tuple and error is set
+    """
+    if not os.path.exists(path):
+        yield 0, None, f"Source file not found: {path}"
+        return
+
     try:
-        with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        for i, line in enumerate(lines):
-            line = line.strip()
-            # Skip comments and empty lines
-            if not line or line.startswith('#') or line.startswith('ISO'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip() or line.startswith('#'):
+                    continue
+                parts = line.rstrip('\r\n').split('\t')
+                if len(parts) < _MIN_CITY_COLUMNS:
+                    yield line_no, None, f"Line {line_no}: Insufficient columns"
+                    continue
+                country_code, name, population = _GET_CITY_COLUMNS(parts)
+                try:
+                    population = int(population) if population else 0
+                except ValueError:
+                    yield line_no, None, f"Line {line_no}: Invalid population '{population}'"
+                    continue
+                yield line_no, (country_code.upper(), name.strip(), population), None
+    except Exception as e:
+        yield 0, None, f"File read error: {e}"
+
+
+def import_geonames_cities(
+    repository,
+    path: str = CITIES_SOURCE_FILE,
+    min_population: int = 0,
+    top_n: Optional[int] = None,
+    chunk_size: int = CITY_IMPORT_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """
+    Attach cities from a GeoNames dump to the matching countries.
+
+    Rows are matched to countries via the repository's ISO index. On
+    backends that write changes incrementally (SQLite, journaled JSON)
+    cities are committed in transactions of at most ``chunk_size``, so
+    the import holds at most one chunk of pending rows. The plain JSON
+    backend rewrites the whole file on every commit, so there all cities
+    are staged in one transaction and written once at the end. Either
+    way the imported cities end up in the repository, which keeps its
+    data in memory on the JSON backend. With ``top_n`` only a bounded
+    heap of the most populous cities per country is kept until the end.
+    Cities already present in a country (case-insensitive) are skipped.
+
+    Args:
+        repository: Country repository (JSON or SQLite backend)
+        path: Path of the cities file
+        min_population: Ignore cities below this population
+        top_n: Keep at most this many cities per country (by population)
+        chunk_size: Number of cities committed per write (incremental backends)
+
+    Returns:
+        Dictionary of counters: rows, added, duplicates, below_threshold,
+        unknown_country, errors
+    """
+    stats = {
+        "rows": 0,
+        "added": 0,
+        "duplicates": 0,
+        "below_threshold": 0,
+        "unknown_country": 0,
+        "errors": 0,
+    }
+    index = repository.index
+    pending: List[Tuple[str, str]] = []
+
+    def stage(tx):
+        for iso, name in pending:
+            if tx.has_city(iso, name):
+                stats["duplicates"] += 1
+            else:
+                tx.add_city(iso, name)
+                stats["added"] += 1
+        pending.clear()
+
+    def flush():
+        if not pending:
+            return
+        if whole is not None:
+            stage(whole)
+            return
+        with repository.batch() as tx:
+            stage(tx)
+
+    known: Dict[str, bool] = {}
+    top: Dict[str, list] = {}
+    chunked = getattr(repository, "writes_incrementally", True)
+    with (nullcontext() if chunked else repository.batch()) as whole:
+        for line_no, city, error in iter_geonames_cities(path):
+            if error:
+                stats["errors"] += 1
                 continue
-                
-            parts = line.split('\t')
-            
-            # Basic validation of column count (max index in mapping is 16)
-            if len(parts) <= 16:
-                errors.append(f"Line {i+1}: Insufficient columns")
+            stats["rows"] += 1
+            iso, name, population = city
+            if population < min_population:
+                stats["below_threshold"] += 1
+                continue
+            if iso not in known:
+                known[iso] = iso in index
+            if not known[iso] or not name:
+                stats["unknown_country"] += 1
+                continue
+
+            if top_n:
+                heap = top.setdefault(iso, [])
+                entry = (population, -line_no, name)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heappushpop(heap, entry)
+                continue
+
+            pending.append((iso, name))
+            if len(pending) >= chunk_size:
+                flush()
+
+        # Top-N mode: write each country's most populous cities first
+        for iso, heap in top.items():
+            for _, _, name in sorted(heap, reverse=True):
+                pending.append((iso, name))
+                if len(pending) >= chunk_size:
+                    flush()
+        flush()
+
+    return stats
+
+
+def _mapping_fingerprint() -> str:
+    """Fingerprint of the column mapping and types; a change invalidates row hashes."""
+    mapping = json.dumps([sorted(CSV_MAPPING.items()), sorted(CSV_FIELD_TYPES.items())])
+    return hashlib.blake2b(mapping.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _row_fingerprint(line: str) -> str:
+    """Content hash of a raw source line."""
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _record_fingerprint(country) -> Optional[str]:
+    """Hash of the source-owned fields of a repository record (None if missing)."""
+    if country is None:
+        return None
+    values = json.dumps([country.get(field) for field in _MAPPED_FIELDS], sort_keys=True, default=str)
+    return hashlib.blake2b(values.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_import_state(state_file: str = IMPORT_STATE_FILE) -> dict:
+    """Load the fingerprints recorded by the last incremental import."""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def incremental_import(
+    repository,
+    path: str = SOURCE_FILE,
+    state_file: str = IMPORT_STATE_FILE,
+    remove_missing: bool = False,
+) -> Dict[str, int]:
+    """
+    Upsert only the source rows that changed since the last import.
+
+    The source file's path, size/mtime (and content hash) plus a hash of
+    every row and of the record it produced are stored in ``state_file``.
+    A row is skipped without being parsed only when both its hash and
+    the repository record still match; an untouched source file whose
+    records are all still in place is detected from its stat alone.
+    Changed rows overwrite the matching country's fields (its cities are
+    kept); new or deleted-since rows are added. Everything is committed
+    in a single transaction.
+
+    Args:
+        repository: Country repository (JSON or SQLite backend)
+        path: Path of the source file
+        state_file: Where fingerprints are kept between runs
+        remove_missing: Delete countries whose rows disappeared from the source
+
+    Returns:
+        Dictionary of counters: added, updated, unchanged, removed, errors,
+        plus source_unchanged (1 if the file was skipped entirely)
+    """
+    stats = {
+        "added": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "errors": 0,
+        "source_unchanged": 0,
+    }
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        stats["errors"] += 1
+        return stats
+
+    source = os.path.abspath(path)
+    state = load_import_state(state_file)
+    same_mapping = state.get("mapping") == _mapping_fingerprint() and state.get("source") == source
+    previous_rows: Dict[str, str] = state.get("rows", {}) if same_mapping else {}
+    previous_records: Dict[str, str] = state.get("records", {}) if same_mapping else {}
+
+    def record_unchanged(iso: str, country) -> bool:
+        return previous_records.get(iso) == _record_fingerprint(country)
+
+    # The repository can change behind the state file (a deleted or
+    # edited country), so an untouched source alone is not enough
+    index = repository.index
+    if (previous_rows and state.get("size") == st.st_size
+            and state.get("mtime_ns") == st.st_mtime_ns
+            and all(record_unchanged(iso, index.get_by_iso(iso)) for iso in previous_rows)):
+        stats["unchanged"] = len(previous_rows)
+        stats["source_unchanged"] = 1
+        return stats
+
+    rows: Dict[str, str] = {}
+    file_hash = hashlib.sha256()
+
+    def keep_previous(iso: str):
+        # A failed row keeps its country: remember the last imported
+        # fingerprint so the row is neither counted as removed nor skipped
+        # as unchanged on the next run.
+        if iso in previous_rows:
+            rows[iso] = previous_rows[iso]
+        else:
+            rows.pop(iso, None)
+
+    with repository.batch() as tx:
+        for line_no, line in _iter_source_lines(path):
+            file_hash.update(line.encode('utf-8'))
+            iso = line.split('\t', 1)[0].strip().upper()
+            fingerprint = _row_fingerprint(line)
+            rows[iso] = fingerprint
+            if previous_rows.get(iso) == fingerprint and record_unchanged(iso, tx.get(iso)):
+                stats["unchanged"] += 1
+                continue
+
+            country, error = _parse_source_line(line_no, line)
+            if error:
+                stats["errors"] += 1
+                keep_previous(iso)
                 continue
-                
             try:
-                country: Country = create_empty_country()
-                
-                # Map fields from CSV columns to Country dict
-                for idx, field in CSV_MAPPING.items():
-                    if idx < len(parts):
-                        country[field] = parts[idx].strip()
-                
-                valid_countries.append(country)
-                
-            except Exception as e:
-                errors.append(f"Line {i+1}: Error parsing - {e}")
-                
-    except Exception as e:
-        errors.append(f"File read error: {e}")
-        
-    return valid_countries, errors
+                current = tx.get(iso)
+                if current is None:
+                    tx.add(country)
+                    stats["added"] += 1
+                    continue
+                fields = {k: v for k, v in country.items() if k != "cities" and current.get(k) != v}
+                if fields:
+                    tx.update(iso, fields)
+                    stats["updated"] += 1
+                else:
+                    stats["unchanged"] += 1
+            except TransactionError:
+                stats["errors"] += 1
+                keep_previous(iso)
+
+        for iso in previous_rows.keys() - rows.keys():
+            stats["removed"] += 1
+            if remove_missing and iso in tx:
+                tx.delete(iso)
+
+    write_json_atomic(state_file, {
+        "source": source,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_hash.hexdigest(),
+        "mapping": _mapping_fingerprint(),
+        "rows": rows,
+        "records": {iso: _record_fingerprint(index.get_by_iso(iso)) for iso in rows},
+    }, indent=None)
+    return stats
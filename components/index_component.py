@@ -0,0 +1,382 @@
+"""
+Index Component - Hash indexes over country records for O(1) lookups.
+"""
+import bisect
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from country_types import NUMERIC_FIELDS
+from .columnar_component import to_number
+from .search_index import NGramIndex, fold_text, normalize_text
+
+
+def iso_key(value: str) -> str:
+    """Normalize an ISO/ISO3 code for index lookups."""
+    return (value or "").strip().upper()
+
+
+def name_key(value: str) -> str:
+    """Normalize a country or city name for index lookups (accent- and case-insensitive)."""
+    return fold_text((value or "").strip())
+
+
+def record_keys(country: dict) -> Dict[str, str]:
+    """Folded match/sort keys of the scalar fields of a record (cities are in CityIndex)."""
+    return {
+        field: normalize_text(value)
+        for field, value in country.items()
+        if value is not None and not isinstance(value, (list, tuple))
+    }
+
+
+def common_prefix(old: Sequence, new: Sequence) -> int:
+    """Number of leading elements two lists share."""
+    limit = min(len(old), len(new))
+    if list(old[:limit]) == list(new[:limit]):
+        # Appends and truncations, the common case, take one C-level comparison
+        return limit
+    start = 0
+    while old[start] == new[start]:
+        start += 1
+    return start
+
+
+def list_splice(old: Sequence, new: Sequence) -> Tuple[int, int, list]:
+    """
+    Single edit turning one list into another (common prefix and suffix kept).
+
+    Returns:
+        Tuple of (start, deleted, inserted) such that
+        new == old[:start] + inserted + old[start + deleted:]
+    """
+    old, new = list(old), list(new)
+    start = common_prefix(old, new)
+    limit = min(len(old), len(new))
+    end = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    return start, len(old) - start - end, new[start:len(new) - end]
+
+
+def apply_splice(values: Sequence, splice: Sequence) -> list:
+    """Apply a (start, deleted, inserted) edit from list_splice."""
+    start, deleted, inserted = splice
+    return list(values[:start]) + list(inserted) + list(values[start + deleted:])
+
+
+def sort_numeric(records: Iterable[dict], field: str, descending: bool = False) -> List[dict]:
+    """Records ordered by the value of a numeric field; records without one come last."""
+    records = list(records)
+    ordered = sorted(
+        (c for c in records if to_number(c.get(field)) is not None),
+        key=lambda c: to_number(c.get(field)),
+        reverse=descending,
+    )
+    return ordered + [c for c in records if to_number(c.get(field)) is None]
+
+
+class CityIndex:
+    """
+    Reverse index from normalized city name to (iso, position) pairs.
+
+    Exact lookups are a dict access. The sorted key list (prefix lookups)
+    and the n-gram index over city names (substring lookups) are built
+    on first use and maintained incrementally after that.
+    """
+
+    def __init__(self):
+        self.by_name: Dict[str, Set[Tuple[str, int]]] = {}
+        self._sorted: Optional[List[str]] = None
+        self._grams: Optional[NGramIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def add(self, iso: str, position: int, city: str):
+        """Register a city at a list position of a country."""
+        key = name_key(city)
+        entries = self.by_name.get(key)
+        if entries is None:
+            self.by_name[key] = {(iso, position)}
+            if self._sorted is not None:
+                bisect.insort(self._sorted, key)
+            if self._grams is not None:
+                self._grams.add(key, key)
+        else:
+            entries.add((iso, position))
+
+    def remove(self, iso: str, position: int, city: str):
+        """Unregister a city at a list position of a country."""
+        key = name_key(city)
+        entries = self.by_name.get(key)
+        if entries is None:
+            return
+        entries.discard((iso, position))
+        if entries:
+            return
+        del self.by_name[key]
+        if self._sorted is not None:
+            i = bisect.bisect_left(self._sorted, key)
+            if i < len(self._sorted) and self._sorted[i] == key:
+                del self._sorted[i]
+        if self._grams is not None:
+            self._grams.remove(key, key)
+
+    def add_cities(self, iso: str, cities: List[str], start: int = 0):
+        """Register the cities of a country from a list position onwards."""
+        for position in range(start, len(cities)):
+            self.add(iso, position, cities[position])
+
+    def remove_cities(self, iso: str, cities: List[str], start: int = 0):
+        """Unregister the cities of a country from a list position onwards."""
+        for position in range(start, len(cities)):
+            self.remove(iso, position, cities[position])
+
+    def replace_cities(self, iso: str, old: List[str], new: List[str]):
+        """Re-index a country's cities, touching only positions that changed."""
+        start = common_prefix(old, new)
+        self.remove_cities(iso, old, start)
+        self.add_cities(iso, new, start)
+
+    def exact(self, city: str) -> Set[Tuple[str, int]]:
+        """Return (iso, position) pairs of cities with exactly this name."""
+        return set(self.by_name.get(name_key(city), ()))
+
+    def prefix(self, text: str) -> Set[Tuple[str, int]]:
+        """Return (iso, position) pairs of cities whose name starts with the text."""
+        if self._sorted is None:
+            self._sorted = sorted(self.by_name)
+        needle = name_key(text)
+        found: Set[Tuple[str, int]] = set()
+        for i in range(bisect.bisect_left(self._sorted, needle), len(self._sorted)):
+            key = self._sorted[i]
+            if not key.startswith(needle):
+                break
+            found |= self.by_name[key]
+        return found
+
+    def substring(self, text: str) -> Set[Tuple[str, int]]:
+        """Return (iso, position) pairs of cities whose name contains the text."""
+        if self._grams is None:
+            self._grams = NGramIndex()
+            for key in self.by_name:
+                self._grams.add(key, key)
+        needle = name_key(text)
+        candidates = self._grams.candidates(needle)
+        keys = self.by_name.keys() if candidates is None else candidates
+        found: Set[Tuple[str, int]] = set()
+        for key in keys:
+            if needle in key:
+                found |= self.by_name[key]
+        return found
+
+
+class CountryIndex:
+    """
+    Maintained lookup tables for country records.
+
+    Keeps ISO2 -> record, ISO3 -> record and folded name -> record
+    maps, the city reverse index and each record's folded keys in sync
+    with every mutation. The ISO2 map preserves insertion order and
+    doubles as the primary record store.
+
+    Args:
+        countries: Records to index
+        index_cities: Maintain the city reverse index (an index only
+            used for ISO/ISO3/name uniqueness checks can skip it)
+    """
+
+    def __init__(self, countries: Optional[Iterable[dict]] = None, index_cities: bool = True):
+        self.index_cities = index_cities
+        self.by_iso: Dict[str, dict] = {}
+        self.by_iso3: Dict[str, dict] = {}
+        self.by_name: Dict[str, dict] = {}
+        self.cities = CityIndex()
+        # iso -> folded keys of the record's fields (see record_keys)
+        self.keys: Dict[str, Dict[str, str]] = {}
+        for country in countries or []:
+            self.add(country)
+
+    def __len__(self) -> int:
+        return len(self.by_iso)
+
+    def __contains__(self, iso: str) -> bool:
+        return iso_key(iso) in self.by_iso
+
+    def records(self) -> List[dict]:
+        """Return all indexed records in insertion order."""
+        return list(self.by_iso.values())
+
+    def add(self, country: dict):
+        """Index a record (replacing any record with the same ISO code)."""
+        iso = iso_key(country.get("iso", ""))
+        old = self.by_iso.get(iso)
+        if old is not None:
+            self.replace(old, country)
+            return
+        self.by_iso[iso] = country
+        self._add_secondary(country)
+
+    def remove(self, country: dict):
+        """Remove a record from every index it is registered in."""
+        iso = iso_key(country.get("iso", ""))
+        if self.by_iso.get(iso) is country:
+            del self.by_iso[iso]
+        self._remove_secondary(country)
+
+    def replace(self, old: dict, new: dict):
+        """Swap a record for its updated version, keeping its position."""
+        iso = iso_key(old.get("iso", ""))
+        if iso_key(new.get("iso", "")) != iso:
+            self.remove(old)
+            self.add(new)
+            return
+        self._remove_secondary(old, cities=False)
+        self.by_iso[iso] = new
+        self._add_secondary(new, cities=False)
+        if self.index_cities:
+            self.cities.replace_cities(iso, old.get("cities") or [], new.get("cities") or [])
+
+    def _add_secondary(self, country: dict, cities: bool = True):
+        self.keys[iso_key(country.get("iso", ""))] = record_keys(country)
+        if cities and self.index_cities:
+            self.cities.add_cities(iso_key(country.get("iso", "")), country.get("cities") or [])
+        iso3 = iso_key(country.get("iso3", ""))
+        if iso3:
+            self.by_iso3[iso3] = country
+        name = name_key(country.get("country", ""))
+        if name:
+            self.by_name[name] = country
+
+    def _remove_secondary(self, country: dict, cities: bool = True):
+        iso = iso_key(country.get("iso", ""))
+        if self.by_iso.get(iso) is None:
+            self.keys.pop(iso, None)
+        if cities and self.index_cities:
+            self.cities.remove_cities(iso_key(country.get("iso", "")), country.get("cities") or [])
+        for table, key in (
+            (self.by_iso3, iso_key(country.get("iso3", ""))),
+            (self.by_name, name_key(country.get("country", ""))),
+        ):
+            if table.get(key) is country:
+                del table[key]
+
+    def sort_key(self, country: dict, field: str) -> str:
+        """Precomputed folded sort key of a field of an indexed record."""
+        keys = self.keys.get(iso_key(country.get("iso", "")))
+        if keys is None:
+            return normalize_text(country.get(field, ""))
+        return keys.get(field, "")
+
+    def sorted_by(self, field: str, descending: bool = False) -> List[dict]:
+        """
+        Return the records sorted by a field using the precomputed keys.
+
+        Numeric fields sort by value (see sort_numeric).
+        """
+        if field in NUMERIC_FIELDS:
+            return sort_numeric(self.by_iso.values(), field, descending)
+        keys = self.keys
+        return sorted(
+            self.by_iso.values(),
+            key=lambda c: keys[iso_key(c.get("iso", ""))].get(field, ""),
+            reverse=descending,
+        )
+
+    def get_by_iso(self, iso: str) -> Optional[dict]:
+        """Return the record with the given ISO2 code."""
+        return self.by_iso.get(iso_key(iso))
+
+    def get_by_iso3(self, iso3: str) -> Optional[dict]:
+        """Return the record with the given ISO3 code."""
+        return self.by_iso3.get(iso_key(iso3))
+
+    def get_by_name(self, name: str) -> Optional[dict]:
+        """Return the record with the given country name (case-insensitive)."""
+        return self.by_name.get(name_key(name))
+
+    def has_city(self, iso: str, city: str, exclude_position: Optional[int] = None) -> bool:
+        """
+        Check whether a country has a city (case-insensitive).
+
+        Args:
+            iso: ISO code of the country
+            city: City name
+            exclude_position: List position to ignore (for renames)
+
+        Returns:
+            True if another city with that name exists in the country
+        """
+        key = iso_key(iso)
+        return any(
+            entry_iso == key and position != exclude_position
+            for entry_iso, position in self.cities.by_name.get(name_key(city), ())
+        )
+
+    def countries_with_city(self, city: str, match: str = "exact") -> List[dict]:
+        """
+        Return the countries having a matching city, in dataset order.
+
+        Args:
+            city: City name or fragment
+            match: "exact", "prefix" or "substring"
+
+        Returns:
+            List of records
+        """
+        if match == "exact":
+            found = self.cities.exact(city)
+        elif match == "prefix":
+            found = self.cities.prefix(city)
+        else:
+            found = self.cities.substring(city)
+        isos = {iso for iso, _ in found}
+        if not isos:
+            return []
+        return [record for iso, record in self.by_iso.items() if iso in isos]
+
+    def lookup(self, field: str, value: str) -> Optional[dict]:
+        """
+        Look up a record by one of the unique fields.
+
+        Args:
+            field: One of "iso", "iso3" or "country"
+            value: Value to look up
+
+        Returns:
+            Matching record or None
+        """
+        if field == "iso":
+            return self.get_by_iso(value)
+        if field == "iso3":
+            return self.get_by_iso3(value)
+        if field == "country":
+            return self.get_by_name(value)
+        raise ValueError(f"Field '{field}' is not indexed")
+
+    def is_taken(self, field: str, value: str, exclude_iso: str = "") -> bool:
+        """Check whether a unique field value belongs to another country."""
+        if not value:
+            return False
+        found = self.lookup(field, value)
+        if found is None:
+            return False
+        return not (exclude_iso and iso_key(found.get("iso", "")) == iso_key(exclude_iso))
+
+    def find_conflict(self, data: dict, exclude_iso: str = "") -> Tuple[bool, str]:
+        """
+        Validate that the unique fields of a record are not already used.
+
+        Args:
+            data: Country data to validate
+            exclude_iso: ISO code to exclude (for edits)
+
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if self.is_taken("iso", data.get("iso", ""), exclude_iso):
+            return False, f"ISO code '{iso_key(data.get('iso', ''))}' already exists"
+        if self.is_taken("iso3", data.get("iso3", ""), exclude_iso):
+            return False, f"ISO3 code '{iso_key(data.get('iso3', ''))}' already exists"
+        if self.is_taken("country", data.get("country", ""), exclude_iso):
+            return False, f"Country name '{data.get('country')}' already exists"
+        return True, ""
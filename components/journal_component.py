@@ -0,0 +1,163 @@
+"""
+Journal Component - Append-only change log for the country data file.
+"""
+import json
+import os
+import tempfile
+from typing import List, Optional
+
+
+def write_json_temp(path: str, data: dict, indent: Optional[int] = 2) -> str:
+    """
+    Write JSON to a new temporary file next to ``path`` and return its path.
+
+    Every call gets its own file (mkstemp), so concurrent writers of the
+    same target never share a temporary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path))
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def write_json_atomic(path: str, data: dict, indent: Optional[int] = 2) -> None:
+    """
+    Write JSON to a temporary file and atomically move it into place.
+
+    A crash mid-write leaves the previous file untouched instead of a
+    truncated one.
+    """
+    os.replace(write_json_temp(path, data, indent), path)
+
+
+class ChangeJournal:
+    """
+    JSON-lines write-ahead journal.
+
+    Every entry is one compact line: {"seq", "op", "iso", "fields"}, plus
+    "splices" ({field: [start, deleted, inserted]}) for list fields an
+    update changed.
+    Sequence numbers increase monotonically; the snapshot records the
+    last sequence number it contains, so replay simply skips entries at
+    or below it. That makes a crash at any point during compaction safe.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_seq = 0
+        self.entry_count = 0
+
+    def signature(self) -> Optional[tuple]:
+        """Return the (mtime, size, inode) signature of the journal file."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def size(self) -> int:
+        """Return the journal size in bytes."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, after_seq: int = 0) -> List[dict]:
+        """
+        Read journal entries newer than a snapshot.
+
+        Args:
+            after_seq: Sequence number already contained in the snapshot
+
+        Returns:
+            List of entries in write order
+        """
+        entries = []
+        self.entry_count = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append
+                        print(f"Warning: Skipping corrupt journal line {line_no}")
+                        continue
+                    seq = entry.get("seq", 0)
+                    self.last_seq = max(self.last_seq, seq)
+                    if seq > after_seq:
+                        entries.append(entry)
+                        self.entry_count += 1
+        except FileNotFoundError:
+            pass
+        self.last_seq = max(self.last_seq, after_seq)
+        return entries
+
+    def append(self, entries: List[dict]) -> bool:
+        """
+        Append entries (assigning sequence numbers) with a single write.
+
+        Returns:
+            True if the entries reached the disk, False otherwise
+        """
+        lines = []
+        seq = self.last_seq
+        for entry in entries:
+            seq += 1
+            entry["seq"] = seq
+            lines.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        try:
+            if self._ends_mid_line():
+                # Terminate a torn line left by a crash so it stays isolated
+                lines.insert(0, "")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error writing journal: {e}")
+            return False
+        self.last_seq = seq
+        self.entry_count += len(entries)
+        return True
+
+    def _ends_mid_line(self) -> bool:
+        """Check whether the journal's last line is missing its newline."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except FileNotFoundError:
+            return False
+
+    def trim(self, upto_seq: int) -> None:
+        """Drop entries that are now contained in the snapshot."""
+        remaining = self.read(after_seq=upto_seq)
+        if not remaining:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.entry_count = 0
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in remaining:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,154 @@
+"""
+Language Component - Parsed, indexed language codes of the countries.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def parse_language_tag(tag: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Normalize one language tag.
+
+    "EN-us" -> ("en-US", "en", "US"); "fa" -> ("fa", "fa", "").
+    Script subtags ("sr-Latn-RS") are kept in the tag but only the
+    base language and the region are indexed separately.
+
+    Args:
+        tag: Language tag
+
+    Returns:
+        Tuple of (tag, base language, region), or None for an empty tag
+    """
+    parts = [part for part in tag.strip().replace("_", "-").split("-") if part]
+    if not parts:
+        return None
+    base = parts[0].lower()
+    region = ""
+    subtags = [base]
+    for part in parts[1:]:
+        if len(part) == 2 and part.isalpha() or len(part) == 3 and part.isdigit():
+            region = part.upper()
+            subtags.append(region)
+        else:
+            subtags.append(part.title() if len(part) == 4 else part.lower())
+    return "-".join(subtags), base, region
+
+
+def parse_languages(value: str) -> List[Tuple[str, str, str]]:
+    """
+    Parse a comma-separated languages field.
+
+    Args:
+        value: e.g. "ar-AE,fa,en,hi,ur"
+
+    Returns:
+        List of (tag, base language, region) tuples, duplicates removed
+    """
+    tokens = []
+    for raw in (value or "").split(","):
+        token = parse_language_tag(raw)
+        if token is not None and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def language_matches(value: str, query: str) -> bool:
+    """
+    Check one languages field against a query without building an index.
+
+    Same rules as LanguageIndex.find: "en" -> base language, "en-US" ->
+    exact tag, "-US" -> region.
+
+    Args:
+        value: Languages field, e.g. "ar-AE,fa,en"
+        query: Language query
+
+    Returns:
+        True if the field matches
+    """
+    query = query.strip()
+    tokens = parse_languages(value)
+    if query.startswith("-"):
+        region = query[1:].strip().upper()
+        return bool(region) and any(token[2] == region for token in tokens)
+    if "-" in query or "_" in query:
+        parsed = parse_language_tag(query)
+        return parsed is not None and any(token[0].casefold() == parsed[0].casefold() for token in tokens)
+    return any(token[1] == query.lower() for token in tokens)
+
+
+class LanguageIndex:
+    """
+    Inverted index from language tag, base language and region to records.
+
+    Built once per data version (see repository.derived). Every lookup
+    returns its posting list directly, so it costs O(matches).
+    """
+
+    def __init__(self, countries: Iterable[dict]):
+        self.records: List[dict] = list(countries)
+        self.by_tag: Dict[str, List[int]] = {}
+        self.by_base: Dict[str, List[int]] = {}
+        self.by_region: Dict[str, List[int]] = {}
+        self.tag_counts: Counter = Counter()
+        self.base_counts: Counter = Counter()
+        for doc_id, country in enumerate(self.records):
+            for tag, base, region in parse_languages(country.get("languages", "")):
+                self.tag_counts[tag] += 1
+                self._post(self.by_tag, tag.casefold(), doc_id)
+                if self._post(self.by_base, base, doc_id):
+                    self.base_counts[base] += 1
+                if region:
+                    self._post(self.by_region, region, doc_id)
+
+    @staticmethod
+    def _post(table: Dict[str, List[int]], key: str, doc_id: int) -> bool:
+        """Append a doc id to a posting list once; return True if it was new."""
+        ids = table.setdefault(key, [])
+        if ids and ids[-1] == doc_id:
+            return False
+        ids.append(doc_id)
+        return True
+
+    def _records(self, ids: List[int]) -> List[dict]:
+        return [self.records[doc_id] for doc_id in ids]
+
+    def exact(self, tag: str) -> List[dict]:
+        """Countries listing exactly this tag ("en" does not match "en-US")."""
+        parsed = parse_language_tag(tag)
+        return self._records(self.by_tag.get(parsed[0].casefold(), [])) if parsed else []
+
+    def base(self, language: str) -> List[dict]:
+        """Countries speaking a base language in any variant ("en" matches "en-US")."""
+        return self._records(self.by_base.get(language.strip().lower(), []))
+
+    def region(self, region: str) -> List[dict]:
+        """Countries listing a language variant of a region ("US" matches "en-US", "es-US")."""
+        return self._records(self.by_region.get(region.strip().upper(), []))
+
+    def find(self, query: str) -> List[dict]:
+        """
+        Dispatch a user query.
+
+        "en" -> base language, "en-US" -> exact tag, "-US" -> region.
+
+        Args:
+            query: Language query
+
+        Returns:
+            Matching records in dataset order
+        """
+        query = query.strip()
+        if query.startswith("-"):
+            return self.region(query[1:])
+        if "-" in query or "_" in query:
+            return self.exact(query)
+        return self.base(query)
+
+    def top_tags(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """Most common language tags (e.g. "en-US" and "en" counted separately)."""
+        return self.tag_counts.most_common(limit)
+
+    def top_bases(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """Most common base languages (each country counted once per language)."""
+        return self.base_counts.most_common(limit)
@@ -4,6 +4,8 @@ Menu Component - Handles console UI and user interaction.
 import os
 from typing import List, Optional
 from components.constants import APP_NAME, APP_VERSION, CREATORS, APP_INTRO
+from components.index_component import name_key
+from country_types import CONTINENTS, NUMERIC_FIELDS
 from components.colors import (
     header, success, error, warning, info, highlight, dim, bold,
     menu_item, table_header, field_label, field_value,
@@ -96,10 +98,13 @@ def display_menu(is_super_user: bool = False) -> str:
         print(menu_item("8", "Import from Source"))
     
     print(menu_item("9", "Statistics"))
+    print(menu_item("B", "Border routes"))
     
     if is_super_user:
         print(separator("-", 30))
         print(menu_item("C", "Manage Cities"))
+        print(menu_item("V", "Verify Statistics"))
+        print(menu_item("H", "Data History"))
     
     print(separator("-", 30))
     print(menu_item("0", "Exit / Logout"))
@@ -129,6 +134,18 @@ def display_countries(countries: List[dict], detailed: bool = False):
             print(highlight(f"── {country.get('country', 'N/A')} ──"))
             print(f"  {field_label('ISO:')}             {field_value(country.get('iso', 'N/A'))}")
             print(f"  {field_label('ISO3:')}            {field_value(country.get('iso3', 'N/A'))}")
+            print(f"  {field_label('ISO Numeric:')}     {field_value(_format_number(country.get('iso_numeric'), '03d'))}")
+            print(f"  {field_label('Capital:')}         {field_value(country.get('capital') or 'N/A')}")
+            continent = country.get('continent') or ''
+            print(f"  {field_label('Continent:')}       {field_value(continent or 'N/A')}"
+                  f"{dim(f' ({CONTINENTS[continent]})') if continent in CONTINENTS else ''}")
+            print(f"  {field_label('Area:')}            {field_value(_format_number(country.get('area'), ',.0f'))} km²")
+            print(f"  {field_label('Population:')}      {field_value(_format_number(country.get('population'), ',d'))}")
+            area, population = country.get('area'), country.get('population')
+            if area and population is not None:
+                print(f"  {field_label('Density:')}         {field_value(f'{population / area:,.1f}')} /km²")
+            neighbours = country.get('neighbours') or []
+            print(f"  {field_label('Neighbours:')}      {field_value(', '.join(neighbours)) if neighbours else dim('N/A')}")
             print(f"  {field_label('TLD:')}             {field_value(country.get('tld', 'N/A'))}")
             print(f"  {field_label('Currency:')}        {field_value(country.get('currency_code', 'N/A'))} ({country.get('currency_name', 'N/A')})")
             print(f"  {field_label('Phone:')}           {field_value(country.get('phone', 'N/A'))}")
@@ -151,6 +168,16 @@ def display_countries(countries: List[dict], detailed: bool = False):
                   f"{country.get('phone', ''):<10}")
 
 
+def _format_number(value, spec: str) -> str:
+    """Format a numeric field, 'N/A' when missing."""
+    if value is None or value == "":
+        return "N/A"
+    try:
+        return format(int(value) if spec.endswith("d") else value, spec)
+    except (TypeError, ValueError):
+        return str(value)
+
+
 def display_country_detail(country: dict):
     """
     Display detailed information for a single country.
@@ -161,13 +188,13 @@ def display_country_detail(country: dict):
     display_countries([country], detailed=True)
 
 
-def get_country_input(existing: Optional[dict] = None, countries: list = None, exclude_iso: str = "") -> dict:
+def get_country_input(existing: Optional[dict] = None, countries=None, exclude_iso: str = "") -> dict:
     """
     Get country data from user input with real-time validation.
     
     Args:
         existing: Existing country data for editing (optional)
-        countries: List of existing countries for validation (optional)
+        countries: CountryIndex (or list) of existing countries for validation (optional)
         exclude_iso: ISO code to exclude from validation (for editing)
         
     Returns:
@@ -191,24 +218,32 @@ def get_country_input(existing: Optional[dict] = None, countries: list = None, e
         if not countries or not value:
             return True
         
-        value_upper = value.upper() if field_name in ("iso", "iso3") else value.lower()
+        if hasattr(countries, "is_taken"):
+            # Indexed lookup: O(1) per prompt
+            taken = countries.is_taken(field_name, value, exclude_iso)
+        else:
+            value_key = value.upper() if field_name in ("iso", "iso3") else name_key(value)
+            taken = False
+            for country in countries:
+                current_iso = country.get("iso", "").upper()
+                
+                # Skip the country being edited
+                if exclude_iso and current_iso == exclude_iso.upper():
+                    continue
+                
+                existing_value = country.get(field_name, "")
+                if field_name in ("iso", "iso3"):
+                    existing_value = existing_value.upper()
+                else:
+                    existing_value = name_key(existing_value)
+                
+                if existing_value == value_key:
+                    taken = True
+                    break
         
-        for country in countries:
-            current_iso = country.get("iso", "").upper()
-            
-            # Skip the country being edited
-            if exclude_iso and current_iso == exclude_iso.upper():
-                continue
-            
-            existing_value = country.get(field_name, "")
-            if field_name in ("iso", "iso3"):
-                existing_value = existing_value.upper()
-            else:
-                existing_value = existing_value.lower()
-            
-            if existing_value == value_upper:
-                print(error(f"  ✗ {display_name} '{value}' already exists!"))
-                return False
+        if taken:
+            print(error(f"  ✗ {display_name} '{value}' already exists!"))
+            return False
         
         print(success(f"  ✓ {display_name} is available"))
         return True
@@ -246,6 +281,42 @@ def get_country_input(existing: Optional[dict] = None, countries: list = None, e
         if validate_unique_field("country", country_name, "Country Name"):
             break
     
+    def get_number(field_name: str, display_name: str):
+        """Prompt for a numeric field until it parses (Enter keeps the current value, '-' clears it)."""
+        kind = NUMERIC_FIELDS[field_name]
+        current = existing.get(field_name) if existing else None
+        while True:
+            prompt = f"{display_name}" + (f" [{current}]" if current is not None else "") + ": "
+            value = input(prompt).strip().replace(",", "")
+            if not value:
+                return current
+            if value == "-":
+                return None
+            try:
+                number = kind(value)
+            except ValueError:
+                print(error(f"  ✗ {display_name} must be a {'whole ' if kind is int else ''}number"))
+                continue
+            if number < 0:
+                print(error(f"  ✗ {display_name} cannot be negative"))
+                continue
+            return number
+    
+    def get_continent() -> str:
+        while True:
+            value = get_field("continent", f"Continent ({'/'.join(CONTINENTS)})").upper()
+            if not value or value in CONTINENTS:
+                return value
+            print(error(f"  ✗ Continent must be one of {', '.join(CONTINENTS)}"))
+    
+    def get_neighbours() -> list:
+        current = existing.get("neighbours", []) if existing else []
+        prompt = "Neighbours (ISO codes, comma-separated)" + (f" [{','.join(current)}]" if current else "") + ": "
+        value = input(prompt).strip()
+        if not value:
+            return current
+        return [code.strip().upper() for code in value.split(",") if code.strip()]
+    
     # Get remaining fields (no uniqueness validation needed)
     return {
         "iso": iso,
@@ -259,6 +330,12 @@ def get_country_input(existing: Optional[dict] = None, countries: list = None, e
         "postal_code_regex": get_field("postal_code_regex", "Postal Code Regex"),
         "languages": get_field("languages", "Languages"),
         "geonameid": get_field("geonameid", "GeoName ID"),
+        "iso_numeric": get_number("iso_numeric", "ISO Numeric"),
+        "capital": get_field("capital", "Capital"),
+        "continent": get_continent(),
+        "area": get_number("area", "Area (km²)"),
+        "population": get_number("population", "Population"),
+        "neighbours": get_neighbours(),
         "cities": get_cities_field(existing),
     }
 
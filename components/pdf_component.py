@@ -2,7 +2,7 @@
 PDF Component - Generates PDF reports for country data.
 """
 import os
-from typing import List
+from typing import List, Optional
 from fpdf import FPDF
 
 # Get the directory where this script is located
@@ -131,8 +131,75 @@ class CountryPDF(FPDF):
                 self.cell(total_width, 6, cities_str, border=1, fill=True)
                 self.ln()
 
+    def create_statistics_section(self, report: dict):
+        """Render a run_metrics report (see analytics_component.REPORT_METRICS)."""
+        self.add_page()
+        self.set_font("Helvetica", "B", 16)
+        self.cell(0, 10, "3. Statistics", ln=True)
+        self.ln(5)
+
+        cities = report.get("cities_per_country", {})
+        self.set_font("Helvetica", "", 10)
+        summary = [
+            f"Countries: {report.get('countries', 0)}",
+            f"Cities: {cities.get('total', 0)} (per country: min {cities.get('min', 0)}, "
+            f"mean {cities.get('mean', 0)}, max {cities.get('max', 0)})",
+            f"Distinct currencies: {report.get('distinct_currencies', 0)}",
+            f"Distinct languages: {report.get('distinct_languages', 0)}",
+        ]
+        population = report.get("population") or {}
+        if population.get("count"):
+            summary.append(f"Population: {population['sum']:,.0f} (median {population['p50']:,.0f})")
+            if report.get("density") is not None:
+                summary.append(f"Density: {report['density']:,.2f} people/km2")
+        for line in summary:
+            self.cell(0, 6, line, ln=True)
+        self.ln(4)
+
+        for key, title in (
+            ("top_currencies", "Top Currencies"),
+            ("top_tlds", "Top Top-Level Domains"),
+            ("top_languages", "Top Languages"),
+        ):
+            self.set_font("Helvetica", "B", 11)
+            self.cell(0, 8, title, ln=True)
+            self.set_font("Helvetica", "", 9)
+            for value, count in report.get(key, []):
+                self.cell(60, 6, str(value), border=1)
+                self.cell(20, 6, str(count), border=1, align="R")
+                self.ln()
+            self.ln(4)
 
-def generate_pdf(countries: List[dict], filename: str = "countries_report.pdf") -> tuple[bool, str]:
+        by_currency = report.get("languages_by_currency", {})
+        if by_currency:
+            self.set_font("Helvetica", "B", 11)
+            self.cell(0, 8, "Main Languages of the Top Currencies", ln=True)
+            self.set_font("Helvetica", "", 9)
+            for currency, _ in report.get("top_currencies", []):
+                langs = ", ".join(f"{lang} ({count})" for lang, count in by_currency.get(currency, []))
+                self.cell(20, 6, str(currency), border=1, align="C")
+                self.cell(140, 6, langs, border=1)
+                self.ln()
+
+        by_continent = report.get("population_by_continent", {})
+        if by_continent:
+            density = report.get("density_by_continent", {})
+            self.ln(4)
+            self.set_font("Helvetica", "B", 11)
+            self.cell(0, 8, "Population by Continent", ln=True)
+            self.set_font("Helvetica", "", 9)
+            for code, stats in by_continent.items():
+                people = density.get(code)
+                self.cell(20, 6, str(code), border=1, align="C")
+                self.cell(20, 6, str(stats["count"]), border=1, align="R")
+                self.cell(45, 6, f"{stats['sum']:,.0f}", border=1, align="R")
+                self.cell(45, 6, f"{stats['p50']:,.0f}", border=1, align="R")
+                self.cell(30, 6, "-" if people is None else f"{people:,.1f}/km2", border=1, align="R")
+                self.ln()
+
+
+def generate_pdf(countries: List[dict], filename: str = "countries_report.pdf",
+                 report: Optional[dict] = None) -> tuple[bool, str]:
     try:
         pdf = CountryPDF()
         
@@ -145,6 +212,10 @@ def generate_pdf(countries: List[dict], filename: str = "countries_report.pdf")
         # 3. Data Table
         pdf.create_data_table(countries)
         
+        # 4. Statistics (precomputed report shared with the dashboard)
+        if report:
+            pdf.create_statistics_section(report)
+        
         # Save
         output_path = os.path.join(BASE_DIR, filename)
         pdf.output(output_path)
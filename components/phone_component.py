@@ -0,0 +1,145 @@
+"""
+Phone Component - Longest-prefix dialing-code lookups.
+"""
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+_PREFIX_SEPARATOR_RE = re.compile(r"\s+and\s+|[,;/]")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Key under which a trie node stores the countries owning its prefix
+_OWNERS = ""
+
+
+def parse_phone_prefixes(value: str) -> List[str]:
+    """
+    Parse a free-text phone field into digit-only dialing prefixes.
+
+    Args:
+        value: Phone field, e.g. "+1-809 and 1-829" or "376"
+
+    Returns:
+        List of prefixes, e.g. ["1809", "1829"]
+    """
+    prefixes = []
+    for part in _PREFIX_SEPARATOR_RE.split(value or ""):
+        digits = _NON_DIGIT_RE.sub("", part)
+        if digits and digits not in prefixes:
+            prefixes.append(digits)
+    return prefixes
+
+
+def normalize_number(number: str) -> str:
+    """
+    Reduce an international number to its digits.
+
+    "+1 (268) 555-0100" -> "12685550100"; a leading "00" international
+    access code is dropped as well.
+    """
+    number = number.strip()
+    digits = _NON_DIGIT_RE.sub("", number)
+    if not number.startswith("+") and digits.startswith("00"):
+        digits = digits[2:]
+    return digits
+
+
+class PhoneTrie:
+    """
+    Digit trie of the dialing prefixes of every country.
+
+    A lookup walks at most as many nodes as the longest prefix (seven
+    digits for "+44-1481"), whatever the number of countries.
+    """
+
+    def __init__(self, countries: Iterable[dict] = ()):
+        self._root: Dict[str, dict] = {}
+        self.prefix_count = 0
+        for country in countries:
+            for prefix in parse_phone_prefixes(country.get("phone", "")):
+                self.add(prefix, country.get("iso", ""))
+
+    def add(self, prefix: str, iso: str):
+        """Register a country as owner of a dialing prefix."""
+        node = self._root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        owners = node.setdefault(_OWNERS, [])
+        if not owners:
+            self.prefix_count += 1
+        if iso not in owners:
+            owners.append(iso)
+
+    def lookup(self, number: str) -> Tuple[str, List[str]]:
+        """
+        Find the countries owning the longest prefix of a number.
+
+        Args:
+            number: International number in any common notation
+
+        Returns:
+            Tuple of (matched prefix, ISO codes); ("", []) if nothing matches
+        """
+        digits = normalize_number(number)
+        node = self._root
+        best_depth, best = 0, None
+        for depth, digit in enumerate(digits, 1):
+            node = node.get(digit)
+            if node is None:
+                break
+            owners = node.get(_OWNERS)
+            if owners:
+                best_depth, best = depth, owners
+        if best is None:
+            return "", []
+        return digits[:best_depth], list(best)
+
+    def lookup_many(self, numbers: Iterable[str]) -> Iterator[Tuple[str, str, List[str]]]:
+        """Yield (number, prefix, iso codes) for every number."""
+        lookup = self.lookup
+        for number in numbers:
+            prefix, owners = lookup(number)
+            yield number, prefix, owners
+
+
+def lookup_numbers_file(trie: PhoneTrie, path: str, output_path: Optional[str] = None) -> Dict[str, float]:
+    """
+    Resolve every number in a file (one per line) to its countries.
+
+    The file is streamed, so it can hold any number of lines. With an
+    output path, a TSV of number, prefix and comma-separated ISO codes
+    is written.
+
+    Args:
+        trie: Dialing-prefix trie
+        path: Input file with one phone number per line
+        output_path: Optional TSV output file
+
+    Returns:
+        Dictionary with numbers, matched, unmatched, ambiguous, seconds
+        and per_second
+    """
+    stats = {"numbers": 0, "matched": 0, "unmatched": 0, "ambiguous": 0}
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as source:
+        numbers = (line.strip() for line in source)
+        numbers = (number for number in numbers if number and not number.startswith('#'))
+        out = open(output_path, 'w', encoding='utf-8') if output_path else None
+        try:
+            for number, prefix, owners in trie.lookup_many(numbers):
+                stats["numbers"] += 1
+                if not owners:
+                    stats["unmatched"] += 1
+                else:
+                    stats["matched"] += 1
+                    if len(owners) > 1:
+                        stats["ambiguous"] += 1
+                if out is not None:
+                    out.write(f"{number}\t{prefix}\t{','.join(owners)}\n")
+        finally:
+            if out is not None:
+                out.close()
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["per_second"] = round(stats["numbers"] / elapsed) if elapsed > 0 else 0
+    return stats
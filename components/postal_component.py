@@ -0,0 +1,312 @@
+"""
+Postal Component - Postal code validation against each country's postal_code_regex.
+"""
+import csv
+import multiprocessing
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .constants import POSTAL_CHUNK_SIZE, POSTAL_WORKERS
+from .index_component import iso_key
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Codes longer than this are checked against every unbounded rule
+_MAX_BUCKET_LENGTH = 24
+
+_DIGITS = frozenset("0123456789")
+_LETTERS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+
+def _code_profile(code: str) -> Tuple[int, bool, bool]:
+    """Return (length, has letters, has digits) of a normalized code."""
+    return len(code), any(ch.isalpha() for ch in code), any(ch.isdigit() for ch in code)
+
+
+def _classes(items, found: set):
+    """Collect which character classes ("letter", "digit") a parsed pattern can match."""
+    for op, arg in items:
+        name = str(op)
+        if name == "LITERAL":
+            ch = chr(arg)
+            if ch.isdigit():
+                found.add("digit")
+            elif ch.isalpha():
+                found.add("letter")
+        elif name == "RANGE":
+            chars = {chr(c) for c in range(arg[0], min(arg[1], 0x7F) + 1)}
+            if chars & _DIGITS:
+                found.add("digit")
+            if chars & _LETTERS or arg[1] > 0x7F:
+                found.add("letter")
+        elif name == "IN":
+            _classes(arg, found)
+        elif name == "CATEGORY":
+            category = str(arg)
+            if category.endswith("_DIGIT"):
+                found.add("digit")
+            elif not category.endswith("_SPACE"):
+                found.update(("letter", "digit"))
+        elif name == "SUBPATTERN":
+            _classes(arg[-1], found)
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            _classes(arg[2], found)
+        elif name == "BRANCH":
+            for branch in arg[1]:
+                _classes(branch, found)
+        elif name == "AT":
+            continue
+        else:
+            # ANY, NOT_LITERAL, backreferences, lookarounds...: assume anything
+            found.update(("letter", "digit"))
+
+
+def regex_profile(rule: str) -> Optional[Tuple[int, int, bool, bool]]:
+    """
+    Derive a prefilter from a postal_code_regex.
+
+    Args:
+        rule: Regular expression
+
+    Returns:
+        Tuple of (min length, max length, may contain letters, may
+        contain digits) of the strings the regex can fully match, or
+        None if the pattern could not be analysed
+    """
+    try:
+        parsed = sre_parse.parse(rule)
+        min_len, max_len = parsed.getwidth()
+        found: set = set()
+        _classes(parsed, found)
+    except Exception:
+        return None
+    return min_len, max_len, "letter" in found, "digit" in found
+
+
+def normalize_code(code: str) -> str:
+    """Normalize a postal code for matching (trimmed, upper case)."""
+    return (code or "").strip().upper()
+
+
+def _check_rows(patterns: Dict[str, "re.Pattern"], rows: Iterable[Tuple[str, str]]) -> Tuple[Dict[str, int], List[tuple]]:
+    """Validate (iso, code) rows; return counters and the rejected rows."""
+    counts = {"valid": 0, "invalid": 0, "unknown_country": 0, "no_rule": 0}
+    rejected = []
+    for iso, code in rows:
+        key = iso_key(iso)
+        if key not in patterns:
+            counts["unknown_country"] += 1
+            rejected.append((iso, code, "unknown country"))
+            continue
+        pattern = patterns[key]
+        if pattern is None:
+            counts["no_rule"] += 1
+        elif pattern.fullmatch(normalize_code(code)):
+            counts["valid"] += 1
+        else:
+            counts["invalid"] += 1
+            rejected.append((iso, code, "invalid format"))
+    return counts, rejected
+
+
+# Compiled patterns of a worker process (set by _init_worker)
+_worker_patterns: Dict[str, "re.Pattern"] = {}
+
+
+def _init_worker(rules: Dict[str, Optional[str]]):
+    global _worker_patterns
+    _worker_patterns = {iso: re.compile(rule) if rule else None for iso, rule in rules.items()}
+
+
+def _check_chunk(rows: List[Tuple[str, str]]) -> Tuple[Dict[str, int], List[tuple]]:
+    return _check_rows(_worker_patterns, rows)
+
+
+class PostalValidator:
+    """
+    Compiled postal code rules of every country, built once per data version.
+    """
+
+    def __init__(self, countries: Iterable[dict]):
+        start = time.perf_counter()
+        self.rules: Dict[str, Optional[str]] = {}
+        self.patterns: Dict[str, Optional["re.Pattern"]] = {}
+        self.profiles: Dict[str, Optional[tuple]] = {}
+        self.errors: List[str] = []
+        for country in countries:
+            iso = iso_key(country.get("iso", ""))
+            rule = country.get("postal_code_regex") or None
+            pattern = None
+            if rule:
+                try:
+                    pattern = re.compile(rule)
+                except re.error as e:
+                    self.errors.append(f"{iso}: invalid postal_code_regex ({e})")
+                    rule = None
+            self.rules[iso] = rule
+            self.patterns[iso] = pattern
+            self.profiles[iso] = regex_profile(rule) if rule else None
+
+        # Length buckets for the "which countries" prefilter
+        self._by_length: Dict[int, List[str]] = {}
+        self._unbounded: List[str] = []
+        for iso, profile in self.profiles.items():
+            if self.patterns[iso] is None:
+                continue
+            if profile is None or profile[1] > _MAX_BUCKET_LENGTH:
+                self._unbounded.append(iso)
+                continue
+            for length in range(profile[0], profile[1] + 1):
+                self._by_length.setdefault(length, []).append(iso)
+        self._position = {iso: i for i, iso in enumerate(self.patterns)}
+        self.build_seconds = time.perf_counter() - start
+
+    def validate(self, iso: str, code: str) -> tuple[bool, str]:
+        """
+        Validate a postal code for a country.
+
+        Args:
+            iso: ISO code of the country
+            code: Postal code
+
+        Returns:
+            Tuple of (is_valid, message)
+        """
+        key = iso_key(iso)
+        if key not in self.patterns:
+            return False, f"Country with ISO code '{iso}' not found"
+        pattern = self.patterns[key]
+        if pattern is None:
+            return True, f"{key} has no postal code format"
+        if pattern.fullmatch(normalize_code(code)):
+            return True, f"'{code}' is a valid {key} postal code"
+        return False, f"'{code}' is not a valid {key} postal code"
+
+    def candidates(self, code: str) -> List[str]:
+        """
+        Return the ISO codes of countries whose rules accept a postal code.
+
+        Countries are first narrowed down by length and character classes
+        (derived from each regex), then confirmed by the regex itself.
+
+        Args:
+            code: Postal code
+
+        Returns:
+            ISO codes in dataset order
+        """
+        code = normalize_code(code)
+        if not code:
+            return []
+        length, has_letters, has_digits = _code_profile(code)
+        isos = self._by_length.get(length, [])
+        if self._unbounded:
+            isos = sorted(set(isos).union(self._unbounded), key=self._position.get)
+        found = []
+        for iso in isos:
+            profile = self.profiles[iso]
+            if profile is not None:
+                min_len, max_len, letters, digits = profile
+                if (not min_len <= length <= max_len
+                        or (has_letters and not letters) or (has_digits and not digits)):
+                    continue
+            if self.patterns[iso].fullmatch(code):
+                found.append(iso)
+        return found
+
+    def stats(self) -> Dict[str, float]:
+        """Report the number of compiled rules and the build time."""
+        return {
+            "countries": len(self.patterns),
+            "rules": sum(1 for p in self.patterns.values() if p is not None),
+            "errors": len(self.errors),
+            "build_ms": round(self.build_seconds * 1000, 3),
+        }
+
+
+def _iter_csv_rows(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (iso, postal_code) pairs from a CSV file, skipping a header row."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for line_no, row in enumerate(csv.reader(f), 1):
+            if len(row) < 2:
+                continue
+            if line_no == 1 and row[0].strip().lower() in ("iso", "country", "country_code"):
+                continue
+            yield row[0].strip(), row[1].strip()
+
+
+def _chunks(rows: Iterator[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_postal_csv(
+    validator: PostalValidator,
+    path: str,
+    output_path: Optional[str] = None,
+    workers: Optional[int] = POSTAL_WORKERS,
+    chunk_size: int = POSTAL_CHUNK_SIZE,
+) -> Dict[str, float]:
+    """
+    Validate a CSV of (iso, postal_code) rows.
+
+    The file is streamed in chunks. With more than one worker, the chunks
+    are checked in a process pool whose workers compile the rules once
+    at start-up.
+
+    Args:
+        validator: Compiled postal rules
+        path: Input CSV file
+        output_path: Optional CSV receiving the rejected rows with a reason
+        workers: Worker processes (None = CPU count, 0 or 1 = in-process)
+        chunk_size: Rows per chunk handed to a worker
+
+    Returns:
+        Dictionary with rows, valid, invalid, unknown_country, no_rule,
+        workers, seconds and per_second
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    stats = {"rows": 0, "valid": 0, "invalid": 0, "unknown_country": 0, "no_rule": 0}
+    start = time.perf_counter()
+    chunks = _chunks(_iter_csv_rows(path), chunk_size)
+
+    out = open(output_path, 'w', encoding='utf-8', newline='') if output_path else None
+    writer = csv.writer(out) if out is not None else None
+    if writer is not None:
+        writer.writerow(["iso", "postal_code", "reason"])
+    pool = None
+    try:
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(validator.rules,))
+            results = pool.imap(_check_chunk, chunks)
+        else:
+            results = (_check_rows(validator.patterns, chunk) for chunk in chunks)
+        for counts, rejected in results:
+            for key, value in counts.items():
+                stats[key] += value
+            stats["rows"] += sum(counts.values())
+            if writer is not None:
+                writer.writerows(rejected)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if out is not None:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    stats["workers"] = max(workers, 1)
+    stats["seconds"] = round(elapsed, 3)
+    stats["per_second"] = round(stats["rows"] / elapsed) if elapsed > 0 else 0
+    return stats
@@ -0,0 +1,419 @@
+"""
+Query Component - Compound filter expressions with an index-aware plan.
+
+Syntax:
+    <predicate> [and|or <predicate> ...] [sort <field> [asc|desc]] [limit N]
+
+    predicate := [not] <field> <op> <value> | [not] ( <expression> )
+    op        := "="  exact match (any list element)
+                 "~"  substring
+                 "^=" prefix
+                 ":"  list membership (cities, or comma-separated values
+                      such as languages)
+                 "<", "<=", ">", ">="  numeric comparison
+    value     := word | "quoted text"
+
+Numeric fields (iso_numeric, area, population) take "=" and the
+comparison operators, compare as numbers and sort numerically; records
+without a value never match and sort last.
+
+Example:
+    currency_code=EUR and languages~fr and cities:"Lyon" sort country limit 5
+    continent=EU and population>=10000000 sort area desc
+
+Every indexable predicate gets its candidate rows from the per-field
+trigram index (FieldIndex). An AND starts from its most selective
+indexed child and streams the remaining predicates over those rows
+only. An OR unions the candidates of its children. NOT, and an OR with
+an unindexable branch, fall back to a scan. Numeric comparisons are
+never indexed: they filter the candidates of the other predicates.
+"""
+import re
+from typing import Iterable, List, Optional, Set
+
+from country_types import NUMERIC_FIELDS
+from .columnar_component import to_number
+from .filter_component import get_filterable_fields
+from .index_component import sort_numeric
+from .search_index import FieldIndex, field_values, normalize_text
+
+QUERY_FIELDS = [key for key, _ in get_filterable_fields()] + list(NUMERIC_FIELDS)
+OPERATORS = ("^=", "=", "~", ":", "<=", ">=", "<", ">")
+NUMERIC_OPERATORS = ("=", "<", "<=", ">", ">=")
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|(\^=|<=|>=|=|~|:|<|>)|([^\s()"=~:^<>]+))')
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when a query expression cannot be parsed."""
+
+
+def _tokenize(text: str) -> List[tuple]:
+    """Split a query into (kind, value) tokens."""
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise QuerySyntaxError(f"Unexpected character at position {pos + 1}: '{text[pos]}'")
+        pos = match.end()
+        lparen, rparen, quoted, op, word = match.groups()
+        if lparen:
+            tokens.append(("(", lparen))
+        elif rparen:
+            tokens.append((")", rparen))
+        elif quoted is not None:
+            tokens.append(("string", re.sub(r"\\(.)", r"\1", quoted)))
+        elif op:
+            tokens.append(("op", op))
+        elif word:
+            tokens.append(("word", word))
+    return tokens
+
+
+def _elements(country: dict, field: str) -> List[str]:
+    """Folded list elements of a field (comma-separated strings are split)."""
+    values = field_values(country, field)
+    if not isinstance(country.get(field), (list, tuple)):
+        values = [part for value in values for part in value.split(",")]
+    return [normalize_text(value.strip()) for value in values]
+
+
+class Predicate:
+    """A single ``field op value`` test."""
+
+    def __init__(self, field: str, op: str, value: str):
+        self.field = field
+        self.op = op
+        self.value = value
+        self._needle = normalize_text(value)
+
+    def matches(self, country: dict) -> bool:
+        """Evaluate the predicate on one record."""
+        needle = self._needle
+        if self.op == ":":
+            return needle in _elements(country, self.field)
+        values = [normalize_text(v) for v in field_values(country, self.field)]
+        if self.op == "=":
+            return needle in values
+        if self.op == "^=":
+            return any(v.startswith(needle) for v in values)
+        return any(needle in v for v in values)
+
+    def candidates(self, index: FieldIndex) -> Optional[Set[int]]:
+        """Doc ids that may match (a superset except for ``~``)."""
+        return set(index.field(self.field).matching_docs(self.value))
+
+    def describe(self) -> str:
+        return f'{self.field} {self.op} "{self.value}"'
+
+
+class Comparison:
+    """A ``field op number`` test on a numeric field (never indexed)."""
+
+    _COMPARE = {
+        "=": lambda a, b: a == b,
+        "<": lambda a, b: a < b,
+        "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b,
+        ">=": lambda a, b: a >= b,
+    }
+
+    def __init__(self, field: str, op: str, number: float):
+        self.field = field
+        self.op = op
+        self.number = number
+        self._compare = self._COMPARE[op]
+
+    def matches(self, country: dict) -> bool:
+        value = to_number(country.get(self.field))
+        return value is not None and self._compare(value, self.number)
+
+    def candidates(self, index: FieldIndex) -> Optional[Set[int]]:
+        return None
+
+    def describe(self) -> str:
+        return f"{self.field} {self.op} {self.number:g}"
+
+
+class Not:
+    """Negation of an expression (never indexed)."""
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def matches(self, country: dict) -> bool:
+        return not self.operand.matches(country)
+
+    def candidates(self, index: FieldIndex) -> Optional[Set[int]]:
+        return None
+
+    def describe(self) -> str:
+        return f"not ({self.operand.describe()})"
+
+
+class And:
+    """Conjunction of expressions."""
+
+    def __init__(self, operands: list):
+        self.operands = operands
+
+    def matches(self, country: dict) -> bool:
+        return all(op.matches(country) for op in self.operands)
+
+    def plan(self, index: FieldIndex):
+        """Return (driver, driver_candidates, residual operands)."""
+        best, best_ids = None, None
+        for operand in self.operands:
+            ids = operand.candidates(index)
+            if ids is not None and (best_ids is None or len(ids) < len(best_ids)):
+                best, best_ids = operand, ids
+                if not ids:
+                    break
+        residual = [op for op in self.operands if op is not best]
+        return best, best_ids, residual
+
+    def candidates(self, index: FieldIndex) -> Optional[Set[int]]:
+        _, ids, _ = self.plan(index)
+        return ids
+
+    def describe(self) -> str:
+        return " and ".join(f"({op.describe()})" for op in self.operands)
+
+
+class Or:
+    """Disjunction of expressions."""
+
+    def __init__(self, operands: list):
+        self.operands = operands
+
+    def matches(self, country: dict) -> bool:
+        return any(op.matches(country) for op in self.operands)
+
+    def candidates(self, index: FieldIndex) -> Optional[Set[int]]:
+        result: Set[int] = set()
+        for operand in self.operands:
+            ids = operand.candidates(index)
+            if ids is None:
+                return None
+            result |= ids
+        return result
+
+    def describe(self) -> str:
+        return " or ".join(f"({op.describe()})" for op in self.operands)
+
+
+class Query:
+    """A parsed query: filter expression plus optional sort and limit."""
+
+    def __init__(self, where, sort_field: Optional[str] = None,
+                 descending: bool = False, limit: Optional[int] = None):
+        self.where = where
+        self.sort_field = sort_field
+        self.descending = descending
+        self.limit = limit
+
+    def _driver(self, index: FieldIndex):
+        """Return (driver description, candidate ids or None, residual predicate)."""
+        if self.where is None:
+            return None, None, None
+        if isinstance(self.where, And):
+            driver, ids, residual = self.where.plan(index)
+            if driver is None:
+                return None, None, self.where
+            rest = And(residual) if residual else None
+            if isinstance(driver, Predicate) and driver.op == "~":
+                # Substring candidates are exact: no need to re-check the driver
+                return driver, ids, rest
+            return driver, ids, And([driver] + residual)
+        ids = self.where.candidates(index)
+        if ids is None:
+            return None, None, self.where
+        exact = isinstance(self.where, Predicate) and self.where.op == "~"
+        return self.where, ids, None if exact else self.where
+
+    def execute(self, index: FieldIndex) -> List[dict]:
+        """
+        Run the query against a FieldIndex.
+
+        Args:
+            index: Per-field trigram index of the dataset
+
+        Returns:
+            Matching records (in dataset order unless sorted)
+        """
+        records = index.records
+        _, ids, residual = self._driver(index)
+        rows = (records[i] for i in sorted(ids)) if ids is not None else iter(records)
+        if residual is not None:
+            rows = (row for row in rows if residual.matches(row))
+
+        return self.arrange(rows)
+
+    def arrange(self, rows: Iterable[dict]) -> List[dict]:
+        """Apply the sort and limit clauses to the matching rows."""
+        if self.sort_field:
+            field = self.sort_field
+            if field in NUMERIC_FIELDS:
+                results = sort_numeric(rows, field, self.descending)
+            else:
+                results = sorted(
+                    rows,
+                    key=lambda c: [normalize_text(v) for v in field_values(c, field)],
+                    reverse=self.descending,
+                )
+            return results[:self.limit] if self.limit is not None else results
+
+        results = []
+        for row in rows:
+            if self.limit is not None and len(results) >= self.limit:
+                break
+            results.append(row)
+        return results
+
+    def arrange_steps(self) -> List[str]:
+        """Plan steps of the sort and limit clauses."""
+        lines = []
+        if self.sort_field:
+            lines.append(f"SORT {self.sort_field} {'desc' if self.descending else 'asc'}")
+        if self.limit is not None:
+            lines.append(f"LIMIT {self.limit}")
+        return lines
+
+    def explain(self, index: FieldIndex) -> List[str]:
+        """
+        Describe how the query would run.
+
+        Args:
+            index: Per-field trigram index of the dataset
+
+        Returns:
+            Plan steps, one per line
+        """
+        total = len(index.records)
+        driver, ids, residual = self._driver(index)
+        lines = []
+        if driver is None:
+            lines.append(f"SCAN all {total} rows")
+        else:
+            lines.append(f"INDEX {driver.describe()} -> {len(ids)} of {total} candidate rows")
+        if residual is not None:
+            lines.append(f"FILTER {residual.describe()}")
+        return lines + self.arrange_steps()
+
+
+class _Parser:
+    """Recursive-descent parser producing a Query."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def _peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _keyword(self, *words: str) -> Optional[str]:
+        token = self._peek()
+        if token and token[0] == "word" and token[1].lower() in words:
+            self.pos += 1
+            return token[1].lower()
+        return None
+
+    def _next(self, expected: str) -> tuple:
+        token = self._peek()
+        if token is None:
+            raise QuerySyntaxError(f"Unexpected end of query, expected {expected}")
+        self.pos += 1
+        return token
+
+    def parse(self) -> Query:
+        where = None
+        if self._peek() and not self._at_clause():
+            where = self._or()
+        sort_field, descending, limit = None, False, None
+        if self._keyword("sort"):
+            sort_field = self._field()
+            descending = self._keyword("asc", "desc") == "desc"
+        if self._keyword("limit"):
+            kind, value = self._next("a number")
+            if kind != "word" or not value.isdigit():
+                raise QuerySyntaxError(f"Invalid limit '{value}'")
+            limit = int(value)
+        token = self._peek()
+        if token is not None:
+            raise QuerySyntaxError(f"Unexpected '{token[1]}'")
+        return Query(where, sort_field, descending, limit)
+
+    def _at_clause(self) -> bool:
+        token = self._peek()
+        return token[0] == "word" and token[1].lower() in ("sort", "limit")
+
+    def _or(self):
+        operands = [self._and()]
+        while self._keyword("or"):
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def _and(self):
+        operands = [self._not()]
+        while self._keyword("and"):
+            operands.append(self._not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def _not(self):
+        if self._keyword("not"):
+            return Not(self._not())
+        return self._atom()
+
+    def _field(self) -> str:
+        kind, value = self._next("a field name")
+        if kind != "word" or value not in QUERY_FIELDS:
+            raise QuerySyntaxError(
+                f"Unknown field '{value}'. Available: {', '.join(QUERY_FIELDS)}"
+            )
+        return value
+
+    def _atom(self):
+        token = self._peek()
+        if token and token[0] == "(":
+            self.pos += 1
+            expr = self._or()
+            if self._next("')'")[0] != ")":
+                raise QuerySyntaxError("Expected ')'")
+            return expr
+        field = self._field()
+        kind, op = self._next("an operator")
+        if kind != "op":
+            raise QuerySyntaxError(f"Expected one of {', '.join(OPERATORS)} after '{field}'")
+        kind, value = self._next("a value")
+        if kind not in ("word", "string"):
+            raise QuerySyntaxError(f"Expected a value after '{field}{op}'")
+        if field in NUMERIC_FIELDS:
+            if op not in NUMERIC_OPERATORS:
+                raise QuerySyntaxError(
+                    f"'{field}' is numeric: use one of {', '.join(NUMERIC_OPERATORS)}"
+                )
+            number = to_number(value)
+            if number is None:
+                raise QuerySyntaxError(f"Expected a number after '{field}{op}', got '{value}'")
+            return Comparison(field, op, number)
+        if op not in ("^=", "=", "~", ":"):
+            raise QuerySyntaxError(f"'{op}' only applies to numeric fields")
+        return Predicate(field, op, value)
+
+
+def parse_query(text: str) -> Query:
+    """
+    Parse a query expression.
+
+    Args:
+        text: Query text, e.g. 'currency_code=EUR and languages~fr'
+
+    Returns:
+        Parsed Query
+
+    Raises:
+        QuerySyntaxError: If the text is not a valid query
+    """
+    return _Parser(text).parse()
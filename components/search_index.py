@@ -0,0 +1,278 @@
+"""
+Search Index Component - Inverted n-gram/token index for country search.
+"""
+import re
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+# Marks the start of a token, so "\x02par" only matches words starting with "par"
+TOKEN_START = "\x02"
+GRAM_SIZE = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold_text(value: str) -> str:
+    """
+    Accent- and case-insensitive form of a string.
+
+    "São Tomé" -> "sao tome", "Åland" -> "aland".
+    """
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold()
+
+
+def normalize_text(value) -> str:
+    """Normalize a value for indexing and querying (accent- and case-insensitive)."""
+    return fold_text(str(value))
+
+
+def _grams(text: str, size: int) -> Set[str]:
+    """Return the distinct n-grams of a given size in a string."""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class NGramIndex:
+    """
+    Inverted index from n-grams (lengths 1..GRAM_SIZE) to document ids.
+
+    A substring query is answered by intersecting the posting sets of its
+    n-grams, which yields a (small) superset of the matching documents
+    that the caller then verifies.
+    """
+
+    def __init__(self, gram_size: int = GRAM_SIZE):
+        self.gram_size = gram_size
+        self.postings: Dict[str, Set[int]] = {}
+
+    def add(self, doc_id: int, text: str):
+        """Index a normalized string under a document id."""
+        postings = self.postings
+        for size in range(1, self.gram_size + 1):
+            for gram in _grams(text, size):
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = {doc_id}
+                else:
+                    ids.add(doc_id)
+
+    def add_tokens(self, doc_id: int, text: str):
+        """Index the start of every token in a string for prefix queries."""
+        for token in _TOKEN_RE.findall(text):
+            self.add(doc_id, TOKEN_START + token[:self.gram_size - 1])
+
+    def remove(self, doc_id: int, text: str):
+        """Remove a string's n-grams for a document id."""
+        for size in range(1, self.gram_size + 1):
+            for gram in _grams(text, size):
+                ids = self.postings.get(gram)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self.postings[gram]
+
+    def candidates(self, query: str) -> Optional[Set[int]]:
+        """
+        Return ids of documents that may contain the query as a substring.
+
+        Args:
+            query: Normalized query string
+
+        Returns:
+            Candidate id set (possibly empty), or None for an empty query
+        """
+        if not query:
+            return None
+        size = min(self.gram_size, len(query))
+        grams = sorted(_grams(query, size), key=lambda g: len(self.postings.get(g, ())))
+        result: Optional[Set[int]] = None
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if not ids:
+                return set()
+            # Start from the rarest gram so intersections stay small
+            result = set(ids) if result is None else result & ids
+            if not result:
+                break
+        return result
+
+    def memory_entries(self) -> int:
+        """Total number of (gram, id) postings."""
+        return sum(len(ids) for ids in self.postings.values())
+
+
+def searchable_values(country: dict) -> List[str]:
+    """Return every searchable value of a record (each city separately)."""
+    values = []
+    for value in country.values():
+        if isinstance(value, (list, tuple)):
+            values.extend(str(v) for v in value)
+        elif value is not None:
+            values.append(str(value))
+    return values
+
+
+class SearchIndex:
+    """
+    Full-text index over every field and city of the country records.
+
+    Built once per data version; answers substring and token-prefix
+    queries by intersecting posting lists, then verifies the candidates.
+    """
+
+    def __init__(self, countries: Iterable[dict]):
+        self.records: List[dict] = list(countries)
+        self._values: List[List[str]] = []
+        self._grams = NGramIndex()
+        for doc_id, country in enumerate(self.records):
+            values = [normalize_text(v) for v in searchable_values(country)]
+            self._values.append(values)
+            for value in values:
+                self._grams.add(doc_id, value)
+                self._grams.add_tokens(doc_id, value)
+
+    def search(self, query: str) -> List[dict]:
+        """
+        Return records where any field or city contains the query.
+
+        Args:
+            query: Search query (case-insensitive)
+
+        Returns:
+            Matching records in dataset order
+        """
+        needle = normalize_text(query)
+        candidates = self._grams.candidates(needle)
+        if candidates is None:
+            return list(self.records)
+        return [
+            self.records[doc_id] for doc_id in sorted(candidates)
+            if any(needle in value for value in self._values[doc_id])
+        ]
+
+    def search_prefix(self, query: str) -> List[dict]:
+        """
+        Return records having a word that starts with the query.
+
+        Args:
+            query: Prefix (case-insensitive)
+
+        Returns:
+            Matching records in dataset order
+        """
+        needle = normalize_text(query)
+        if not needle:
+            return list(self.records)
+        candidates = self._grams.candidates(needle)
+        if _TOKEN_RE.match(needle) and candidates:
+            # Narrow down with the indexed token starts
+            candidates &= self._grams.candidates(TOKEN_START + needle[:self._grams.gram_size - 1])
+        pattern = re.compile(r"(?<!\w)" + re.escape(needle))
+        return [
+            self.records[doc_id] for doc_id in sorted(candidates or ())
+            if any(pattern.search(value) for value in self._values[doc_id])
+        ]
+
+
+def field_values(country: dict, field: str) -> List[str]:
+    """Return the values of one field (each city separately for lists)."""
+    value = country.get(field)
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+class FieldTrigramIndex:
+    """
+    Trigram index over the distinct values of one field.
+
+    Substring filters intersect the n-gram postings of the query to get
+    candidate values, verify them, and return the union of their records.
+    Indexing distinct values keeps low-cardinality fields (currencies,
+    languages) and repeated city names cheap.
+    """
+
+    def __init__(self, countries: List[dict], field: str):
+        start = time.perf_counter()
+        self.field = field
+        self.values: List[str] = []
+        self.value_docs: List[List[int]] = []
+        self._grams = NGramIndex()
+        value_ids: Dict[str, int] = {}
+        for doc_id, country in enumerate(countries):
+            for raw in field_values(country, field):
+                value = normalize_text(raw)
+                value_id = value_ids.get(value)
+                if value_id is None:
+                    value_id = len(self.values)
+                    value_ids[value] = value_id
+                    self.values.append(value)
+                    self.value_docs.append([])
+                    self._grams.add(value_id, value)
+                docs = self.value_docs[value_id]
+                if not docs or docs[-1] != doc_id:
+                    docs.append(doc_id)
+        self.build_seconds = time.perf_counter() - start
+
+    def matching_docs(self, query: str) -> List[int]:
+        """Return sorted ids of records whose field contains the query."""
+        needle = normalize_text(query)
+        candidates = self._grams.candidates(needle)
+        if candidates is None:
+            candidates = range(len(self.values))
+        docs: Set[int] = set()
+        for value_id in candidates:
+            if needle in self.values[value_id]:
+                docs.update(self.value_docs[value_id])
+        return sorted(docs)
+
+    def stats(self) -> Dict[str, float]:
+        """Report build time and size of the index."""
+        return {
+            "field": self.field,
+            "distinct_values": len(self.values),
+            "grams": len(self._grams.postings),
+            "postings": self._grams.memory_entries(),
+            "build_ms": round(self.build_seconds * 1000, 3),
+        }
+
+
+class FieldIndex:
+    """
+    Per-field trigram indexes for filter_by_field, built lazily per field.
+
+    Built once per data version (see CountryRepository.derived).
+    """
+
+    def __init__(self, countries: Iterable[dict]):
+        self.records: List[dict] = list(countries)
+        self._fields: Dict[str, FieldTrigramIndex] = {}
+
+    def field(self, name: str) -> FieldTrigramIndex:
+        """Return (building on first use) the index for one field."""
+        index = self._fields.get(name)
+        if index is None:
+            index = FieldTrigramIndex(self.records, name)
+            self._fields[name] = index
+        return index
+
+    def filter(self, field: str, value: str) -> List[dict]:
+        """
+        Return records whose field contains the value (case-insensitive).
+
+        Args:
+            field: Field name to filter by
+            value: Substring to look for
+
+        Returns:
+            Matching records in dataset order
+        """
+        return [self.records[doc_id] for doc_id in self.field(field).matching_docs(value)]
+
+    def stats(self) -> List[Dict[str, float]]:
+        """Report build time and size of every field index built so far."""
+        return [index.stats() for index in self._fields.values()]
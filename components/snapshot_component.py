@@ -0,0 +1,345 @@
+"""
+Snapshot Component - Content-addressed history of the dataset.
+
+Layout of the snapshot directory:
+
+    objects/ab/<sha256>.json   one country record, named by the hash of
+                               its canonical JSON
+    manifests/<sha256>.json    [[iso, record hash], ...] in dataset order,
+                               named by the hash of that list
+    snapshots.json             the history: one entry per snapshot taken
+
+A record that did not change between two snapshots is the same object,
+so a snapshot only writes the records that changed plus its manifest.
+Comparing two snapshots, or replaying a series of them, only needs the
+manifests and the changed records.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from country_types import CountryRecord
+from .aggregate_component import AggregateStore
+from .analytics_component import REPORT_METRICS, Metric, run_metrics
+from .constants import (
+    DATETIME_FORMAT,
+    SNAPSHOT_DIR,
+    SNAPSHOT_KEEP_DAILY,
+    SNAPSHOT_KEEP_LAST,
+    SNAPSHOT_KEEP_MONTHLY,
+    SNAPSHOT_PRUNE,
+)
+from .index_component import iso_key
+from .journal_component import write_json_atomic
+
+
+def _canonical(data) -> bytes:
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _digest(data) -> str:
+    return hashlib.sha256(_canonical(data)).hexdigest()
+
+
+class SnapshotStore:
+    """
+    Snapshots of the country list with structural sharing.
+
+    Args:
+        directory: Where objects, manifests and the history are kept
+        keep_last: Snapshots always kept, newest first
+        keep_daily: Days (newest first) for which the last snapshot is kept
+        keep_monthly: Months (newest first) for which the last snapshot is kept
+        prune: Delete unreferenced manifests and objects when retention drops snapshots
+    """
+
+    def __init__(
+        self,
+        directory: str = SNAPSHOT_DIR,
+        keep_last: int = SNAPSHOT_KEEP_LAST,
+        keep_daily: int = SNAPSHOT_KEEP_DAILY,
+        keep_monthly: int = SNAPSHOT_KEEP_MONTHLY,
+        prune: bool = SNAPSHOT_PRUNE,
+    ):
+        self.directory = directory
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_monthly = keep_monthly
+        self.prune_unreferenced = prune
+        self._history_file = os.path.join(directory, "snapshots.json")
+        self._lock = threading.RLock()
+        # Objects and manifests never change once written
+        self._objects: Dict[str, CountryRecord] = {}
+        self._manifests: Dict[str, List[List[str]]] = {}
+        # iso -> (record, hash) of the last snapshot taken. CountryRecords
+        # are immutable, so a record that is still the same object does
+        # not need hashing again.
+        self._digests: Dict[str, Tuple[CountryRecord, str]] = {}
+
+    # -- storage -----------------------------------------------------------
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.json")
+
+    def _manifest_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "manifests", f"{digest}.json")
+
+    def _write_once(self, path: str, data):
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json_atomic(path, data, indent=None)
+        return True
+
+    def _object(self, digest: str) -> CountryRecord:
+        record = self._objects.get(digest)
+        if record is None:
+            with open(self._object_path(digest), "r", encoding="utf-8") as f:
+                record = self._objects[digest] = CountryRecord.from_dict(json.load(f))
+        return record
+
+    def _manifest(self, digest: str) -> List[List[str]]:
+        entries = self._manifests.get(digest)
+        if entries is None:
+            with open(self._manifest_path(digest), "r", encoding="utf-8") as f:
+                entries = self._manifests[digest] = json.load(f)
+        return entries
+
+    def _read_history(self) -> dict:
+        try:
+            with open(self._history_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"next_seq": 1, "snapshots": []}
+
+    def _write_history(self, history: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(self._history_file, history)
+
+    # -- snapshots ---------------------------------------------------------
+
+    def history(self) -> List[dict]:
+        """History entries, oldest first (seq, id, created, label, count, added, changed, removed)."""
+        with self._lock:
+            return self._read_history()["snapshots"]
+
+    def get(self, seq: int) -> Optional[dict]:
+        """History entry of a snapshot (None if unknown or dropped)."""
+        return next((info for info in self.history() if info["seq"] == seq), None)
+
+    def take(self, records: Iterable[dict], label: str = "") -> Tuple[bool, dict]:
+        """
+        Record the current dataset.
+
+        Passing the repository's own CountryRecords (not copies) lets
+        records unchanged since the previous call skip hashing, so a
+        snapshot after a small edit costs O(changed records) of hashing.
+
+        Args:
+            records: Country records, in dataset order
+            label: Optional description (e.g. "import")
+
+        Returns:
+            Tuple of (created, history entry); created is False when the
+            data is identical to the latest snapshot, which is returned
+        """
+        with self._lock:
+            entries, written, digests = [], 0, {}
+            for record in records:
+                iso = iso_key(record.get("iso", ""))
+                known = self._digests.get(iso)
+                if known is not None and known[0] is record:
+                    digest = known[1]
+                else:
+                    data = dict(record)
+                    digest = _digest(data)
+                    if digest not in self._objects:
+                        written += self._write_once(self._object_path(digest), data)
+                        self._objects[digest] = CountryRecord.from_dict(data)
+                if isinstance(record, CountryRecord):
+                    digests[iso] = (record, digest)
+                entries.append([iso, digest])
+            self._digests = digests
+            manifest_id = _digest(entries)
+
+            history = self._read_history()
+            snapshots = history["snapshots"]
+            previous = snapshots[-1] if snapshots else None
+            if previous is not None and previous["id"] == manifest_id:
+                return False, previous
+            self._write_once(self._manifest_path(manifest_id), entries)
+            self._manifests[manifest_id] = entries
+
+            changes = self._compare(self._manifest(previous["id"]) if previous else [], entries)
+            info = {
+                "seq": history["next_seq"],
+                "id": manifest_id,
+                "created": datetime.now().strftime(DATETIME_FORMAT),
+                "label": label,
+                "count": len(entries),
+                "added": len(changes["added"]),
+                "changed": len(changes["changed"]),
+                "removed": len(changes["removed"]),
+                "new_objects": written,
+            }
+            snapshots.append(info)
+            history["next_seq"] += 1
+            self._write_history(history)
+            self.apply_retention()
+            return True, info
+
+    def load(self, seq: int) -> List[dict]:
+        """
+        Records of a snapshot.
+
+        Raises:
+            KeyError: If the snapshot does not exist
+        """
+        info = self.get(seq)
+        if info is None:
+            raise KeyError(f"Snapshot {seq} not found")
+        with self._lock:
+            return [self._object(digest).to_dict() for _, digest in self._manifest(info["id"])]
+
+    @staticmethod
+    def _compare(old: Sequence[Sequence[str]], new: Sequence[Sequence[str]]) -> Dict[str, List[str]]:
+        before, after = dict(old), dict(new)
+        return {
+            "added": [iso for iso in after if iso not in before],
+            "removed": [iso for iso in before if iso not in after],
+            "changed": [iso for iso, digest in after.items() if iso in before and before[iso] != digest],
+        }
+
+    def diff(self, old_seq: int, new_seq: int) -> Dict[str, List[str]]:
+        """
+        ISO codes added, removed and changed between two snapshots.
+
+        Only the manifests are read: records compare by hash.
+        """
+        old, new = self.get(old_seq), self.get(new_seq)
+        for seq, info in ((old_seq, old), (new_seq, new)):
+            if info is None:
+                raise KeyError(f"Snapshot {seq} not found")
+        with self._lock:
+            return self._compare(self._manifest(old["id"]), self._manifest(new["id"]))
+
+    def metric_series(
+        self,
+        metrics: Sequence[Metric] = REPORT_METRICS,
+        seqs: Optional[Sequence[int]] = None,
+    ) -> List[Tuple[dict, Dict[str, object]]]:
+        """
+        Compute metrics for a series of snapshots.
+
+        The snapshots are replayed oldest first: each step loads only the
+        records whose hash changed and adjusts an AggregateStore by them,
+        so metrics answered from the aggregates (RowCount, TopValues and
+        DistinctCount of aggregated fields) cost O(changed records) per
+        snapshot. Every other metric is not incremental: it is recomputed
+        by run_metrics over all records of each snapshot, which are
+        already in memory, so it costs O(records) per snapshot but no
+        disk reads.
+
+        Args:
+            metrics: Metrics to compute (see analytics_component)
+            seqs: Snapshots to include (all by default)
+
+        Returns:
+            List of (history entry, run_metrics result), oldest first
+        """
+        wanted = None if seqs is None else set(seqs)
+        series = []
+        with self._lock:
+            working: Dict[str, CountryRecord] = {}
+            hashes: Dict[str, str] = {}
+            aggregates = AggregateStore()
+            for info in self.history():
+                if wanted is not None and info["seq"] not in wanted:
+                    continue
+                entries = self._manifest(info["id"])
+                current = dict(entries)
+                for iso in [iso for iso in hashes if iso not in current]:
+                    aggregates.remove(working.pop(iso))
+                for iso, digest in entries:
+                    if hashes.get(iso) == digest:
+                        continue
+                    record = self._object(digest)
+                    if iso in working:
+                        aggregates.replace(working[iso], record)
+                    else:
+                        aggregates.add(record)
+                    working[iso] = record
+                hashes = current
+                records = [working[iso] for iso, _ in entries]
+                series.append((info, run_metrics(records, metrics, aggregates)))
+        return series
+
+    # -- retention ---------------------------------------------------------
+
+    def _retained(self, snapshots: List[dict]) -> set:
+        """Seqs kept by the keep_last/keep_daily/keep_monthly policy."""
+        newest_first = sorted(snapshots, key=lambda info: info["seq"], reverse=True)
+        keep = {info["seq"] for info in newest_first[:self.keep_last]}
+        for width, limit in ((10, self.keep_daily), (7, self.keep_monthly)):
+            periods = set()
+            for info in newest_first:
+                period = info["created"][:width]
+                if period in periods:
+                    continue
+                if len(periods) >= limit:
+                    break
+                periods.add(period)
+                keep.add(info["seq"])
+        return keep
+
+    def apply_retention(self) -> List[int]:
+        """
+        Drop the snapshots the retention policy no longer keeps.
+
+        Returns:
+            Seqs of the dropped snapshots
+        """
+        with self._lock:
+            history = self._read_history()
+            keep = self._retained(history["snapshots"])
+            dropped = [info["seq"] for info in history["snapshots"] if info["seq"] not in keep]
+            if dropped:
+                history["snapshots"] = [info for info in history["snapshots"] if info["seq"] in keep]
+                self._write_history(history)
+                if self.prune_unreferenced:
+                    self.prune()
+            return dropped
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Delete manifests and objects no remaining snapshot refers to.
+
+        Returns:
+            Counts of deleted manifests and objects
+        """
+        with self._lock:
+            manifests = {info["id"] for info in self._read_history()["snapshots"]}
+            objects = {digest for manifest in manifests for _, digest in self._manifest(manifest)}
+            removed = {"manifests": 0, "objects": 0}
+            for kind, live in (("manifests", manifests), ("objects", objects)):
+                root = os.path.join(self.directory, kind)
+                for folder, _, files in os.walk(root):
+                    for name in files:
+                        digest = name[:-len(".json")]
+                        if name.endswith(".json") and digest not in live:
+                            os.remove(os.path.join(folder, name))
+                            removed[kind] += 1
+                            (self._manifests if kind == "manifests" else self._objects).pop(digest, None)
+            return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot, manifest and object counts on disk."""
+        counts = {"snapshots": len(self.history())}
+        for kind in ("manifests", "objects"):
+            counts[kind] = sum(
+                len(files) for _, _, files in os.walk(os.path.join(self.directory, kind))
+            )
+        return counts
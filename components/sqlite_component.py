@@ -0,0 +1,768 @@
+"""
+SQLite Component - Optional SQLite storage backend for country data.
+
+Implements the same contract as the JSON CountryRepository, with cities
+kept in their own table so a country's cities are only read when that
+country is requested.
+"""
+import json
+import re
+import sqlite3
+from typing import List, Optional, Tuple
+
+from country_types import NUMERIC_FIELDS, CountryRecord, copy_record
+from .aggregate_component import AggregateStore, aggregate_delta
+from .cache_component import ResultCache
+from .constants import RESULT_CACHE_SIZE, SQLITE_FILE
+from .fuzzy_component import FuzzyIndex
+from .index_component import iso_key, list_splice, name_key, sort_numeric
+from .language_component import language_matches
+from .query_component import And, Comparison, Not, Predicate, parse_query
+from .search_index import FieldIndex, normalize_text
+from .transaction_component import BatchOperationsMixin
+
+# Columns stored directly on the countries table; anything else on a
+# record round-trips through the JSON "extra" column.
+COUNTRY_COLUMNS = [
+    "iso",
+    "iso3",
+    "country",
+    "tld",
+    "currency_code",
+    "currency_name",
+    "phone",
+    "postal_code_format",
+    "postal_code_regex",
+    "languages",
+    "geonameid",
+    "iso_numeric",
+    "capital",
+    "area",
+    "population",
+    "continent",
+    "neighbours",
+]
+
+# Typed columns added by schema version 4
+TYPED_COLUMNS = {
+    "iso_numeric": "INTEGER",
+    "capital": "TEXT",
+    "area": "REAL",
+    "population": "INTEGER",
+    "continent": "TEXT",
+    "neighbours": "TEXT",
+}
+
+# List-valued columns, stored comma-separated
+LIST_COLUMNS = ("neighbours",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS countries (
+    position INTEGER NOT NULL,
+    iso TEXT PRIMARY KEY,
+    iso3 TEXT,
+    country TEXT,
+    name_key TEXT,
+    tld TEXT,
+    currency_code TEXT,
+    currency_name TEXT,
+    phone TEXT,
+    postal_code_format TEXT,
+    postal_code_regex TEXT,
+    languages TEXT,
+    geonameid TEXT,
+    iso_numeric INTEGER,
+    capital TEXT,
+    area REAL,
+    population INTEGER,
+    continent TEXT,
+    neighbours TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_countries_position ON countries(position);
+CREATE INDEX IF NOT EXISTS idx_countries_iso3 ON countries(iso3);
+CREATE INDEX IF NOT EXISTS idx_countries_name ON countries(name_key);
+CREATE INDEX IF NOT EXISTS idx_countries_currency ON countries(currency_code);
+CREATE INDEX IF NOT EXISTS idx_countries_languages ON countries(languages);
+
+CREATE TABLE IF NOT EXISTS cities (
+    iso TEXT NOT NULL REFERENCES countries(iso) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    PRIMARY KEY (iso, position)
+);
+CREATE INDEX IF NOT EXISTS idx_cities_name ON cities(name_key);
+
+CREATE TABLE IF NOT EXISTS aggregates (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+# Bumped when stored derived data changes
+# (2: accent-insensitive keys, 3: aggregates table, 4: typed columns)
+SCHEMA_VERSION = 4
+
+
+def _fold(value) -> str:
+    """SQL helper: accent- and case-insensitive form (SQLite's lower() is ASCII only)."""
+    return normalize_text(value) if value is not None else ""
+
+
+def _regexp(pattern: str, value) -> bool:
+    """SQL helper backing the REGEXP operator (case-insensitive)."""
+    if value is None:
+        return False
+    return re.search(pattern, str(value), re.IGNORECASE) is not None
+
+
+def _speaks(value, query: str) -> bool:
+    """SQL helper: languages filter (see LanguageIndex.find)."""
+    return value is not None and language_matches(value, query)
+
+
+def _element_match(op: str, value, needle: str) -> bool:
+    """SQL helper: a query operator applied to each element of a comma-separated value."""
+    if value is None:
+        return False
+    elements = [_fold(part.strip()) for part in str(value).split(",")]
+    if op in (":", "="):
+        return needle in elements
+    if op == "^=":
+        return any(element.startswith(needle) for element in elements)
+    return any(needle in element for element in elements)
+
+
+def _predicate_sql(predicate: Predicate) -> Optional[Tuple[str, tuple]]:
+    field, op, needle = predicate.field, predicate.op, normalize_text(predicate.value)
+    if field == "cities":
+        if op == "~":
+            where, params = "instr(name_key, ?) > 0", (needle,)
+        elif op == "^=":
+            where, params = "name_key >= ? AND name_key < ?", (needle, needle + "\U0010ffff")
+        else:
+            where, params = "name_key = ?", (needle,)
+        return f"iso IN (SELECT iso FROM cities WHERE {where})", params
+    if field not in COUNTRY_COLUMNS:
+        return None
+    if op == ":" or field in LIST_COLUMNS:
+        return f"element_match(?, {field}, ?)", (op, needle)
+    if op == "=":
+        return f"({field} IS NOT NULL AND fold({field}) = ?)", (needle,)
+    if op == "^=":
+        return f"({field} IS NOT NULL AND instr(fold({field}), ?) = 1)", (needle,)
+    return f"({field} IS NOT NULL AND instr(fold({field}), ?) > 0)", (needle,)
+
+
+def _query_sql(expr) -> Optional[Tuple[str, tuple]]:
+    """
+    Translate a query expression into a WHERE condition.
+
+    Returns:
+        Tuple of (condition, parameters), or None if some field is not
+        stored in a column
+    """
+    if isinstance(expr, Predicate):
+        return _predicate_sql(expr)
+    if isinstance(expr, Comparison):
+        # Typed column: compared (and NULL-skipped) by SQLite itself
+        return f"({expr.field} IS NOT NULL AND {expr.field} {expr.op} ?)", (expr.number,)
+    if isinstance(expr, Not):
+        inner = _query_sql(expr.operand)
+        return None if inner is None else (f"NOT ({inner[0]})", inner[1])
+    parts = [_query_sql(operand) for operand in expr.operands]
+    if any(part is None for part in parts):
+        return None
+    joiner = " AND " if isinstance(expr, And) else " OR "
+    return (
+        joiner.join(f"({where})" for where, _ in parts),
+        tuple(param for _, params in parts for param in params),
+    )
+
+
+class SQLiteCountryIndex:
+    """
+    Index view backed by SQL lookups.
+
+    Offers the same lookup/uniqueness methods as CountryIndex so handlers
+    can validate input without loading the dataset.
+    """
+
+    def __init__(self, repository: "SQLiteCountryRepository"):
+        self._repo = repository
+
+    def __len__(self) -> int:
+        return self._repo._conn.execute("SELECT COUNT(*) FROM countries").fetchone()[0]
+
+    def __contains__(self, iso: str) -> bool:
+        row = self._repo._conn.execute(
+            "SELECT 1 FROM countries WHERE iso = ? LIMIT 1", (iso_key(iso),)
+        ).fetchone()
+        return row is not None
+
+    def _find(self, column: str, value: str) -> Optional[dict]:
+        row = self._repo._conn.execute(
+            f"SELECT iso FROM countries WHERE {column} = ? LIMIT 1", (value,)
+        ).fetchone()
+        return self._repo.get(row[0]) if row else None
+
+    def get_by_iso(self, iso: str) -> Optional[dict]:
+        """Return the record with the given ISO2 code."""
+        return self._find("iso", iso_key(iso))
+
+    def get_by_iso3(self, iso3: str) -> Optional[dict]:
+        """Return the record with the given ISO3 code."""
+        return self._find("iso3", iso_key(iso3))
+
+    def get_by_name(self, name: str) -> Optional[dict]:
+        """Return the record with the given country name (case-insensitive)."""
+        return self._find("name_key", name_key(name))
+
+    def has_city(self, iso: str, city: str, exclude_position: Optional[int] = None) -> bool:
+        """Check whether a country has a city (case-insensitive)."""
+        row = self._repo._conn.execute(
+            "SELECT 1 FROM cities WHERE name_key = ? AND iso = ? AND position IS NOT ? LIMIT 1",
+            (name_key(city), iso_key(iso), exclude_position),
+        ).fetchone()
+        return row is not None
+
+    def countries_with_city(self, city: str, match: str = "exact") -> List[dict]:
+        """Return the countries having a matching city, in dataset order."""
+        return self._repo.filter_by_city(city, match=match)
+
+    def lookup(self, field: str, value: str) -> Optional[dict]:
+        """Look up a record by one of the unique fields."""
+        if field == "iso":
+            return self.get_by_iso(value)
+        if field == "iso3":
+            return self.get_by_iso3(value)
+        if field == "country":
+            return self.get_by_name(value)
+        raise ValueError(f"Field '{field}' is not indexed")
+
+    def is_taken(self, field: str, value: str, exclude_iso: str = "") -> bool:
+        """Check whether a unique field value belongs to another country."""
+        if not value:
+            return False
+        found = self.lookup(field, value)
+        if found is None:
+            return False
+        return not (exclude_iso and iso_key(found.get("iso", "")) == iso_key(exclude_iso))
+
+    def find_conflict(self, data: dict, exclude_iso: str = "") -> Tuple[bool, str]:
+        """Validate that the unique fields of a record are not already used."""
+        if self.is_taken("iso", data.get("iso", ""), exclude_iso):
+            return False, f"ISO code '{iso_key(data.get('iso', ''))}' already exists"
+        if self.is_taken("iso3", data.get("iso3", ""), exclude_iso):
+            return False, f"ISO3 code '{iso_key(data.get('iso3', ''))}' already exists"
+        if self.is_taken("country", data.get("country", ""), exclude_iso):
+            return False, f"Country name '{data.get('country')}' already exists"
+        return True, ""
+
+
+class SQLiteCountryRepository(BatchOperationsMixin):
+    """Country repository stored in an SQLite database."""
+
+    def __init__(self, db_file: str = SQLITE_FILE, cache_size: int = RESULT_CACHE_SIZE):
+        self.db_file = db_file
+        self._connection: Optional[sqlite3.Connection] = None
+        # Bumped on every write through this repository; derived
+        # structures are rebuilt lazily per version.
+        self.version = 0
+        self._derived: dict = {}
+        self._data_version: Optional[int] = None
+        self._results = ResultCache(cache_size)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists."""
+        if self._connection is None:
+            conn = sqlite3.connect(self.db_file)
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.create_function("fold", 1, _fold, deterministic=True)
+            conn.create_function("regexp", 2, _regexp, deterministic=True)
+            conn.create_function("speaks", 2, _speaks, deterministic=True)
+            conn.create_function("element_match", 3, _element_match, deterministic=True)
+            conn.executescript(SCHEMA)
+            self._connection = conn
+            try:
+                self._upgrade(conn)
+            except sqlite3.Error:
+                self.close()
+                raise
+        return self._connection
+
+    def _upgrade(self, conn: sqlite3.Connection):
+        """Recompute the stored keys and aggregates of databases written by older versions."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with conn:
+            if version < 4:
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(countries)")}
+                for column, kind in TYPED_COLUMNS.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE countries ADD COLUMN {column} {kind}")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_countries_continent ON countries(continent)")
+            if version < 2:
+                conn.create_function("name_key", 1, name_key, deterministic=True)
+                conn.execute("UPDATE countries SET name_key = name_key(country)")
+                conn.execute("UPDATE cities SET name_key = name_key(name)")
+            if version < 3:
+                self._rebuild_aggregates()
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """Close the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _changed(self):
+        """Record that the dataset changed: new version, drop derived data."""
+        self.version += 1
+        self._derived.clear()
+
+    def _sync_version(self):
+        """Pick up commits made by other connections (PRAGMA data_version)."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            if self._data_version is not None:
+                self._changed()
+            self._data_version = data_version
+
+    def derived(self, name: str, builder, rows=None):
+        """
+        Return a structure derived from the records, built once per version.
+
+        Args:
+            name: Cache key of the structure
+            builder: Callable receiving the list of records
+            rows: Callable returning the rows to build from instead of
+                every full record (e.g. a few columns)
+
+        Returns:
+            The cached or freshly built structure
+        """
+        self._sync_version()
+        if name not in self._derived:
+            if rows is not None:
+                self._derived[name] = builder(rows())
+                return self._derived[name]
+            self._derived[name] = builder(self.records())
+        return self._derived[name]
+
+    # Each commit only touches the changed rows
+    writes_incrementally = True
+
+    @property
+    def aggregates(self) -> AggregateStore:
+        """Value counts kept in the aggregates table (loaded once per version)."""
+        self._sync_version()
+        if "aggregates" not in self._derived:
+            rows = self._conn.execute("SELECT kind, key, count FROM aggregates")
+            self._derived["aggregates"] = AggregateStore.from_rows(rows)
+        return self._derived["aggregates"]
+
+    def verify_aggregates(self) -> List[str]:
+        """
+        Recompute the aggregates from scratch and compare with the stored ones.
+
+        Returns:
+            One line per drifted count (empty if consistent)
+        """
+        self._sync_version()
+        stored = AggregateStore.from_rows(self._conn.execute("SELECT kind, key, count FROM aggregates"))
+        return stored.drift(AggregateStore(self.load_all()))
+
+    @property
+    def index(self) -> SQLiteCountryIndex:
+        """SQL-backed index for lookups and uniqueness checks."""
+        return SQLiteCountryIndex(self)
+
+    def is_empty(self) -> bool:
+        """Check whether the database holds no countries."""
+        return self._conn.execute("SELECT 1 FROM countries LIMIT 1").fetchone() is None
+
+    # Row <-> record conversion
+
+    def _row_values(self, country: dict, position: int) -> tuple:
+        extra = {
+            k: v for k, v in country.items()
+            if k not in COUNTRY_COLUMNS and k != "cities"
+        }
+        # Missing fields are stored as NULL so records round-trip unchanged
+        values = [country.get(col) for col in COUNTRY_COLUMNS]
+        values[0] = iso_key(values[0])
+        for i, col in enumerate(COUNTRY_COLUMNS):
+            if col in LIST_COLUMNS and isinstance(values[i], (list, tuple)):
+                values[i] = ",".join(values[i])
+        return (
+            position,
+            *values,
+            name_key(country.get("country", "")),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    def _record(self, row: tuple, cities: List[str]) -> dict:
+        record = {
+            col: value for col, value in zip(COUNTRY_COLUMNS, row)
+            if value is not None
+        }
+        for col in LIST_COLUMNS:
+            if col in record:
+                record[col] = [part for part in record[col].split(",") if part]
+        extra = row[len(COUNTRY_COLUMNS)]
+        if extra:
+            record.update(json.loads(extra))
+        record["cities"] = cities
+        return record
+
+    def _select_countries(self, where: str = "", params: tuple = ()) -> List[dict]:
+        """Fetch country records (with their cities) matching a WHERE clause."""
+        columns = ", ".join(COUNTRY_COLUMNS)
+        rows = self._conn.execute(
+            f"SELECT {columns}, extra FROM countries {where} ORDER BY position", params
+        ).fetchall()
+        if not rows:
+            return []
+        cities: dict = {row[0]: [] for row in rows}
+        if len(rows) == 1:
+            city_rows = self._conn.execute(
+                "SELECT iso, name FROM cities WHERE iso = ? ORDER BY position", (rows[0][0],)
+            )
+        else:
+            city_rows = self._conn.execute(
+                f"SELECT iso, name FROM cities WHERE iso IN "
+                f"(SELECT iso FROM countries {where}) ORDER BY iso, position", params
+            )
+        for iso, name in city_rows:
+            cities[iso].append(name)
+        return [self._record(row, cities[row[0]]) for row in rows]
+
+    def _apply_aggregates(self, old: Optional[dict], new: Optional[dict]):
+        """Adjust the aggregates table by one record change (inside the write transaction)."""
+        delta = aggregate_delta(old, new)
+        if not delta:
+            return
+        rows = [(kind, key, n) for (kind, key), n in delta.items()]
+        self._conn.executemany(
+            "INSERT INTO aggregates (kind, key, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET count = count + excluded.count",
+            rows,
+        )
+        self._conn.executemany(
+            "DELETE FROM aggregates WHERE kind = ? AND key = ? AND count <= 0 AND kind <> 'total'",
+            [(kind, key) for kind, key, n in rows if n < 0],
+        )
+
+    def _rebuild_aggregates(self):
+        self._conn.execute("DELETE FROM aggregates")
+        store = AggregateStore(self._select_countries())
+        rows = [("total", "countries", store.countries), ("total", "cities", store.cities)]
+        rows += [(kind, key, n) for kind, counter in store.counts.items() for key, n in counter.items()]
+        self._conn.executemany("INSERT INTO aggregates (kind, key, count) VALUES (?, ?, ?)", rows)
+
+    def _delete(self, iso: str):
+        """Delete a country row (its cities cascade) and uncount it."""
+        found = self._select_countries("WHERE iso = ?", (iso,))
+        if found:
+            self._conn.execute("DELETE FROM countries WHERE iso = ?", (iso,))
+            self._apply_aggregates(found[0], None)
+
+    def _insert(self, country: dict, position: int, previous: Optional[dict] = None):
+        placeholders = ", ".join("?" * (len(COUNTRY_COLUMNS) + 3))
+        columns = ", ".join(COUNTRY_COLUMNS)
+        self._conn.execute(
+            f"INSERT INTO countries (position, {columns}, name_key, extra) VALUES ({placeholders})",
+            self._row_values(country, position),
+        )
+        self._replace_cities(iso_key(country.get("iso", "")), country.get("cities") or [])
+        self._apply_aggregates(previous, country)
+
+    def _replace_cities(self, iso: str, cities: List[str]):
+        self._conn.execute("DELETE FROM cities WHERE iso = ?", (iso,))
+        self._conn.executemany(
+            "INSERT INTO cities (iso, position, name, name_key) VALUES (?, ?, ?, ?)",
+            [(iso, i, city, name_key(city)) for i, city in enumerate(cities)],
+        )
+
+    def _splice_cities(self, iso: str, old: List[str], new: List[str]):
+        """Write only the city positions that changed (see list_splice)."""
+        start, deleted, inserted = list_splice(old, new)
+        if deleted == len(inserted):
+            # Same length (renames): update those rows in place
+            self._conn.executemany(
+                "UPDATE cities SET name = ?, name_key = ? WHERE iso = ? AND position = ?",
+                [(city, name_key(city), iso, start + i) for i, city in enumerate(inserted)],
+            )
+            return
+        # Every position from start onwards moves; an append deletes nothing
+        self._conn.execute("DELETE FROM cities WHERE iso = ? AND position >= ?", (iso, start))
+        self._conn.executemany(
+            "INSERT INTO cities (iso, position, name, name_key) VALUES (?, ?, ?, ?)",
+            [(iso, i, new[i], name_key(new[i])) for i in range(start, len(new))],
+        )
+
+    def _replace(self, iso: str, record: dict, previous: dict):
+        """
+        Rewrite a country row in place, keeping its list position.
+
+        Args:
+            iso: ISO code of the stored row
+            record: New version of the record
+            previous: Stored version of the record
+        """
+        position = self._conn.execute(
+            "SELECT position FROM countries WHERE iso = ?", (iso,)
+        ).fetchone()[0]
+        if iso_key(record.get("iso", "")) != iso:
+            # A new ISO code changes the key the cities refer to
+            self._conn.execute("DELETE FROM countries WHERE iso = ?", (iso,))
+            self._insert(record, position, previous)
+            return
+        assignments = ", ".join(f"{col} = ?" for col in COUNTRY_COLUMNS + ["name_key", "extra"])
+        self._conn.execute(
+            f"UPDATE countries SET {assignments} WHERE iso = ?",
+            (*self._row_values(record, position)[1:], iso),
+        )
+        self._splice_cities(iso, previous.get("cities") or [], record.get("cities") or [])
+        self._apply_aggregates(previous, record)
+
+    def _next_position(self) -> int:
+        row = self._conn.execute("SELECT MAX(position) FROM countries").fetchone()
+        return (row[0] + 1) if row[0] is not None else 0
+
+    # Repository contract
+
+    def load_all(self) -> List[dict]:
+        """Return all country records."""
+        return self._select_countries()
+
+    def records(self) -> List[CountryRecord]:
+        """Return the immutable records of the current version (shared, not copies)."""
+        self._sync_version()
+        if "records" not in self._derived:
+            # One compact copy of the rows shared by every derived structure
+            self._derived["records"] = [CountryRecord(c) for c in self.load_all()]
+        return self._derived["records"]
+
+    def save_all(self, countries: List[dict]) -> bool:
+        """Replace the whole dataset in a single transaction."""
+        try:
+            with self._conn:
+                self._conn.execute("DELETE FROM cities")
+                self._conn.execute("DELETE FROM countries")
+                self._conn.execute("DELETE FROM aggregates")
+                for position, country in enumerate(countries):
+                    self._insert(country, position)
+            self._changed()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def get(self, iso: str) -> Optional[dict]:
+        """Return a single country, or None if not found."""
+        found = self._select_countries("WHERE iso = ?", (iso_key(iso),))
+        return found[0] if found else None
+
+    def add(self, country_data: dict) -> tuple[bool, str]:
+        """Add a new country."""
+        iso = country_data.get("iso", "").upper()
+        if self.index.get_by_iso(iso) is not None:
+            return False, f"Country with ISO code '{iso}' already exists"
+
+        country_data["iso"] = iso
+        try:
+            with self._conn:
+                self._insert(country_data, self._next_position())
+        except sqlite3.Error as e:
+            print(f"Error saving data: {e}")
+            return False, "Failed to save data"
+        self._changed()
+        return True, f"Country '{country_data.get('country')}' added successfully"
+
+    def update(self, iso: str, updated_data: dict) -> tuple[bool, str]:
+        """Update fields of an existing country (a None value clears the field)."""
+        current = self.get(iso)
+        if current is None:
+            return False, f"Country with ISO code '{iso}' not found"
+
+        record = dict(current)
+        record.update(updated_data)
+        try:
+            with self._conn:
+                self._replace(current["iso"], record, current)
+        except sqlite3.Error as e:
+            print(f"Error saving data: {e}")
+            return False, "Failed to save data"
+        self._changed()
+        return True, f"Country '{iso}' updated successfully"
+
+    def delete(self, iso: str) -> tuple[bool, str]:
+        """Delete a country by ISO code."""
+        current = self.get(iso)
+        if current is None:
+            return False, f"Country with ISO code '{iso}' not found"
+        try:
+            with self._conn:
+                self._delete(current["iso"])
+        except sqlite3.Error as e:
+            print(f"Error saving data: {e}")
+            return False, "Failed to save data"
+        self._changed()
+        return True, f"Country '{current.get('country')}' deleted successfully"
+
+    def apply_changes(self, changes: list) -> bool:
+        """
+        Apply net (iso, before, after) changes from a Transaction in one SQL transaction.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with self._conn:
+                for key, before, after in changes:
+                    if after is None:
+                        self._delete(key)
+                    elif before is None:
+                        self._insert(after, self._next_position())
+                    elif after != before:
+                        self._replace(key, after, before)
+        except sqlite3.Error as e:
+            print(f"Error saving data: {e}")
+            return False
+        self._changed()
+        return True
+
+    # Filters pushed down to SQL (results cached per version)
+
+    def cached(self, op: str, args, compute):
+        """Return a query result from the LRU cache, computing it on a miss."""
+        self._sync_version()
+        return self._results.get_or_compute(op, args, self.version, compute)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters of the result cache."""
+        return self._results.stats()
+
+    def _cached_records(self, op: str, args, compute) -> List[dict]:
+        return [copy_record(c) for c in self.cached(op, args, lambda: tuple(compute()))]
+
+    def filter_by_field(self, field: str, value: str) -> List[dict]:
+        """Substring filter on one field, evaluated in SQL (languages match like LanguageIndex.find)."""
+        needle = _fold(value)
+        if field == "cities":
+            return self.filter_by_city(value)
+        if field == "languages":
+            return self._cached_records(
+                "filter_by_field", (field, needle),
+                lambda: self._select_countries("WHERE speaks(languages, ?)", (value,)),
+            )
+        if field not in COUNTRY_COLUMNS:
+            return []
+        return self._cached_records(
+            "filter_by_field", (field, needle),
+            lambda: self._select_countries(f"WHERE instr(fold({field}), ?) > 0", (needle,)),
+        )
+
+    def filter_by_city(self, city_name: str, match: str = "substring") -> List[dict]:
+        """
+        Countries having a matching city.
+
+        Exact and prefix matches use the index on cities.name_key;
+        substring matches scan the (compact) name_key column.
+        """
+        needle = name_key(city_name)
+        if match == "exact":
+            where, params = "name_key = ?", (needle,)
+        elif match == "prefix":
+            where, params = "name_key >= ? AND name_key < ?", (needle, needle + "\U0010ffff")
+        else:
+            where, params = "instr(name_key, ?) > 0", (needle,)
+        return self._cached_records(
+            "filter_by_city", (needle, match),
+            lambda: self._select_countries(
+                f"WHERE iso IN (SELECT iso FROM cities WHERE {where})", params
+            ),
+        )
+
+    def search(self, query: str, regex: bool = False, prefix: bool = False) -> List[dict]:
+        """Search across every field and city, evaluated in SQL."""
+        if regex or prefix:
+            pattern = query if regex else r"(?<!\w)" + re.escape(query)
+            re.compile(pattern)  # Surface re.error before running the query
+            clauses = [f"{col} REGEXP ?" for col in COUNTRY_COLUMNS]
+            clauses.append("iso IN (SELECT iso FROM cities WHERE name REGEXP ?)")
+            return self._cached_records(
+                "search", (pattern, True),
+                lambda: self._select_countries(
+                    "WHERE " + " OR ".join(clauses), (pattern,) * len(clauses)
+                ),
+            )
+        needle = _fold(query)
+        clauses = [f"instr(fold({col}), ?) > 0" for col in COUNTRY_COLUMNS]
+        clauses.append("iso IN (SELECT iso FROM cities WHERE instr(name_key, ?) > 0)")
+        return self._cached_records(
+            "search", (needle, False),
+            lambda: self._select_countries(
+                "WHERE " + " OR ".join(clauses), (needle,) * len(clauses)
+            ),
+        )
+
+    def sorted_by(self, field: str, descending: bool = False) -> List[dict]:
+        """All countries sorted by a field (case-insensitive; numeric fields by value, missing last)."""
+        if field in NUMERIC_FIELDS:
+            return self._cached_records(
+                "sorted_by", (field, descending),
+                lambda: sort_numeric(self.load_all(), field, descending),
+            )
+        return self._cached_records(
+            "sorted_by", (field, descending),
+            lambda: sorted(
+                self.load_all(),
+                key=lambda c: _fold(c.get(field, "")),
+                reverse=descending,
+            ),
+        )
+
+    def query(self, text: str) -> List[dict]:
+        """
+        Countries matching a query expression.
+
+        The filter runs in SQL, so only the matching rows are read; sort
+        and limit apply to those. Expressions on fields without a column
+        fall back to the cached field indexes.
+        """
+        parsed = parse_query(text)
+        where = _query_sql(parsed.where) if parsed.where is not None else ("1", ())
+        if where is None:
+            return [copy_record(c) for c in parsed.execute(self.derived("fields", FieldIndex))]
+        return self._cached_records(
+            "query", (text,),
+            lambda: parsed.arrange(self._select_countries(f"WHERE {where[0]}", where[1])),
+        )
+
+    def explain(self, text: str) -> List[str]:
+        """Execution plan of a query expression."""
+        parsed = parse_query(text)
+        where = _query_sql(parsed.where) if parsed.where is not None else ("1", ())
+        if where is None:
+            return parsed.explain(self.derived("fields", FieldIndex))
+        return [f"SQL WHERE {where[0]}"] + parsed.arrange_steps()
+
+    def _name_rows(self) -> List[dict]:
+        """Just the iso, country and cities of every country (what FuzzyIndex needs)."""
+        rows = {iso: {"iso": iso, "country": country, "cities": []}
+                for iso, country in self._conn.execute("SELECT iso, country FROM countries ORDER BY position")}
+        for iso, name in self._conn.execute("SELECT iso, name FROM cities ORDER BY iso, position"):
+            rows[iso]["cities"].append(name)
+        return list(rows.values())
+
+    def fuzzy_search(self, query: str, **options) -> Tuple[List[dict], bool]:
+        """Typo-tolerant country/city name search (BK-tree cached per version, built from the names only)."""
+        return self.derived("fuzzy", FuzzyIndex, rows=self._name_rows).search(query, **options)
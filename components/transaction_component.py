@@ -0,0 +1,321 @@
+"""
+Transaction Component - Batched mutations committed with a single write.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from country_types import copy_record, validate_country
+from .index_component import CountryIndex, iso_key, name_key
+
+
+class TransactionError(ValueError):
+    """Raised when a batched change is invalid or cannot be committed."""
+
+
+class _CityKeys:
+    """
+    Folded city names of a staged country whose city list started from
+    the repository's: the base index answers, adjusted by this batch's
+    additions and removals, so staging a city costs O(1) however many
+    cities the country already has.
+    """
+
+    def __init__(self, base, iso: str):
+        self._base = base
+        self._iso = iso
+        self._added: set = set()
+        self._removed: set = set()
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._added:
+            return True
+        return key not in self._removed and self._base.has_city(self._iso, key)
+
+    def add(self, key: str):
+        self._removed.discard(key)
+        self._added.add(key)
+
+    def discard(self, key: str):
+        self._added.discard(key)
+        self._removed.add(key)
+
+
+class Transaction:
+    """
+    Stage country and city changes and commit them together.
+
+    Changes are validated against the repository indexes (plus whatever
+    is already staged) as they are made. Leaving the ``with`` block
+    normally commits every change with one write; an exception, or an
+    explicit rollback(), discards them all.
+
+    Usage:
+        with repo.batch() as tx:
+            tx.add_city("FR", "Lyon")
+            tx.rename_city("FR", 0, "Paris")
+    """
+
+    def __init__(self, repository):
+        self._repo = repository
+        self._base = repository.index
+        # iso key -> staged record (None means deleted)
+        self._changes: Dict[str, Optional[dict]] = {}
+        # Staged records, for ISO/ISO3/name uniqueness checks only
+        self._staged = CountryIndex(index_cities=False)
+        self._city_keys: Dict[str, set] = {}
+        # Base records are re-read per call on SQLite; the repository
+        # does not change until commit
+        self._originals: Dict[str, Optional[dict]] = {}
+        self._closed = False
+        self.message = ""
+
+    def __enter__(self) -> "Transaction":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.rollback()
+            return False
+        self.commit()
+        return False
+
+    def __contains__(self, iso: str) -> bool:
+        return self._lookup(iso) is not None
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    # Staged view
+
+    def _original(self, key: str) -> Optional[dict]:
+        """Repository version of a country, read once per transaction."""
+        if key not in self._originals:
+            self._originals[key] = self._base.get_by_iso(key)
+        return self._originals[key]
+
+    def _lookup(self, iso: str) -> Optional[dict]:
+        key = iso_key(iso)
+        if key in self._changes:
+            return self._changes[key]
+        return self._original(key)
+
+    def get(self, iso: str) -> Optional[dict]:
+        """Return a copy of a country as it would look after commit."""
+        country = self._lookup(iso)
+        return copy_record(country) if country is not None else None
+
+    def _require(self, iso: str) -> dict:
+        """Return the staged (writable) record for a country."""
+        key = iso_key(iso)
+        if key in self._changes:
+            record = self._changes[key]
+        else:
+            base = self._original(key)
+            record = copy_record(base) if base is not None else None
+            if record is not None:
+                self._stage(key, record)
+        if record is None:
+            raise TransactionError(f"Country with ISO code '{iso}' not found")
+        return record
+
+    def _stage(self, key: str, record: Optional[dict]):
+        previous = self._changes.get(key)
+        if previous is not None:
+            self._staged.remove(previous)
+        self._changes[key] = record
+        if record is not None:
+            self._staged.add(record)
+        self._city_keys.pop(key, None)
+
+    def _is_taken(self, field: str, value: str, exclude_iso: str) -> bool:
+        if not value:
+            return False
+        exclude = iso_key(exclude_iso)
+        staged = self._staged.lookup(field, value)
+        if staged is not None and iso_key(staged.get("iso", "")) != exclude:
+            return True
+        base = self._base.lookup(field, value)
+        if base is None:
+            return False
+        base_iso = iso_key(base.get("iso", ""))
+        # Base records that were changed in this batch are judged by their staged version
+        return base_iso not in self._changes and base_iso != exclude
+
+    def _check(self, record: dict, exclude_iso: str = ""):
+        is_valid, error = validate_country(record)
+        if not is_valid:
+            raise TransactionError(error)
+        if self._is_taken("iso", record.get("iso", ""), exclude_iso):
+            raise TransactionError(f"ISO code '{iso_key(record.get('iso', ''))}' already exists")
+        if self._is_taken("iso3", record.get("iso3", ""), exclude_iso):
+            raise TransactionError(f"ISO3 code '{iso_key(record.get('iso3', ''))}' already exists")
+        if self._is_taken("country", record.get("country", ""), exclude_iso):
+            raise TransactionError(f"Country name '{record.get('country')}' already exists")
+
+    def _cities_of(self, iso: str) -> Tuple[dict, set]:
+        record = self._require(iso)
+        key = iso_key(iso)
+        keys = self._city_keys.get(key)
+        if keys is None:
+            base = self._original(key)
+            if base is not None and list(base.get("cities") or []) == record["cities"]:
+                keys = _CityKeys(self._base, key)
+            else:
+                keys = {name_key(c) for c in record["cities"]}
+            self._city_keys[key] = keys
+        return record, keys
+
+    def _ensure_open(self):
+        if self._closed:
+            raise TransactionError("Transaction is already closed")
+
+    # Country operations
+
+    def add(self, country_data: dict):
+        """Stage a new country."""
+        self._ensure_open()
+        record = copy_record(country_data)
+        record["iso"] = iso_key(record.get("iso", ""))
+        self._check(record)
+        self._stage(record["iso"], record)
+
+    def update(self, iso: str, updated_data: dict):
+        """Stage field changes for an existing country (a None value clears the field)."""
+        self._ensure_open()
+        current = self._require(iso)
+        record = copy_record(current)
+        record.update(updated_data)
+        record = copy_record(record)
+        record["iso"] = iso_key(record.get("iso", ""))
+        self._check(record, exclude_iso=iso)
+        if record["iso"] != iso_key(iso):
+            # A changed ISO code is committed as delete + add
+            self._stage(iso_key(iso), None)
+        self._stage(record["iso"], record)
+
+    def delete(self, iso: str):
+        """Stage the removal of a country."""
+        self._ensure_open()
+        self._require(iso)
+        self._stage(iso_key(iso), None)
+
+    # City operations
+
+    def has_city(self, iso: str, city_name: str) -> bool:
+        """Check whether a country already has a city (case-insensitive)."""
+        key = iso_key(iso)
+        if key not in self._changes and self._original(key) is not None:
+            # Untouched country: answer from the repository's city index
+            return self._base.has_city(key, city_name)
+        _, keys = self._cities_of(iso)
+        return name_key(city_name) in keys
+
+    def add_city(self, iso: str, city_name: str):
+        """Stage a new city for a country."""
+        self._ensure_open()
+        city_name = city_name.strip()
+        if not city_name:
+            raise TransactionError("City name is required")
+        record, keys = self._cities_of(iso)
+        city_key = name_key(city_name)
+        if city_key in keys:
+            raise TransactionError(f"City '{city_name}' already exists in this country")
+        record["cities"].append(city_name)
+        keys.add(city_key)
+
+    def rename_city(self, iso: str, index: int, new_name: str):
+        """Stage renaming the city at a list position."""
+        self._ensure_open()
+        new_name = new_name.strip()
+        if not new_name:
+            raise TransactionError("City name cannot be empty")
+        record, keys = self._cities_of(iso)
+        cities = record["cities"]
+        if index < 0 or index >= len(cities):
+            raise TransactionError("Invalid city number")
+        old_key = name_key(cities[index])
+        if name_key(new_name) in keys and name_key(new_name) != old_key:
+            raise TransactionError(f"City '{new_name}' already exists in this country")
+        keys.discard(old_key)
+        keys.add(name_key(new_name))
+        cities[index] = new_name
+
+    def delete_city(self, iso: str, index: int):
+        """Stage removing the city at a list position."""
+        self._ensure_open()
+        record, keys = self._cities_of(iso)
+        cities = record["cities"]
+        if index < 0 or index >= len(cities):
+            raise TransactionError("Invalid city number")
+        keys.discard(name_key(cities.pop(index)))
+
+    # Commit / rollback
+
+    def changes(self) -> List[Tuple[str, Optional[dict], Optional[dict]]]:
+        """Return the net (iso, before, after) changes in staging order."""
+        result = []
+        for key, after in self._changes.items():
+            before = self._original(key)
+            if before is None and after is None:
+                continue
+            result.append((key, before, after))
+        return result
+
+    def commit(self):
+        """Write every staged change with a single repository write."""
+        self._ensure_open()
+        self._closed = True
+        changes = self.changes()
+        if not changes:
+            self.message = "No changes to save"
+            return
+        if not self._repo.apply_changes(changes):
+            raise TransactionError("Failed to save data")
+        self.message = f"Saved {len(changes)} change(s)"
+
+    def rollback(self):
+        """Discard every staged change."""
+        self._changes.clear()
+        self._staged = CountryIndex(index_cities=False)
+        self._city_keys.clear()
+        self._closed = True
+
+
+class BatchOperationsMixin:
+    """
+    Batch and city CRUD entry points shared by the storage backends.
+
+    Backends provide ``index`` and ``apply_changes(changes)``.
+    """
+
+    def batch(self) -> Transaction:
+        """Start a transaction: ``with repo.batch() as tx: ...``."""
+        return Transaction(self)
+
+    def _run_batch(self, operation, success_message: str) -> tuple[bool, str]:
+        try:
+            with self.batch() as tx:
+                operation(tx)
+        except TransactionError as e:
+            return False, str(e)
+        return True, success_message
+
+    def add_city(self, iso: str, city_name: str) -> tuple[bool, str]:
+        """Add a city to a country."""
+        return self._run_batch(
+            lambda tx: tx.add_city(iso, city_name),
+            f"City '{city_name.strip()}' added successfully",
+        )
+
+    def rename_city(self, iso: str, index: int, new_name: str) -> tuple[bool, str]:
+        """Rename the city at a list position."""
+        return self._run_batch(
+            lambda tx: tx.rename_city(iso, index, new_name),
+            f"City renamed to '{new_name.strip()}' successfully",
+        )
+
+    def delete_city(self, iso: str, index: int) -> tuple[bool, str]:
+        """Remove the city at a list position."""
+        return self._run_batch(
+            lambda tx: tx.delete_city(iso, index),
+            "City deleted successfully",
+        )
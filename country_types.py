@@ -1,7 +1,9 @@
 """
 Type definitions for Country Manager application.
 """
-from typing import TypedDict, Optional, List, Tuple
+import sys
+from collections.abc import Mapping
+from typing import Any, Iterator, TypedDict, Optional, List, Tuple
 
 
 class Country(TypedDict):
@@ -17,6 +19,12 @@ class Country(TypedDict):
     postal_code_regex: str        # Postal code regex pattern
     languages: str                # Languages spoken (e.g., "ca")
     geonameid: str                # Geonames ID
+    iso_numeric: Optional[int]    # ISO 3166-1 numeric code (e.g., 20)
+    capital: str                  # Capital city (e.g., "Andorra la Vella")
+    area: Optional[float]         # Area in km² (e.g., 468.0)
+    population: Optional[int]     # Population (e.g., 77006)
+    continent: str                # Continent code (e.g., "EU")
+    neighbours: List[str]         # ISO codes of bordering countries (e.g., ["ES", "FR"])
     cities: List[str]             # List of major cities
 
 
@@ -33,9 +41,156 @@ COUNTRY_FIELDS = [
     ("postal_code_regex", "Postal Code Regex"),
     ("languages", "Languages"),
     ("geonameid", "GeoName ID"),
+    ("iso_numeric", "ISO Numeric Code"),
+    ("capital", "Capital"),
+    ("area", "Area (km²)"),
+    ("population", "Population"),
+    ("continent", "Continent"),
+    ("neighbours", "Neighbours"),
     ("cities", "Cities"),
 ]
 
+# Fields holding numbers (None when unknown)
+NUMERIC_FIELDS = {"iso_numeric": int, "area": float, "population": int}
+
+# Continent codes used by GeoNames
+CONTINENTS = {
+    "AF": "Africa",
+    "AN": "Antarctica",
+    "AS": "Asia",
+    "EU": "Europe",
+    "NA": "North America",
+    "OC": "Oceania",
+    "SA": "South America",
+}
+
+
+# Fields whose values repeat across many records (shared via sys.intern)
+INTERNED_FIELDS = frozenset({
+    "tld",
+    "currency_code",
+    "currency_name",
+    "postal_code_format",
+    "postal_code_regex",
+    "languages",
+    "continent",
+})
+
+# Marks a slot whose key is absent from the record
+_MISSING = object()
+
+
+def _intern(key: str, value: Any) -> Any:
+    if key in INTERNED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class _SlottedRecord(Mapping):
+    """
+    Read-only mapping stored in fixed slots instead of a per-record dict.
+
+    Subclasses list their fields in ``_fields``. Keys outside ``_fields``
+    go to an ``_extra`` dict that is only allocated when needed, so the
+    record round-trips any dict. ``record["x"]``, ``get``, ``in``,
+    ``keys``/``items``/``values``, ``dict(record)`` and ``==`` against a
+    dict all behave as for the dict it was built from.
+    """
+
+    __slots__ = ("_extra",)
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, data: Optional[Mapping] = None, **fields):
+        object.__setattr__(self, "_extra", None)
+        for field in self._fields:
+            object.__setattr__(self, field, _MISSING)
+        for source in (data or {}, fields):
+            for key, value in source.items():
+                self._set(key, value)
+
+    def _set(self, key: str, value: Any):
+        if isinstance(value, list):
+            value = list(value)
+        else:
+            value = _intern(key, value)
+        if key in self._fields:
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                object.__setattr__(self, "_extra", {})
+            self._extra[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Mapping):
+        """Build a record from a dict (a record of this type is returned as is)."""
+        return data if type(data) is cls else cls(data)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self._fields:
+            return getattr(self, key) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self._fields:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(1 for field in self._fields if getattr(self, field) is not _MISSING)
+        return count + (len(self._extra) if self._extra is not None else 0)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable; copy it with to_dict()")
+
+    __hash__ = None
+
+    def to_dict(self) -> dict:
+        """Return a mutable dict copy (list values are copied too)."""
+        return {key: list(value) if isinstance(value, list) else value for key, value in self.items()}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(),)
+
+
+class CountryRecord(_SlottedRecord):
+    """
+    Compact, immutable country record with a dict-compatible interface.
+
+    Repeated values (currency, TLD, languages, postal formats...) are
+    interned so records share one string object. Records are never
+    mutated in place: take a to_dict() copy, change it and build a new
+    record.
+    """
+
+    _fields = tuple(key for key, _ in COUNTRY_FIELDS)
+    __slots__ = _fields
+
+
+def copy_record(country: Mapping) -> dict:
+    """
+    Return a copy of a country record that callers can safely mutate.
+
+    List values are copied too, and ``cities`` is always a list so
+    callers can append to it.
+    """
+    record = {key: list(value) if isinstance(value, (list, tuple)) else value for key, value in country.items()}
+    record["cities"] = list(record.get("cities") or [])
+    return record
+
 
 def validate_country(data: dict) -> tuple[bool, str]:
     """
@@ -61,6 +216,20 @@ def validate_country(data: dict) -> tuple[bool, str]:
     if len(data.get("iso3", "")) != 3:
         return False, "ISO3 code must be exactly 3 characters"
     
+    # Validate typed fields
+    for field, kind in NUMERIC_FIELDS.items():
+        value = data.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            return False, f"Field '{field}' must be a non-negative number"
+        if kind is int and not float(value).is_integer():
+            return False, f"Field '{field}' must be a whole number"
+    
+    continent = data.get("continent")
+    if continent and continent not in CONTINENTS:
+        return False, f"Continent must be one of {', '.join(CONTINENTS)}"
+    
     return True, ""
 
 
@@ -78,25 +247,38 @@ def create_empty_country() -> Country:
         "postal_code_regex": "",
         "languages": "",
         "geonameid": "",
+        "iso_numeric": None,
+        "capital": "",
+        "area": None,
+        "population": None,
+        "continent": "",
+        "neighbours": [],
         "cities": [],
     }
 
 
-def validate_country_unique(data: dict, countries: List[dict], exclude_iso: str = "") -> Tuple[bool, str]:
+def validate_country_unique(data: dict, countries, exclude_iso: str = "") -> Tuple[bool, str]:
     """
     Validate that country fields are unique.
     
     Args:
         data: Country data to validate
-        countries: List of existing countries
+        countries: CountryIndex of existing countries (or a plain list)
         exclude_iso: ISO code to exclude (for edits)
         
     Returns:
         Tuple of (is_valid, error_message)
     """
+    # Indexed path: O(1) hash lookups instead of a scan
+    if hasattr(countries, "find_conflict"):
+        return countries.find_conflict(data, exclude_iso)
+    
+    # Imported here: components imports this module at start-up
+    from components.index_component import name_key
+    
     new_iso = data.get("iso", "").upper()
     new_iso3 = data.get("iso3", "").upper()
-    new_name = data.get("country", "").lower()
+    new_name = name_key(data.get("country", ""))
     
     for country in countries:
         current_iso = country.get("iso", "").upper()
@@ -114,7 +296,7 @@ def validate_country_unique(data: dict, countries: List[dict], exclude_iso: str
             return False, f"ISO3 code '{new_iso3}' already exists"
         
         # Check country name uniqueness
-        if country.get("country", "").lower() == new_name:
+        if name_key(country.get("country", "")) == new_name:
             return False, f"Country name '{data.get('country')}' already exists"
     
     return True, ""
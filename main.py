@@ -34,7 +34,11 @@ from components.handlers import (
     handle_search_countries,
     handle_export_pdf,
     handle_import_data,
+    handle_import_cities,
     handle_show_statistics,
+    handle_verify_statistics,
+    handle_border_routes,
+    handle_history,
     handle_list_cities,
     handle_add_city,
     handle_edit_city,
@@ -109,6 +113,7 @@ def handle_city_menu():
     print("2. Add city to a country")
     print("3. Edit city name")
     print("4. Delete city")
+    print("5. Import cities from GeoNames")
     print("0. Back to main menu")
     print("-" * 30)
     
@@ -122,6 +127,8 @@ def handle_city_menu():
         handle_edit_city()
     elif choice == "4":
         handle_delete_city()
+    elif choice == "5":
+        handle_import_cities()
     elif choice == "0":
         return
     else:
@@ -175,8 +182,14 @@ def main():
                 handle_import_data()
             elif choice == "9":
                 handle_show_statistics()
+            elif choice.upper() == "B":
+                handle_border_routes()
             elif choice.upper() == "C" and is_super_user:
                 handle_city_menu()
+            elif choice.upper() == "V" and is_super_user:
+                handle_verify_statistics()
+            elif choice.upper() == "H" and is_super_user:
+                handle_history()
             elif choice == "0":
                 print("\nGoodbye!")
                 break
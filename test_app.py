@@ -5,7 +5,9 @@ Verifies CRUD operations, Import, Analytics, and PDF generation.
 import os
 import sys
 import json
+import tempfile
 import unittest
+from unittest import mock
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -20,8 +22,43 @@ from components import (
     search_countries,
     generate_pdf,
 )
-from components.importer_component import parse_source_file
-from components.analytics_component import get_general_stats, get_currency_stats
+from components.data_handler import CountryRepository, migrate_json_to_sqlite
+from components.sqlite_component import SQLiteCountryRepository
+from components.transaction_component import TransactionError
+from components.index_component import CountryIndex
+from components.search_index import FieldIndex, SearchIndex, fold_text
+from components.fuzzy_component import BKTree, FuzzyIndex, levenshtein
+from components.query_component import QuerySyntaxError, parse_query
+from components.cache_component import ResultCache
+from components.phone_component import PhoneTrie, lookup_numbers_file, parse_phone_prefixes
+from components.postal_component import PostalValidator, regex_profile, validate_postal_csv
+from components.language_component import LanguageIndex, parse_languages
+from components.columnar_component import ColumnarTable
+from components.aggregate_component import AggregateStore
+from components.graph_component import BorderGraph
+from components.snapshot_component import SnapshotStore, _digest as snapshot_digest
+from country_types import CountryRecord, validate_country_unique
+from components.importer_component import (
+    import_geonames_cities,
+    incremental_import,
+    iter_source_records,
+    parse_source_file,
+)
+from components.analytics_component import (
+    CrossTab,
+    DistinctCount,
+    LengthDistribution,
+    Metric,
+    NumericSummary,
+    Ratio,
+    RowCount,
+    WeightedMean,
+    TopValues,
+    export_report,
+    get_currency_stats,
+    get_general_stats,
+    run_metrics,
+)
 
 # Backup original data file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -112,5 +149,1356 @@ class TestCountryManager(unittest.TestCase):
         self.assertIsNone(c)
         print("\n[OK] Deleted Country 'Testland'")
 
+
+class TestCountryRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.tmpdir.name, "dados.json")
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"countries": [
+                {"iso": "AD", "iso3": "AND", "country": "Andorra", "cities": ["Andorra la Vella"]},
+                {"iso": "FR", "iso3": "FRA", "country": "France", "cities": ["Paris", "Lyon"]},
+            ]}, f)
+        self.repo = CountryRepository(self.data_file)
+        self.reads = 0
+        original_read = self.repo._read_file
+
+        def counting_read():
+            self.reads += 1
+            return original_read()
+
+        self.repo._read_file = counting_read
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookups_parse_file_once(self):
+        for _ in range(100):
+            self.assertEqual(self.repo.get("fr")["country"], "France")
+        self.repo.load_all()
+        self.assertEqual(self.reads, 1)
+
+    def test_own_writes_do_not_trigger_reload(self):
+        success, msg = self.repo.update("FR", {"cities": ["Paris", "Lyon", "Nice"]})
+        self.assertTrue(success, msg)
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon", "Nice"])
+        self.assertEqual(self.reads, 1)
+
+    def test_external_change_triggers_reload(self):
+        self.repo.get("AD")
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"countries": [{"iso": "PT", "iso3": "PRT", "country": "Portugal"}]}, f)
+        self.assertIsNone(self.repo.get("AD"))
+        self.assertIsNotNone(self.repo.get("PT"))
+        self.assertEqual(self.reads, 2)
+
+    def test_returned_records_are_copies(self):
+        country = self.repo.get("FR")
+        country["cities"].append("Marseille")
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon"])
+
+    def test_index_tracks_mutations(self):
+        self.repo.add({"iso": "pt", "iso3": "PRT", "country": "Portugal"})
+        self.assertIs(self.repo.index.get_by_iso3("prt"), self.repo.index.get_by_iso("PT"))
+        self.repo.update("PT", {"country": "Portuguese Republic"})
+        self.assertIsNone(self.repo.index.get_by_name("portugal"))
+        self.assertIsNotNone(self.repo.index.get_by_name("PORTUGUESE REPUBLIC"))
+        self.repo.delete("PT")
+        self.assertIsNone(self.repo.index.get_by_iso3("PRT"))
+        self.assertEqual([c["iso"] for c in self.repo.load_all()], ["AD", "FR"])
+
+    def test_batch_commits_with_single_write(self):
+        writes = []
+        original_flush = self.repo._flush
+        self.repo._flush = lambda: writes.append(1) or original_flush()
+        with self.repo.batch() as tx:
+            for i in range(500):
+                tx.add_city("FR", f"City {i}")
+            tx.rename_city("FR", 0, "Paname")
+            tx.delete_city("AD", 0)
+            tx.add({"iso": "PT", "iso3": "PRT", "country": "Portugal"})
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(len(self.repo.get("FR")["cities"]), 502)
+        self.assertEqual(self.repo.get("FR")["cities"][0], "Paname")
+        self.assertEqual(self.repo.get("AD")["cities"], [])
+        self.assertEqual(CountryRepository(self.data_file).get("PT")["country"], "Portugal")
+
+    def test_batch_rolls_back_on_invalid_change(self):
+        with self.assertRaises(TransactionError):
+            with self.repo.batch() as tx:
+                tx.add_city("FR", "Nice")
+                tx.add({"iso": "XX", "iso3": "YYY", "country": "france"})
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon"])
+        self.assertIsNone(self.repo.get("XX"))
+
+    def test_batch_validates_against_staged_changes(self):
+        with self.repo.batch() as tx:
+            tx.update("FR", {"country": "French Republic"})
+            # The old name is free once the staged rename commits
+            tx.add({"iso": "XF", "iso3": "XFR", "country": "France"})
+            with self.assertRaises(TransactionError):
+                tx.add({"iso": "XG", "iso3": "XGR", "country": "french republic"})
+            with self.assertRaises(TransactionError):
+                tx.add_city("FR", "paris")
+        self.assertEqual(self.repo.index.get_by_name("france")["iso"], "XF")
+
+    def test_city_operations(self):
+        self.assertTrue(self.repo.add_city("FR", "Nice")[0])
+        self.assertFalse(self.repo.add_city("FR", "NICE")[0])
+        self.assertFalse(self.repo.rename_city("FR", 0, "lyon")[0])
+        self.assertTrue(self.repo.rename_city("FR", 2, "Nizza")[0])
+        self.assertTrue(self.repo.delete_city("FR", 0)[0])
+        self.assertEqual(self.repo.get("FR")["cities"], ["Lyon", "Nizza"])
+        self.assertFalse(self.repo.delete_city("FR", 5)[0])
+
+
+class TestChangeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.tmpdir.name, "dados.json")
+        self.journal_file = os.path.join(self.tmpdir.name, "dados.journal.jsonl")
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"countries": [{"iso": "FR", "iso3": "FRA", "country": "France", "cities": []}]}, f)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_repo(self, **kwargs):
+        kwargs.setdefault("background_compaction", False)
+        return CountryRepository(self.data_file, journal_file=self.journal_file, use_journal=True, **kwargs)
+
+    def test_mutations_append_instead_of_rewriting(self):
+        with open(self.data_file, 'rb') as f:
+            snapshot = f.read()
+        repo = self.make_repo()
+        repo.add({"iso": "PT", "iso3": "PRT", "country": "Portugal"})
+        repo.update("FR", {"cities": ["Paris"]})
+        repo.delete("PT")
+        with open(self.data_file, 'rb') as f:
+            self.assertEqual(f.read(), snapshot)
+        with open(self.journal_file, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["op"] for e in entries], ["add", "update", "delete"])
+        self.assertEqual((entries[1]["fields"], entries[1]["splices"]), ({}, {"cities": [0, 0, ["Paris"]]}))
+
+        # A fresh process replays the journal on top of the snapshot
+        fresh = self.make_repo()
+        self.assertEqual(fresh.get("FR")["cities"], ["Paris"])
+        self.assertIsNone(fresh.get("PT"))
+
+    def test_city_changes_are_journaled_as_splices(self):
+        repo = self.make_repo()
+        repo.update("FR", {"cities": [f"City {i}" for i in range(200)], "capital": "Paris"})
+        repo.add_city("FR", "Lyon")
+        repo.rename_city("FR", 5, "Nice")
+        repo.delete_city("FR", 0)
+        with open(self.journal_file, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["splices"]["cities"] for e in entries[1:]],
+                         [[200, 0, ["Lyon"]], [5, 1, ["Nice"]], [0, 1, []]])
+        self.assertEqual(entries[0]["fields"], {"capital": "Paris"})
+
+        fresh = self.make_repo()
+        self.assertEqual(fresh.get("FR"), repo.get("FR"))
+        self.assertEqual(fresh.get("FR")["cities"][:5], ["City 1", "City 2", "City 3", "City 4", "Nice"])
+        self.assertEqual(fresh.verify_aggregates(), [])
+
+    def test_background_compaction_never_overwrites_newer_save(self):
+        import threading
+        repo = self.make_repo(compact_max_ops=1, background_compaction=True)
+        started, proceed = threading.Event(), threading.Event()
+        write_snapshot = repo._write_snapshot
+
+        def slow_write(*args):
+            if threading.current_thread() is repo._compactor:
+                started.set()
+                proceed.wait(5)
+            return write_snapshot(*args)
+
+        repo._write_snapshot = slow_write
+        repo.add({"iso": "PT", "iso3": "PRT", "country": "Portugal"})
+        self.assertTrue(started.wait(5))
+        self.assertTrue(repo.save_all([{"iso": "ES", "iso3": "ESP", "country": "Spain"}]))
+        proceed.set()
+        repo.wait_for_compaction()
+
+        fresh = self.make_repo()
+        self.assertEqual([c["iso"] for c in fresh.load_all()], ["ES"])
+        self.assertEqual([c["iso"] for c in repo.load_all()], ["ES"])
+        self.assertEqual([n for n in os.listdir(self.tmpdir.name) if n.endswith(".tmp")], [])
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        repo = self.make_repo(compact_max_ops=3)
+        for i in range(3):
+            repo.update("FR", {"phone": str(i)})
+        self.assertFalse(os.path.exists(self.journal_file))
+        with open(self.data_file, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data["countries"][0]["phone"], "2")
+        self.assertEqual(data["journal_seq"], 3)
+
+        repo.update("FR", {"phone": "33"})
+        self.assertEqual(self.make_repo().get("FR")["phone"], "33")
+
+    def test_background_compaction(self):
+        repo = self.make_repo(compact_max_ops=2, background_compaction=True)
+        repo.update("FR", {"phone": "1"})
+        repo.update("FR", {"phone": "2"})
+        repo.wait_for_compaction()
+        self.assertEqual(self.make_repo().get("FR")["phone"], "2")
+
+    def test_torn_journal_line_is_ignored(self):
+        repo = self.make_repo()
+        repo.update("FR", {"phone": "33"})
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 2, "op": "upd')
+        self.assertEqual(self.make_repo().get("FR")["phone"], "33")
+        self.make_repo().update("FR", {"phone": "34"})
+        self.assertEqual(self.make_repo().get("FR")["phone"], "34")
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.tmpdir.name, "dados.json")
+        self.db_file = os.path.join(self.tmpdir.name, "dados.db")
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"countries": [
+                {"iso": "FR", "iso3": "FRA", "country": "France", "currency_code": "EUR",
+                 "languages": "fr-FR,frp,br", "cities": ["Paris", "Lyon"]},
+                {"iso": "TR", "iso3": "TUR", "country": "Türkiye", "currency_code": "TRY",
+                 "languages": "tr-TR", "cities": ["Istanbul"], "capital": "Ankara"},
+            ]}, f)
+        success, msg = migrate_json_to_sqlite(self.data_file, self.db_file)
+        self.assertTrue(success, msg)
+        self.repo = SQLiteCountryRepository(self.db_file)
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def test_typed_columns_round_trip(self):
+        country = {"iso": "AD", "iso3": "AND", "country": "Andorra", "iso_numeric": 20, "area": 468.0,
+                   "population": 77006, "continent": "EU", "neighbours": ["ES", "FR"], "cities": []}
+        self.assertTrue(self.repo.add(country)[0])
+        self.assertEqual(self.repo.get("AD"), country)
+        self.assertEqual(self.repo.load_all()[1]["capital"], "Ankara")
+
+    def test_update_with_none_clears_numeric_fields(self):
+        self.assertTrue(self.repo.update("FR", {"area": 547030.0, "population": 64768389})[0])
+        journal_file = os.path.join(self.tmpdir.name, "dados.journal.jsonl")
+        json_repo = CountryRepository(self.data_file, journal_file=journal_file, use_journal=True,
+                                      background_compaction=False)
+        json_repo.update("FR", {"area": 547030.0, "population": 64768389})
+        for repo in (self.repo, json_repo):
+            self.assertTrue(repo.update("FR", {"area": None, "capital": "Paris"})[0])
+            self.assertIsNone(repo.get("FR").get("area"))
+            self.assertEqual(repo.get("FR")["population"], 64768389)
+        # Replayed from the journal
+        reloaded = CountryRepository(self.data_file, journal_file=journal_file, use_journal=True,
+                                     background_compaction=False)
+        self.assertIsNone(reloaded.get("FR").get("area"))
+        self.assertEqual(reloaded.get("FR")["capital"], "Paris")
+
+    def test_migration_round_trips_records(self):
+        json_repo = CountryRepository(self.data_file)
+        self.assertEqual(self.repo.load_all(), json_repo.load_all())
+        success, _ = migrate_json_to_sqlite(self.data_file, self.db_file)
+        self.assertFalse(success)
+
+    def test_crud_contract(self):
+        success, msg = self.repo.add({"iso": "pt", "iso3": "PRT", "country": "Portugal", "cities": ["Porto"]})
+        self.assertTrue(success, msg)
+        self.assertFalse(self.repo.add({"iso": "PT", "iso3": "XXX", "country": "X"})[0])
+        self.assertTrue(self.repo.update("PT", {"cities": ["Porto", "Lisbon"]})[0])
+        self.assertEqual(self.repo.get("pt")["cities"], ["Porto", "Lisbon"])
+        self.assertEqual([c["iso"] for c in self.repo.load_all()], ["FR", "TR", "PT"])
+        self.assertTrue(self.repo.delete("PT")[0])
+        self.assertIsNone(self.repo.get("PT"))
+        self.assertEqual(self.repo._conn.execute("SELECT COUNT(*) FROM cities").fetchone()[0], 3)
+
+    def test_filters_match_json_backend(self):
+        json_repo = CountryRepository(self.data_file)
+        for field, value in [("currency_code", "eur"), ("languages", "TR"), ("cities", "ist"), ("country", "TÜRK")]:
+            self.assertEqual(self.repo.filter_by_field(field, value), json_repo.filter_by_field(field, value))
+        self.assertEqual(self.repo.search("lyon"), json_repo.search("lyon"))
+        self.assertFalse(self.repo.index.find_conflict({"iso": "XX", "iso3": "XXX", "country": "france"})[0])
+
+    def test_batch_and_city_operations(self):
+        with self.repo.batch() as tx:
+            tx.add_city("FR", "Nice")
+            tx.rename_city("TR", 0, "Constantinople")
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon", "Nice"])
+        self.assertEqual(self.repo.get("TR")["cities"], ["Constantinople"])
+        self.assertFalse(self.repo.add_city("FR", "nice")[0])
+        self.assertTrue(self.repo.delete_city("FR", 0)[0])
+        self.assertEqual(self.repo.get("FR")["cities"], ["Lyon", "Nice"])
+
+    def test_city_changes_touch_only_spliced_rows(self):
+        conn = self.repo._conn
+        conn.execute("CREATE TEMP TABLE touched (op TEXT, position INTEGER)")
+        for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            conn.execute(f"CREATE TEMP TRIGGER city_{op.lower()} AFTER {op} ON main.cities "
+                         f"BEGIN INSERT INTO touched VALUES ('{op}', {row}.position); END")
+        with self.repo.batch() as tx:
+            tx.add_city("FR", "Nice")
+            tx.add_city("FR", "Lille")
+        self.assertTrue(self.repo.rename_city("FR", 1, "Lyon 2e")[0])
+        self.assertEqual(conn.execute("SELECT op, position FROM touched ORDER BY rowid").fetchall(),
+                         [("INSERT", 2), ("INSERT", 3), ("UPDATE", 1)])
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon 2e", "Nice", "Lille"])
+
+
+class TestSourceParser(unittest.TestCase):
+
+    def test_iter_source_records_is_lazy_with_line_numbers(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "countryInfo.txt")
+            row = ["AD", "AND", "020", "AN", "Andorra", "Andorra la Vella", "468", "77006", "EU",
+                   ".ad", "EUR", "Euro", "376", "AD###", "^(?:AD)*(\\d{3})$", "ca", "3041565", "ES,FR", ""]
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("# comment\n")
+                f.write("\t".join(row) + "\n")
+                f.write("XX\tXXX\n")
+            records = iter_source_records(path)
+            self.assertFalse(isinstance(records, list))
+            line_no, country, error = next(records)
+            self.assertEqual((line_no, country["iso"], country["geonameid"], error), (2, "AD", "3041565", None))
+            self.assertEqual(country["cities"], [])
+            self.assertEqual(next(records), (3, None, "Line 3: Insufficient columns"))
+            self.assertEqual(list(records), [])
+
+    def test_typed_columns(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "countryInfo.txt")
+            row = ["AD", "AND", "020", "AN", "Andorra", "Andorra la Vella", "468", "77006", "EU",
+                   ".ad", "EUR", "Euro", "376", "AD###", "^(?:AD)*(\\d{3})$", "ca", "3041565", "ES,FR"]
+            bad = ["XK", "XKX", "0", "KV", "Kosovo", "Pristina", "10908", "many", "EU"] + [""] * 9
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("\t".join(row) + "\n")
+                f.write("\t".join(bad) + "\n")
+            countries, errors = parse_source_file(path)
+        self.assertEqual(errors, ["Line 2: Invalid population 'many'"])
+        andorra = countries[0]
+        self.assertEqual(
+            [andorra[k] for k in ("iso_numeric", "capital", "area", "population", "continent", "neighbours")],
+            [20, "Andorra la Vella", 468.0, 77006, "EU", ["ES", "FR"]],
+        )
+
+
+class TestGeoNamesCitiesImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.tmpdir.name, "dados.json")
+        self.cities_file = os.path.join(self.tmpdir.name, "cities.txt")
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"countries": [
+                {"iso": "FR", "iso3": "FRA", "country": "France", "cities": ["Paris"]},
+                {"iso": "AD", "iso3": "AND", "country": "Andorra", "cities": []},
+            ]}, f)
+        rows = [
+            ("Paris", "FR", 2138551), ("Lyon", "FR", 513275), ("Nice", "FR", 342669),
+            ("Tiny", "FR", 120), ("Andorra la Vella", "AD", 20430), ("Berlin", "DE", 3426354),
+        ]
+        with open(self.cities_file, 'w', encoding='utf-8') as f:
+            for i, (name, cc, pop) in enumerate(rows):
+                cols = [str(i), name, name, "", "0", "0", "P", "PPLA", cc, "", "", "", "", "", str(pop), "", "", "", ""]
+                f.write("\t".join(cols) + "\n")
+        self.repo = CountryRepository(self.data_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_import_in_chunks(self):
+        stats = import_geonames_cities(self.repo, self.cities_file, min_population=1000, chunk_size=2)
+        self.assertEqual(stats["rows"], 6)
+        self.assertEqual(stats["added"], 3)
+        self.assertEqual(stats["duplicates"], 1)
+        self.assertEqual(stats["below_threshold"], 1)
+        self.assertEqual(stats["unknown_country"], 1)
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon", "Nice"])
+        self.assertEqual(self.repo.get("AD")["cities"], ["Andorra la Vella"])
+
+    def test_plain_json_backend_writes_once(self):
+        flushes = []
+        flush = self.repo._flush
+        self.repo._flush = lambda: flushes.append(1) or flush()
+        import_geonames_cities(self.repo, self.cities_file, min_population=1000, chunk_size=1)
+        self.assertEqual(len(flushes), 1)
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon", "Nice"])
+
+    def test_import_top_n_per_country(self):
+        import_geonames_cities(self.repo, self.cities_file, top_n=2)
+        self.assertEqual(self.repo.get("FR")["cities"], ["Paris", "Lyon"])
+
+
+class TestIncrementalImport(unittest.TestCase):
+
+    ROW = ["AD", "AND", "020", "AN", "Andorra", "Andorra la Vella", "468", "77006", "EU",
+           ".ad", "EUR", "Euro", "376", "AD###", "", "ca", "3041565", "ES,FR", ""]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.tmpdir.name, "dados.json")
+        self.source = os.path.join(self.tmpdir.name, "countryInfo.txt")
+        self.state = os.path.join(self.tmpdir.name, "import_state.json")
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"countries": [
+                {"iso": "AD", "iso3": "AND", "country": "Andorra", "cities": ["Encamp"]},
+            ]}, f)
+        self.repo = CountryRepository(self.data_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_source(self, rows):
+        with open(self.source, 'w', encoding='utf-8') as f:
+            f.write("#ISO\tISO3\n")
+            for row in rows:
+                f.write("\t".join(row) + "\n")
+
+    def run_import(self, **kwargs):
+        return incremental_import(self.repo, self.source, self.state, **kwargs)
+
+    def test_refresh_reports_and_upserts_changes(self):
+        fr = ["FR", "FRA", "250", "FR", "France"] + self.ROW[5:]
+        self.write_source([self.ROW, fr])
+        stats = self.run_import()
+        self.assertEqual((stats["added"], stats["updated"]), (1, 1))
+        self.assertEqual(self.repo.get("AD")["currency_code"], "EUR")
+        self.assertEqual(self.repo.get("AD")["cities"], ["Encamp"])
+
+        # Untouched file: skipped from its stat alone
+        self.assertEqual(self.run_import()["source_unchanged"], 1)
+
+        changed = list(self.ROW)
+        changed[10] = "ADP"
+        self.write_source([changed])
+        os.utime(self.source, ns=(1, 1))
+        stats = self.run_import()
+        self.assertEqual((stats["added"], stats["updated"], stats["unchanged"], stats["removed"]), (0, 1, 0, 1))
+        self.assertEqual(self.repo.get("AD")["currency_code"], "ADP")
+        self.assertIsNotNone(self.repo.get("FR"))
+
+    def test_refresh_restores_countries_changed_in_the_repository(self):
+        fr = ["FR", "FRA", "250", "FR", "France"] + self.ROW[5:]
+        self.write_source([self.ROW, fr])
+        self.run_import()
+        self.assertTrue(self.repo.delete("FR")[0])
+        self.assertTrue(self.repo.update("AD", {"currency_code": "XXX"})[0])
+
+        # Source untouched, but the repository no longer matches it
+        stats = self.run_import()
+        self.assertEqual((stats["source_unchanged"], stats["added"], stats["updated"]), (0, 1, 1))
+        self.assertEqual(self.repo.get("FR")["country"], "France")
+        self.assertEqual(self.repo.get("AD")["currency_code"], "EUR")
+        self.assertEqual(self.run_import()["source_unchanged"], 1)
+
+        # Same state, different source file: not skipped
+        other = os.path.join(self.tmpdir.name, "other.txt")
+        os.rename(self.source, other)
+        stats = incremental_import(self.repo, other, self.state)
+        self.assertEqual((stats["source_unchanged"], stats["unchanged"]), (0, 2))
+
+    def test_bad_row_never_deletes_its_country(self):
+        fr = ["FR", "FRA", "250", "FR", "France"] + self.ROW[5:]
+        self.write_source([self.ROW, fr])
+        self.run_import()
+        broken = list(fr)
+        broken[6] = "abc"
+        self.write_source([self.ROW, broken])
+        os.utime(self.source, ns=(1, 1))
+        stats = self.run_import(remove_missing=True)
+        self.assertEqual((stats["errors"], stats["removed"]), (1, 0))
+        self.assertEqual(self.repo.get("FR")["area"], 468.0)
+
+        # Fixed again: re-parsed, not skipped as unchanged
+        broken[6] = "551500"
+        self.write_source([self.ROW, broken])
+        os.utime(self.source, ns=(2, 2))
+        stats = self.run_import(remove_missing=True)
+        self.assertEqual((stats["updated"], stats["removed"]), (1, 0))
+        self.assertEqual(self.repo.get("FR")["area"], 551500.0)
+
+    def test_unchanged_rows_are_not_parsed(self):
+        self.write_source([self.ROW])
+        self.run_import()
+        os.utime(self.source, ns=(1, 1))
+        import components.importer_component as importer
+        original = importer._parse_source_line
+        calls = []
+        importer._parse_source_line = lambda *a: calls.append(a) or original(*a)
+        try:
+            stats = self.run_import()
+        finally:
+            importer._parse_source_line = original
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertEqual(calls, [])
+
+    def test_remove_missing(self):
+        self.write_source([self.ROW])
+        self.run_import()
+        self.write_source([])
+        os.utime(self.source, ns=(1, 1))
+        stats = self.run_import(remove_missing=True)
+        self.assertEqual(stats["removed"], 1)
+        self.assertIsNone(self.repo.get("AD"))
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.countries = CountryRepository(DATA_FILE).load_all()
+        cls.index = SearchIndex(cls.countries)
+
+    def test_matches_full_scan(self):
+        def by_field(countries):
+            # The index matches each city separately rather than the list's repr
+            return [c["iso"] for c in countries]
+        for query in ["a", "an", "Ist", "eur", "ÜRK", ".tr", "zzz", "1-8", "de-"]:
+            scan = [c for c in self.countries if any(
+                fold_text(query) in fold_text(str(v))
+                for v in list(c.values()) + c.get("cities", [])
+                if not isinstance(v, list)
+            )]
+            self.assertEqual(by_field(self.index.search(query)), by_field(scan), query)
+
+    def test_prefix_and_regex(self):
+        self.assertEqual([c["iso"] for c in self.index.search_prefix("ist")], ["TR"])
+        self.assertNotIn("TR", [c["iso"] for c in self.index.search_prefix("stan")])
+        self.assertEqual([c["iso"] for c in search_countries(self.countries, "^T.rkiye$", regex=True)], ["TR"])
+
+    def test_field_index_matches_filter_scan(self):
+        field_index = FieldIndex(self.countries)
+        for field, value in [("currency_code", "eur"), ("languages", "en"), ("country", "IA"),
+                             ("cities", "an"), ("phone", "1-"), ("tld", ".")]:
+            expected = [c["iso"] for c in self.countries if any(
+                fold_text(value) in fold_text(v) for v in
+                (c.get(field) if isinstance(c.get(field), list) else [str(c.get(field, ""))])
+            )]
+            self.assertEqual([c["iso"] for c in field_index.filter(field, value)], expected, field)
+        stats = {s["field"]: s for s in field_index.stats()}
+        self.assertEqual(stats["currency_code"]["distinct_values"], len({c["currency_code"].lower() for c in self.countries}))
+        self.assertGreaterEqual(stats["cities"]["build_ms"], 0)
+
+    def test_repository_rebuilds_per_version(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_file = os.path.join(tmpdir, "dados.json")
+            repo = CountryRepository(data_file)
+            repo.save_all([{"iso": "FR", "iso3": "FRA", "country": "France", "cities": ["Paris"]}])
+            self.assertEqual(repo.search("lyon"), [])
+            self.assertIs(repo.derived("search", SearchIndex), repo.derived("search", SearchIndex))
+            repo.add_city("FR", "Lyon")
+            self.assertEqual([c["iso"] for c in repo.search("lyon")], ["FR"])
+
+
+class TestFuzzySearch(unittest.TestCase):
+
+    def test_levenshtein_with_cutoff(self):
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("kitten", "sitting", max_distance=1), 2)
+
+    def test_bk_tree_matches_brute_force(self):
+        words = ["germany", "armenia", "romania", "oman", "roman", "spain", "japan", "panama"]
+        tree = BKTree()
+        for word in words:
+            tree.add(word)
+        found, complete = tree.search("romnia", 2)
+        self.assertTrue(complete)
+        expected = sorted((levenshtein("romnia", w), w) for w in words if levenshtein("romnia", w) <= 2)
+        self.assertEqual(sorted(found), expected)
+
+    def test_accents_typos_and_ranking(self):
+        index = FuzzyIndex([
+            {"iso": "BR", "country": "Brazil", "cities": ["São Paulo", "Brasília"]},
+            {"iso": "ST", "country": "São Tomé and Príncipe", "cities": []},
+            {"iso": "DE", "country": "Germany", "cities": ["Berlin"]},
+        ])
+        matches, _ = index.search("sao paulo", max_distance=0)
+        self.assertEqual(matches, [{"iso": "BR", "kind": "city", "name": "São Paulo", "distance": 0}])
+        matches, _ = index.search("Brasil")
+        self.assertEqual([m["name"] for m in matches], ["Brazil", "Brasília"])
+        matches, _ = index.search("germny", max_distance=1)
+        self.assertEqual([(m["iso"], m["distance"]) for m in matches], [("DE", 1)])
+
+    def test_repository_fuzzy_search(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = CountryRepository(os.path.join(tmpdir, "dados.json"))
+            repo.save_all([{"iso": "FR", "iso3": "FRA", "country": "France", "cities": ["Paris"]}])
+            self.assertEqual(repo.fuzzy_search("Lyonn")[0], [])
+            repo.add_city("FR", "Lyon")
+            self.assertEqual([m["name"] for m in repo.fuzzy_search("Lyonn")[0]], ["Lyon"])
+            sqlite_repo = SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))
+            sqlite_repo.save_all(repo.load_all())
+            self.assertEqual([m["iso"] for m in sqlite_repo.fuzzy_search("Frnace")[0]], ["FR"])
+            sqlite_repo.add_city("FR", "Nice")
+            self.assertEqual([m["name"] for m in sqlite_repo.fuzzy_search("nise")[0]], ["Nice"])
+            sqlite_repo.close()
+
+
+class TestQueryLanguage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.countries = CountryRepository(DATA_FILE).load_all()
+        cls.index = FieldIndex(cls.countries)
+
+    def run_query(self, text):
+        return [c["iso"] for c in parse_query(text).execute(self.index)]
+
+    def test_matches_scan(self):
+        expected = [c["iso"] for c in self.countries
+                    if c["currency_code"] == "EUR" and "fr" in c["languages"].lower()
+                    and c["iso"] != "FR"]
+        self.assertEqual(self.run_query("currency_code=EUR and languages~fr and not iso=FR"), expected)
+        expected = [c["iso"] for c in self.countries
+                    if c["phone"].startswith("+1") or "en" in c["languages"].split(",")]
+        self.assertEqual(self.run_query("phone^=+1 or languages:en"), expected)
+
+    def test_membership_is_exact(self):
+        self.assertEqual(self.run_query('cities:"Istanbul"'), ["TR"])
+        self.assertEqual(self.run_query('cities:"Istan"'), [])
+        self.assertEqual(self.run_query("languages:de and (iso=DE or iso=TR)"), ["DE"])
+
+    def test_sort_limit_and_explain(self):
+        found = self.run_query("currency_code=EUR sort country desc limit 3")
+        expected = sorted((c for c in self.countries if c["currency_code"] == "EUR"),
+                          key=lambda c: c["country"].casefold(), reverse=True)[:3]
+        self.assertEqual(found, [c["iso"] for c in expected])
+        self.assertEqual(len(self.run_query("limit 2")), 2)
+
+        plan = parse_query("languages~fr and currency_code=EUR").explain(self.index)
+        self.assertTrue(plan[0].startswith('INDEX currency_code = "EUR"'))
+        self.assertTrue(parse_query("not iso=FR").explain(self.index)[0].startswith("SCAN"))
+
+    def test_sqlite_runs_queries_in_sql(self):
+        queries = ["currency_code=EUR and languages~fr and not iso=FR", "phone^=+1 or languages:en",
+                   'cities:"Istanbul"', "cities^=lyo or neighbours=FR", "neighbours~S sort country desc limit 4",
+                   "not (continent=EU or continent=AS) limit 3", "sort iso limit 2"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))
+            repo.save_all(self.countries)
+            for text in queries:
+                self.assertEqual([c["iso"] for c in repo.query(text)], self.run_query(text), text)
+            self.assertTrue(repo.explain("iso=FR")[0].startswith("SQL WHERE"))
+            self.assertEqual(repo.fuzzy_search("Frnace")[0][0]["iso"], "FR")
+            self.assertEqual([c["iso"] for c in repo.filter_by_field("languages", "-BE")], ["BE"])
+            # None of these built the in-memory copy of every record
+            self.assertNotIn("records", repo._derived)
+            repo.close()
+
+    def test_numeric_comparisons(self):
+        countries = [
+            {"iso": "FR", "area": 547030.0, "population": 64768389, "continent": "EU"},
+            {"iso": "LU", "area": 2586.0, "population": 497538, "continent": "EU"},
+            {"iso": "XX", "continent": "EU"},
+            {"iso": "US", "area": 9629091.0, "population": 310232863, "continent": "NA"},
+        ]
+        index = FieldIndex(countries)
+        run = lambda text: [c["iso"] for c in parse_query(text).execute(index)]
+        self.assertEqual(run("population>=1000000 and continent=EU"), ["FR"])
+        self.assertEqual(run("area=2586"), ["LU"])
+        self.assertEqual(run("not population<1000000"), ["FR", "XX", "US"])
+        # Numeric order ("9629091" < "2586" as text), missing values last both ways
+        self.assertEqual(run("sort area"), ["LU", "FR", "US", "XX"])
+        self.assertEqual(run("sort area desc limit 3"), ["US", "FR", "LU"])
+        self.assertEqual(run("sort population desc"), ["US", "FR", "LU", "XX"])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))
+            repo.save_all(countries)
+            for text in ["population>=1000000 and continent=EU", "not population<1000000",
+                         "area>2586 or iso=XX sort area desc"]:
+                self.assertEqual([c["iso"] for c in repo.query(text)], run(text), text)
+            repo.close()
+
+    def test_syntax_errors(self):
+        for text in ["population~5", "population<x", "iso<FR", "iso=", "iso=FR and", "(iso=FR",
+                     "iso FR", "limit x"]:
+            with self.assertRaises(QuerySyntaxError, msg=text):
+                parse_query(text)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_lru_counters(self):
+        cache = ResultCache(maxsize=2)
+        calls = []
+        compute = lambda name: (lambda: calls.append(name) or name.upper())
+        self.assertEqual(cache.get_or_compute("op", "a", 1, compute("a")), "A")
+        self.assertEqual(cache.get_or_compute("op", "a", 1, compute("a")), "A")
+        cache.get_or_compute("op", "b", 1, compute("b"))
+        cache.get_or_compute("op", "a", 1, compute("a"))  # a becomes most recent
+        cache.get_or_compute("op", "c", 1, compute("c"))  # evicts b
+        cache.get_or_compute("op", "a", 1, compute("a"))
+        self.assertEqual(calls, ["a", "b", "c"])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["size"]), (3, 3, 1, 2))
+        cache.get_or_compute("op", "a", 2, compute("a"))  # new version drops old entries
+        self.assertEqual(calls, ["a", "b", "c", "a"])
+        self.assertEqual((cache.stats()["invalidations"], cache.stats()["size"]), (1, 1))
+
+    def test_repository_results_follow_writes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repos = [CountryRepository(os.path.join(tmpdir, "dados.json")),
+                     SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))]
+            for repo in repos:
+                repo.save_all([{"iso": "FR", "iso3": "FRA", "country": "France", "cities": ["Paris"]}])
+                self.assertEqual([c["iso"] for c in repo.search("Par")], ["FR"])
+                result = repo.search("par")
+                self.assertEqual(repo.cache_stats()["hits"], 1)
+                result[0]["cities"].append("Mutated")
+                self.assertEqual(repo.search("par")[0]["cities"], ["Paris"])
+                self.assertEqual(repo.filter_by_city("lyon"), [])
+                repo.add_city("FR", "Lyon")
+                self.assertEqual([c["iso"] for c in repo.filter_by_city("lyon")], ["FR"])
+                repo.add({"iso": "DE", "iso3": "DEU", "country": "Germany", "cities": []})
+                self.assertEqual([c["iso"] for c in repo.sorted_by("country", descending=True)], ["DE", "FR"])
+            repos[1].close()
+
+
+class TestCityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CountryIndex([
+            {"iso": "US", "country": "United States", "cities": ["Springfield", "Boston", "Spring Hill"]},
+            {"iso": "FR", "country": "France", "cities": ["Paris", "Lyon"]},
+            {"iso": "TT", "country": "Trinidad", "cities": ["Port of Spain"]},
+        ])
+
+    def isos(self, city, match):
+        return [c["iso"] for c in self.index.countries_with_city(city, match)]
+
+    def test_lookups(self):
+        self.assertEqual(self.index.cities.exact("SPRINGFIELD"), {("US", 0)})
+        self.assertEqual(self.isos("spring", "prefix"), ["US"])
+        self.assertEqual(self.isos("in", "substring"), ["US", "TT"])
+        self.assertEqual(self.isos("spring", "exact"), [])
+        self.assertTrue(self.index.has_city("us", "boston"))
+        self.assertFalse(self.index.has_city("us", "Boston", exclude_position=1))
+
+    def test_maintained_on_replace(self):
+        # Build the lazy prefix/substring structures before mutating
+        self.isos("x", "prefix")
+        self.isos("x", "substring")
+        old = self.index.get_by_iso("FR")
+        self.index.replace(old, dict(old, cities=["Lyon", "Nice"]))
+        self.assertEqual(self.index.cities.exact("Lyon"), {("FR", 0)})
+        self.assertEqual(self.index.cities.exact("Paris"), set())
+        self.assertEqual(self.isos("ni", "prefix"), ["FR"])
+        self.assertEqual(self.isos("par", "substring"), [])
+        self.index.remove(self.index.get_by_iso("US"))
+        self.assertEqual(self.isos("in", "substring"), ["TT"])
+
+    def test_repository_filter_by_city(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repos = [CountryRepository(os.path.join(tmpdir, "dados.json")),
+                     SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))]
+            for repo in repos:
+                repo.save_all(self.index.records())
+                self.assertEqual([c["iso"] for c in repo.filter_by_city("of sp")], ["TT"])
+                self.assertEqual([c["iso"] for c in repo.filter_by_field("cities", "SPRING")], ["US"])
+                self.assertEqual([c["iso"] for c in repo.filter_by_city("Lyon", match="exact")], ["FR"])
+                repo.delete_city("FR", 1)
+                self.assertEqual(repo.filter_by_city("Lyon", match="exact"), [])
+                self.assertFalse(repo.index.has_city("FR", "Lyon"))
+                repo.add_city("TT", "San Fernando")
+                self.assertEqual([c["iso"] for c in repo.filter_by_city("san", match="prefix")], ["TT"])
+                self.assertTrue(repo.index.has_city("tt", "san fernando"))
+            # Answered from the city index, not the trigram field indexes
+            self.assertNotIn("fields", repos[0]._derived)
+            repos[1].close()
+
+
+class TestPhoneTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = PhoneTrie([
+            {"iso": "US", "phone": "1"},
+            {"iso": "CA", "phone": "1"},
+            {"iso": "DO", "phone": "+1-809 and 1-829"},
+            {"iso": "GB", "phone": "44"},
+            {"iso": "GG", "phone": "+44-1481"},
+            {"iso": "AD", "phone": "376"},
+            {"iso": "AQ", "phone": ""},
+        ])
+
+    def test_parse_prefixes(self):
+        self.assertEqual(parse_phone_prefixes("+1-809 and 1-829"), ["1809", "1829"])
+        self.assertEqual(parse_phone_prefixes("376"), ["376"])
+        self.assertEqual(parse_phone_prefixes(""), [])
+
+    def test_longest_prefix(self):
+        self.assertEqual(self.trie.lookup("+1 829 555 0100"), ("1829", ["DO"]))
+        self.assertEqual(self.trie.lookup("+1 (212) 555-0100"), ("1", ["US", "CA"]))
+        self.assertEqual(self.trie.lookup("0044 1481 123456"), ("441481", ["GG"]))
+        self.assertEqual(self.trie.lookup("+44 1482 123456"), ("44", ["GB"]))
+        self.assertEqual(self.trie.lookup("+999"), ("", []))
+        self.assertEqual(self.trie.prefix_count, 6)
+
+    def test_file_lookup(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            numbers = os.path.join(tmpdir, "numbers.txt")
+            output = os.path.join(tmpdir, "out.tsv")
+            with open(numbers, "w", encoding="utf-8") as f:
+                f.write("+376 123456\n# comment\n\n+1 809 5550100\n+1 212 5550100\n+999 1\n")
+            stats = lookup_numbers_file(self.trie, numbers, output)
+            self.assertEqual((stats["numbers"], stats["matched"], stats["unmatched"], stats["ambiguous"]),
+                             (4, 3, 1, 1))
+            with open(output, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[0], "+376 123456\t376\tAD")
+            self.assertEqual(lines[3], "+999 1\t\t")
+
+
+class TestPostalValidation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.countries = CountryRepository(DATA_FILE).load_all()
+        cls.validator = PostalValidator(cls.countries)
+
+    def test_validate(self):
+        self.assertTrue(self.validator.validate("US", "94105-1234")[0])
+        self.assertTrue(self.validator.validate("ca", "k1a 0b1")[0])
+        self.assertFalse(self.validator.validate("US", "ABCDE")[0])
+        self.assertFalse(self.validator.validate("ZZ", "12345")[0])
+
+    def test_regex_profile(self):
+        self.assertEqual(regex_profile(r"^\d{5}(-\d{4})?$"), (5, 10, False, True))
+        self.assertEqual(regex_profile(r"^(\d{4}\s?[a-zA-Z]{2})$"), (6, 7, True, True))
+
+    def test_candidates_match_full_scan(self):
+        for code in ["94105", "1012 AB", "SW1A 1AA", "K1A 0B1", "AD500", "12", "X"]:
+            expected = [iso for iso, pattern in self.validator.patterns.items()
+                        if pattern is not None and pattern.fullmatch(code)]
+            self.assertEqual(self.validator.candidates(code), expected, code)
+        self.assertIn("GB", self.validator.candidates("sw1a 1aa"))
+
+    def test_csv_in_process_and_pool(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "codes.csv")
+            rejected = os.path.join(tmpdir, "rejected.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("iso,postal_code\nUS,94105\nUS,9410\nNL,1012 AB\nZZ,1\nAQ,123\n")
+            for workers in (1, 2):
+                stats = validate_postal_csv(self.validator, path, rejected, workers=workers, chunk_size=2)
+                self.assertEqual(
+                    (stats["rows"], stats["valid"], stats["invalid"], stats["unknown_country"], stats["no_rule"]),
+                    (5, 2, 1, 1, 1),
+                )
+            with open(rejected, encoding="utf-8") as f:
+                self.assertEqual(f.read().splitlines()[1:], ["US,9410,invalid format", "ZZ,1,unknown country"])
+
+
+class TestLanguageIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LanguageIndex([
+            {"iso": "AE", "languages": "ar-AE,fa,en,hi,ur"},
+            {"iso": "BD", "languages": "bn-BD,en"},
+            {"iso": "BE", "languages": "nl-BE,fr-BE,de-BE"},
+            {"iso": "US", "languages": "en-US,es-US,haw,fr"},
+            {"iso": "XX", "languages": ""},
+        ])
+
+    def isos(self, records):
+        return [c["iso"] for c in records]
+
+    def test_parse(self):
+        self.assertEqual(parse_languages(" EN-us , fa,,en-US"), [("en-US", "en", "US"), ("fa", "fa", "")])
+
+    def test_queries(self):
+        self.assertEqual(self.isos(self.index.base("en")), ["AE", "BD", "US"])
+        self.assertEqual(self.isos(self.index.exact("en")), ["AE", "BD"])
+        self.assertEqual(self.isos(self.index.find("en-us")), ["US"])
+        self.assertEqual(self.isos(self.index.find("-be")), ["BE"])
+        self.assertEqual(self.isos(self.index.find("be")), [])
+        self.assertEqual(self.isos(self.index.find("fr")), ["BE", "US"])
+
+    def test_counts(self):
+        self.assertEqual(self.index.top_tags(1), [("en", 2)])
+        self.assertEqual(dict(self.index.top_bases())["en"], 3)
+
+    def test_repository_filter_uses_tokens(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repos = [CountryRepository(os.path.join(tmpdir, "dados.json")),
+                     SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))]
+            for repo in repos:
+                repo.save_all([dict(c, country=c["iso"], iso3=c["iso"] + "X", cities=[])
+                               for c in self.index.records])
+                self.assertEqual([c["iso"] for c in repo.filter_by_field("languages", "en")], ["AE", "BD", "US"])
+                repo.update("BD", {"languages": "bn-BD"})
+                self.assertEqual([c["iso"] for c in repo.filter_by_field("languages", "en")], ["AE", "US"])
+            repos[1].close()
+
+
+class TestFoldedKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.countries = [
+            {"iso": "AX", "iso3": "ALA", "country": "Åland", "cities": ["Mariehamn"]},
+            {"iso": "CW", "iso3": "CUW", "country": "Curaçao", "cities": ["Willemstad"]},
+            {"iso": "ST", "iso3": "STP", "country": "São Tomé and Príncipe", "cities": ["São Tomé"]},
+            {"iso": "AL", "iso3": "ALB", "country": "Albania", "cities": []},
+        ]
+
+    def test_fold_text(self):
+        self.assertEqual(fold_text("São Tomé"), "sao tome")
+        self.assertEqual(fold_text("ÅLAND"), "aland")
+        self.assertEqual(fold_text("Straße"), "strasse")
+
+    def test_uniqueness_ignores_accents(self):
+        index = CountryIndex(self.countries)
+        self.assertTrue(index.is_taken("country", "sao tome and principe"))
+        self.assertFalse(validate_country_unique({"iso": "XX", "iso3": "XXX", "country": "CURACAO"}, index)[0])
+        self.assertFalse(validate_country_unique({"iso": "XX", "iso3": "XXX", "country": "aland"}, self.countries)[0])
+
+    def test_search_filter_and_sort(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repos = [CountryRepository(os.path.join(tmpdir, "dados.json")),
+                     SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))]
+            for repo in repos:
+                repo.save_all(self.countries)
+                self.assertEqual([c["iso"] for c in repo.search("curacao")], ["CW"])
+                self.assertEqual([c["iso"] for c in repo.filter_by_field("country", "SAO")], ["ST"])
+                self.assertEqual([c["iso"] for c in repo.filter_by_city("sao tome", match="exact")], ["ST"])
+                self.assertEqual([c["iso"] for c in repo.sorted_by("country")], ["AX", "AL", "CW", "ST"])
+                self.assertFalse(repo.add_city("ST", "SAO TOME")[0])
+            repos[1].close()
+
+    def test_sqlite_upgrade_recomputes_keys(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_file = os.path.join(tmpdir, "dados.db")
+            repo = SQLiteCountryRepository(db_file)
+            repo.save_all(self.countries)
+            # Simulate a database written with casefold-only keys
+            repo._conn.execute("UPDATE cities SET name_key = 'são tomé' WHERE iso = 'ST'")
+            repo._conn.execute("PRAGMA user_version = 1")
+            repo._conn.commit()
+            repo.close()
+            repo = SQLiteCountryRepository(db_file)
+            self.assertTrue(repo.index.has_city("ST", "Sao Tome"))
+            repo.close()
+
+
+class TestCompactRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            "iso": "AD", "iso3": "AND", "country": "Andorra",
+            "currency_code": "EUR", "cities": ["Andorra la Vella"], "custom": "x",
+        }
+
+    def test_behaves_like_the_dict(self):
+        record = CountryRecord(self.data)
+        self.assertEqual(record, self.data)
+        self.assertEqual(dict(record), self.data)
+        self.assertEqual(record["custom"], "x")
+        self.assertEqual(record.get("tld", ""), "")
+        self.assertNotIn("tld", record)
+        self.assertEqual(len(record), len(self.data))
+        with self.assertRaises(KeyError):
+            record["tld"]
+        with self.assertRaises(TypeError):
+            record["iso"] = "XX"
+
+    def test_values_are_interned_and_copied(self):
+        code = "".join(["E", "UR"])
+        a = CountryRecord(self.data)
+        b = CountryRecord(dict(self.data, currency_code=code))
+        self.assertIs(a["currency_code"], b["currency_code"])
+        copy = a.to_dict()
+        copy["cities"].append("Encamp")
+        self.data["cities"].append("Canillo")
+        self.assertEqual(a["cities"], ["Andorra la Vella"])
+
+    def test_repository_stores_compact_records(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = CountryRepository(os.path.join(tmpdir, "dados.json"), journal_file=None)
+            repo.save_all([self.data])
+            repo.add({"iso": "fr", "iso3": "FRA", "country": "France", "cities": []})
+            self.assertTrue(all(isinstance(c, CountryRecord) for c in repo.index.records()))
+            loaded = repo.get("AD")
+            self.assertIsInstance(loaded, dict)
+            loaded["cities"].append("Encamp")
+            self.assertEqual(repo.get("AD")["cities"], ["Andorra la Vella"])
+            repo.invalidate()
+            self.assertEqual(repo.get("AD"), self.data)
+
+
+class TestColumnarTable(unittest.TestCase):
+
+    def setUp(self):
+        self.countries = [
+            {"iso": "FR", "currency_code": "EUR", "languages": "fr-FR,frp,br", "cities": ["Paris", "Lyon"], "area": "547030"},
+            {"iso": "BE", "currency_code": "EUR", "languages": "nl-BE,fr-BE,de-BE", "cities": ["Brussels"], "area": "30510"},
+            {"iso": "CH", "currency_code": "CHF", "languages": "de-CH,fr-CH,it-CH", "cities": [], "area": "41290"},
+            {"iso": "AQ", "currency_code": "", "languages": "", "area": ""},
+        ]
+        self.table = ColumnarTable(self.countries)
+
+    def test_masks_match_list_filters(self):
+        eur = self.table.equals("currency_code", "EUR")
+        self.assertEqual([c["iso"] for c in self.table.rows(eur)], ["FR", "BE"])
+        self.assertEqual((~eur).indices(), [2, 3])
+        both = eur & self.table.equals("languages", "fr-BE")
+        self.assertEqual(both.indices(), [1])
+        self.assertEqual((both | self.table.equals("cities", "Paris")).count(), 2)
+        self.assertEqual(self.table.between("area", 40000, 600000).indices(), [0, 2])
+        self.assertEqual(self.table.equals("currency_code", "USD").count(), 0)
+
+    def test_group_counts(self):
+        self.assertEqual(self.table.group_count("currency_code"), {"EUR": 2, "CHF": 1})
+        mask = self.table.equals("currency_code", "EUR")
+        self.assertEqual(self.table.group_count("cities", mask), {"Paris": 1, "Lyon": 1, "Brussels": 1})
+        self.assertEqual(self.table.lengths("cities"), [2, 1, 0, 0])
+        self.assertEqual(
+            self.table.group_count("languages").most_common(),
+            sorted(LanguageIndex(self.countries).tag_counts.items(), key=lambda kv: -kv[1]),
+        )
+
+    def test_numeric_aggregates(self):
+        countries = [
+            {"iso": "FR", "continent": "EU", "area": 547030, "population": 66987244},
+            {"iso": "BE", "continent": "EU", "area": 30510, "population": 11422068},
+            {"iso": "JP", "continent": "AS", "area": 377835, "population": 126529100},
+            {"iso": "AQ", "continent": "AN", "area": 14000000, "population": None},
+            {"iso": "XX", "continent": "", "area": 10, "population": 5},
+        ]
+        table = ColumnarTable(countries)
+        self.assertEqual(table.summary("area")["count"], 5)
+        europe = table.summary("population", by="continent")["EU"]
+        self.assertEqual((europe["count"], europe["sum"], europe["min"]), (2, 78409312.0, 11422068.0))
+        self.assertNotIn("AN", table.summary("population", by="continent"))
+        self.assertEqual(table.percentiles("area", (0, 50, 100)), {0: 10.0, 50: 377835.0, 100: 14000000.0})
+        self.assertEqual(table.percentiles("population", (50,), by="continent")["EU"], {50: 39204656.0})
+        self.assertAlmostEqual(table.ratio("population", "area", by="continent")["EU"], 78409312 / 577540)
+        self.assertAlmostEqual(
+            table.weighted_mean("area", "population"),
+            (547030 * 66987244 + 30510 * 11422068 + 377835 * 126529100 + 10 * 5) / (66987244 + 11422068 + 126529100 + 5),
+        )
+        self.assertEqual(table.summary("area", mask=table.equals("continent", "AS"))["sum"], 377835.0)
+        with self.assertRaises(ValueError):
+            table.summary("area", by="languages")
+
+    def test_analytics_accept_table_or_list(self):
+        self.assertEqual(get_currency_stats(self.table), get_currency_stats(self.countries))
+        self.assertEqual(get_general_stats(self.table), {"total": 4})
+
+
+class TestAggregateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.countries = [
+            {"iso": "FR", "iso3": "FRA", "country": "France", "currency_code": "EUR",
+             "tld": ".fr", "languages": "fr-FR,frp", "cities": ["Paris", "Lyon"]},
+            {"iso": "BE", "iso3": "BEL", "country": "Belgium", "currency_code": "EUR",
+             "tld": ".be", "languages": "nl-BE,fr-BE", "cities": ["Brussels"]},
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def mutate(self, repo):
+        self.assertTrue(repo.add({"iso": "CH", "iso3": "CHE", "country": "Switzerland",
+                                  "currency_code": "CHF", "languages": "de-CH,fr-CH", "cities": ["Bern"]})[0])
+        self.assertTrue(repo.update("BE", {"currency_code": "BEF", "tld": ".be"})[0])
+        self.assertTrue(repo.add_city("FR", "Nice")[0])
+        self.assertTrue(repo.rename_city("FR", 0, "Marseille")[0])
+        self.assertTrue(repo.delete_city("CH", 0)[0])
+        self.assertTrue(repo.delete("BE")[0])
+        with repo.batch() as tx:
+            tx.add_city("CH", "Geneva")
+            tx.add({"iso": "LU", "iso3": "LUX", "country": "Luxembourg", "currency_code": "EUR", "cities": []})
+
+    def check(self, repo):
+        self.assertEqual(repo.verify_aggregates(), [])
+        expected = AggregateStore(repo.load_all())
+        self.assertEqual(repo.aggregates.to_dict(), expected.to_dict())
+        self.assertEqual(repo.aggregates.top("currency"), [("EUR", 2), ("CHF", 1)])
+
+    def test_json_counts_follow_writes_and_persist(self):
+        for use_journal in (False, True):
+            data_file = os.path.join(self.tmpdir.name, f"dados{use_journal}.json")
+            journal_file = data_file + ".journal"
+            repo = CountryRepository(data_file, journal_file=journal_file, use_journal=use_journal,
+                                     background_compaction=False)
+            repo.save_all(self.countries)
+            self.mutate(repo)
+            self.check(repo)
+            reopened = CountryRepository(data_file, journal_file=journal_file, use_journal=use_journal)
+            _, stored = reopened._read_file()
+            self.assertIsNotNone(stored)
+            self.check(reopened)
+
+    def test_external_edits_rebuild_stored_counts(self):
+        data_file = os.path.join(self.tmpdir.name, "dados.json")
+        repo = CountryRepository(data_file, use_journal=False)
+        repo.save_all(self.countries)
+        with open(data_file, encoding="utf-8") as f:
+            data = json.load(f)
+        # Same number of countries, so only the fingerprint tells them apart
+        data["countries"][1]["currency_code"] = "BEF"
+        with open(data_file, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        reopened = CountryRepository(data_file, use_journal=False)
+        self.assertIsNone(reopened._read_file()[1])
+        self.assertEqual(reopened.aggregates.top("currency"), [("BEF", 1), ("EUR", 1)])
+        self.assertEqual(reopened.verify_aggregates(), [])
+
+    def test_sqlite_counts_follow_writes(self):
+        db_file = os.path.join(self.tmpdir.name, "dados.db")
+        repo = SQLiteCountryRepository(db_file)
+        repo.save_all(self.countries)
+        self.mutate(repo)
+        self.check(repo)
+        repo.close()
+        reopened = SQLiteCountryRepository(db_file)
+        self.check(reopened)
+        reopened.close()
+
+    def test_verify_reports_drift(self):
+        data_file = os.path.join(self.tmpdir.name, "dados.json")
+        repo = CountryRepository(data_file, use_journal=False)
+        repo.save_all(self.countries)
+        repo.aggregates.counts["currency"]["EUR"] = 5
+        self.assertEqual(repo.verify_aggregates(), ["currency 'EUR': stored 5, actual 2"])
+
+
+class TestAnalyticsEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.countries = [
+            {"iso": "FR", "currency_code": "EUR", "tld": ".fr", "languages": "fr-FR,frp", "cities": ["Paris", "Lyon"]},
+            {"iso": "BE", "currency_code": "EUR", "tld": ".be", "languages": "nl-BE,fr-BE", "cities": ["Brussels"]},
+            {"iso": "CH", "currency_code": "CHF", "tld": ".ch", "languages": "de-CH,fr-CH", "cities": []},
+            {"iso": "AQ", "currency_code": "", "languages": ""},
+        ]
+        self.metrics = [
+            RowCount(),
+            TopValues("currency_code", 1),
+            DistinctCount("languages"),
+            CrossTab("currency_code", "languages"),
+            LengthDistribution("cities"),
+        ]
+
+    def test_metrics_must_implement_update_and_finish(self):
+        class Partial(Metric):
+            def update(self, state, values):
+                state["n"] += 1
+
+        with self.assertRaises(TypeError):
+            Partial("partial")
+
+    def test_sources_agree(self):
+        expected = {
+            "total": 4,
+            "top_currency_code": [["EUR", 2]],
+            "distinct_languages": 6,
+            "currency_code_by_languages": {
+                "CHF": [["de-CH", 1], ["fr-CH", 1]],
+                "EUR": [["fr-BE", 1], ["fr-FR", 1], ["frp", 1], ["nl-BE", 1]],
+            },
+            "cities_per_record": {"min": 0, "max": 2, "mean": 0.75, "total": 3, "histogram": {0: 2, 1: 1, 2: 1}},
+        }
+        table = ColumnarTable(self.countries)
+        self.assertEqual(run_metrics(self.countries, self.metrics), expected)
+        self.assertEqual(run_metrics(table, self.metrics), expected)
+        self.assertEqual(run_metrics(table, self.metrics, AggregateStore(self.countries)), expected)
+
+    def test_numeric_metrics_agree(self):
+        countries = [
+            {"iso": "FR", "continent": "EU", "currency_code": "EUR", "area": 547030.0, "population": 66987244},
+            {"iso": "BE", "continent": "EU", "currency_code": "EUR", "area": 30510.0, "population": 11422068},
+            {"iso": "JP", "continent": "AS", "currency_code": "JPY", "area": 377835.0, "population": 126529100},
+            {"iso": "AQ", "continent": "AN", "area": 14000000.0},
+        ]
+        metrics = [
+            NumericSummary("population"),
+            NumericSummary("area", by="continent", percentiles=(50,)),
+            Ratio("population", "area", by="currency_code", name="density"),
+            WeightedMean("area", "population"),
+        ]
+        report = run_metrics(countries, metrics)
+        self.assertEqual(report, run_metrics(ColumnarTable(countries), metrics))
+        self.assertEqual(report["population"]["p50"], 66987244.0)
+        self.assertEqual(report["area_by_continent"]["EU"]["p50"], 288770.0)
+        self.assertEqual(report["density"], {"EUR": round(78409312 / 577540, 2), "JPY": round(126529100 / 377835, 2)})
+        self.assertEqual(run_metrics([], metrics)["population"]["count"], 0)
+
+    def test_wrappers_and_export(self):
+        self.assertEqual(get_currency_stats(self.countries), [("EUR", 2), ("CHF", 1)])
+        report = run_metrics(self.countries, self.metrics)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "stats.json")
+            self.assertEqual(export_report(report, path), (True, path))
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["top_currency_code"], [["EUR", 2]])
+
+
+class TestBorderGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.countries = [
+            {"iso": "PT", "neighbours": ["ES"]},
+            {"iso": "ES", "neighbours": ["PT", "FR", "AD"]},
+            {"iso": "FR", "neighbours": ["ES", "AD", "CH"]},
+            {"iso": "AD", "neighbours": ["ES", "FR"]},
+            {"iso": "CH", "neighbours": ["LI"]},
+            {"iso": "AT", "neighbours": ["LI", "CH", "ZZ"]},
+            {"iso": "LI", "neighbours": []},
+            {"iso": "IS", "neighbours": []},
+        ]
+        self.graph = BorderGraph(self.countries)
+
+    def test_adjacency_is_symmetric(self):
+        self.assertEqual(self.graph.neighbours("li"), ["AT", "CH"])
+        self.assertEqual(self.graph.neighbours("CH"), ["AT", "FR", "LI"])
+        self.assertEqual((self.graph.edges, self.graph.unknown), (8, ["ZZ"]))
+        with self.assertRaises(KeyError):
+            self.graph.neighbours("XX")
+
+    def test_paths_and_neighbourhoods(self):
+        self.assertEqual(self.graph.shortest_path("PT", "LI"), ["PT", "ES", "FR", "CH", "LI"])
+        self.assertEqual(self.graph.distance("PT", "AT"), 4)
+        self.assertIsNone(self.graph.shortest_path("PT", "IS"))
+        self.assertEqual(self.graph.shortest_path("IS", "IS"), ["IS"])
+        self.assertEqual(self.graph.neighbourhood("AD", 2), {1: ["ES", "FR"], 2: ["CH", "PT"]})
+
+    def test_components_and_landlocked(self):
+        self.assertEqual(self.graph.components(), [["AD", "AT", "CH", "ES", "FR", "LI", "PT"], ["IS"]])
+        self.assertFalse(self.graph.connected("IS", "PT"))
+        self.assertEqual(self.graph.isolated(), ["IS"])
+        self.assertEqual(self.graph.landlocked(), ["AD", "CH", "AT", "LI"])
+        self.assertEqual(self.graph.doubly_landlocked(), ["AT", "LI"])
+
+    def test_rebuilt_per_data_version(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = CountryRepository(os.path.join(tmpdir, "dados.json"))
+            repo.save_all(self.countries)
+            graph = repo.derived("borders", BorderGraph)
+            self.assertIs(repo.derived("borders", BorderGraph), graph)
+            self.assertTrue(repo.update("IS", {"neighbours": ["PT"]})[0])
+            self.assertEqual(repo.derived("borders", BorderGraph).distance("IS", "ES"), 2)
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(self.tmpdir.name, keep_last=2, keep_daily=0, keep_monthly=0)
+        self.countries = [
+            {"iso": "FR", "currency_code": "EUR", "languages": "fr-FR", "cities": ["Paris"]},
+            {"iso": "CH", "currency_code": "CHF", "languages": "de-CH", "cities": []},
+            {"iso": "US", "currency_code": "USD", "languages": "en-US", "cities": ["Boston"]},
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _edit(self, iso, **fields):
+        self.countries = [dict(c, **fields) if c["iso"] == iso else c for c in self.countries]
+
+    def test_unchanged_records_are_shared(self):
+        created, first = self.store.take(self.countries, "initial")
+        self.assertTrue(created)
+        self.assertEqual(self.store.take(self.countries), (False, first))
+        self._edit("CH", currency_code="EUR")
+        created, second = self.store.take(self.countries)
+        self.assertEqual((second["seq"], second["changed"], second["new_objects"]), (2, 1, 1))
+        self.assertEqual(self.store.stats(), {"snapshots": 2, "manifests": 2, "objects": 4})
+        self.assertEqual(self.store.diff(1, 2), {"added": [], "removed": [], "changed": ["CH"]})
+        self.assertEqual(self.store.load(1)[1]["currency_code"], "CHF")
+
+    def test_metric_series_matches_full_recompute(self):
+        metrics = [TopValues("currency_code", None), CrossTab("currency_code", "languages")]
+        self.store = SnapshotStore(self.tmpdir.name, keep_last=10, keep_daily=0, keep_monthly=0)
+        self.store.take(self.countries)
+        self._edit("CH", currency_code="EUR")
+        self.store.take(self.countries)
+        self.countries = self.countries[:2] + [{"iso": "DE", "currency_code": "EUR", "languages": "de-DE"}]
+        self.store.take(self.countries)
+        series = self.store.metric_series(metrics)
+        self.assertEqual([info["seq"] for info, _ in series], [1, 2, 3])
+        for info, report in series:
+            self.assertEqual(report, run_metrics(self.store.load(info["seq"]), metrics))
+        self.assertEqual(series[-1][1]["top_currency_code"], [["EUR", 3]])
+        self.assertEqual(len(self.store.metric_series(metrics, seqs=[3])), 1)
+
+    def test_unchanged_records_are_not_hashed_again(self):
+        records = [CountryRecord(c) for c in self.countries]
+        self.store.take(records)
+        records[1] = CountryRecord(dict(self.countries[1], currency_code="EUR"))
+        with mock.patch("components.snapshot_component._digest", wraps=snapshot_digest) as digest:
+            created, info = self.store.take(records)
+        # The edited record and the manifest
+        self.assertEqual(digest.call_count, 2)
+        self.assertEqual((created, info["changed"]), (True, 1))
+        self.assertEqual(self.store.load(info["seq"])[1]["currency_code"], "EUR")
+
+    def test_retention_prunes_unreferenced_data(self):
+        for population in range(4):
+            self._edit("US", population=population)
+            self.store.take(self.countries)
+        self.assertEqual([info["seq"] for info in self.store.history()], [3, 4])
+        self.assertEqual(self.store.stats(), {"snapshots": 2, "manifests": 2, "objects": 4})
+        with self.assertRaises(KeyError):
+            self.store.load(1)
+
+
+class TestCountryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.countries = [
+            {"iso": "AD", "iso3": "AND", "country": "Andorra"},
+            {"iso": "FR", "iso3": "FRA", "country": "France"},
+        ]
+        self.index = CountryIndex(self.countries)
+
+    def test_unique_checks_match_list_scan(self):
+        cases = [
+            ({"iso": "fr", "iso3": "XXX", "country": "X"}, ""),
+            ({"iso": "XX", "iso3": "and", "country": "X"}, ""),
+            ({"iso": "XX", "iso3": "XXX", "country": "FRANCE"}, ""),
+            ({"iso": "FR", "iso3": "FRA", "country": "France"}, "fr"),
+            ({"iso": "XX", "iso3": "XXX", "country": "Nowhere"}, ""),
+        ]
+        for data, exclude in cases:
+            self.assertEqual(
+                validate_country_unique(data, self.index, exclude),
+                validate_country_unique(data, self.countries, exclude),
+            )
+
+    def test_replace_keeps_position(self):
+        old = self.index.get_by_iso("AD")
+        self.index.replace(old, {"iso": "AD", "iso3": "AND", "country": "Principality of Andorra"})
+        self.assertEqual([c["iso"] for c in self.index.records()], ["AD", "FR"])
+        self.assertIsNone(self.index.get_by_name("andorra"))
+
+    def test_sorted_by_numeric_value(self):
+        countries = self.countries + [
+            {"iso": "LU", "iso3": "LUX", "country": "Luxembourg", "population": 100},
+            {"iso": "MT", "iso3": "MLT", "country": "Malta", "population": 9},
+        ]
+        countries[1] = dict(countries[1], population=64768389)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repos = [CountryRepository(os.path.join(tmpdir, "dados.json")),
+                     SQLiteCountryRepository(os.path.join(tmpdir, "dados.db"))]
+            for repo in repos:
+                repo.save_all(countries)
+                self.assertEqual([c["iso"] for c in repo.sorted_by("population")], ["MT", "LU", "FR", "AD"])
+                self.assertEqual([c["iso"] for c in repo.sorted_by("population", descending=True)],
+                                 ["FR", "LU", "MT", "AD"])
+            repos[1].close()
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)